@@ -1,5 +1,8 @@
 from crewai import Agent, Task, Crew
 from config.llm_config import llm
+from config.deadline import limit_agent
+from database.usage_ledger import usage_context
+from config.tracing import span
 from tools.banking_tools import get_account_balance, get_recent_transactions, search_banking_knowledge, check_account_status
 
 class BankingCrew:
@@ -8,14 +11,17 @@ class BankingCrew:
         self.setup_agents()
     
     def setup_agents(self):
-        llm_config = llm.get_llm_config()
+        # Lookup agents mostly relay tool results, so they stay on the fast model
+        lookup_llm = llm.get_crew_llm(role="lookup")
+        crew_llm = llm.get_crew_llm(role="answer")
+        self.llms = [lookup_llm, crew_llm]
         
         self.account_specialist = Agent(
             role="Banking Account Specialist",
             goal="Assist customers with account inquiries, balance checks, and account management",
             backstory="You are a professional banking specialist with expertise in account services, transactions, and banking policies.",
             tools=self.tools,
-            llm=llm_config["model"],  
+            llm=lookup_llm,  
             verbose=True
         )
         
@@ -24,15 +30,19 @@ class BankingCrew:
             goal="Help customers understand their transactions, investigate discrepancies, and provide transaction history",
             backstory="You are a detail-oriented transaction analyst with extensive knowledge of banking operations and transaction processing.",
             tools=self.tools,
-            llm=llm_config["model"],  
+            llm=crew_llm,  
             verbose=True
         )
 
-    
-    def handle_query(self, user_query, customer_info):
+        # Agents and crews are built once per pooled instance
+        self.crews = {agent.role: self.build_crew(agent) for agent in (self.account_specialist, self.transaction_analyst)}
+
+    def build_crew(self, agent):
+        """A crew led by ``agent``, built once; each query only fills in the task template"""
         task = Task(
-            description=f"""
+            description="""
             Customer Information: {customer_info}
+            Conversation So Far: {conversation_context}
             Customer Query: {user_query}
             
             Please assist this banking customer with their inquiry. Use the available tools to:
@@ -43,18 +53,30 @@ class BankingCrew:
             
             Maintain the highest standards of security and professionalism.
             """,
-            agent=self.determine_best_agent(user_query),
+            agent=agent,
             expected_output="A secure and informative response to the customer's banking inquiry"
         )
-        
-        crew = Crew(
-        agents=[self.account_specialist, self.transaction_analyst],
-        tasks=[task],
-        verbose=True
+        return Crew(
+            agents=[self.account_specialist, self.transaction_analyst],
+            tasks=[task],
+            verbose=True
         )
-    
-        
-        result = crew.kickoff()
+
+    def handle_query(self, user_query, customer_info, conversation_context=None, tier=None):
+        # The tier ("strong" for an escalation) is set on the LLMs themselves,
+        # as CrewAI may call them from a thread without this context
+        for crew_llm in self.llms:
+            crew_llm.tier = tier
+        # Iteration limits shrink to fit the request deadline
+        agent = limit_agent(self.determine_best_agent(user_query))
+        inputs = {
+            "customer_info": str(customer_info) if customer_info else "Not provided",
+            "conversation_context": conversation_context or "This is the start of the conversation.",
+            "user_query": user_query
+        }
+
+        with usage_context(crew="banking", agent=agent.role), span("crew.banking", domain="banking", agent=agent.role):
+            result = self.crews[agent.role].kickoff(inputs=inputs)
         return result
     
     def determine_best_agent(self, query):
@@ -8,7 +8,7 @@ class BaseAgent:
             goal=goal,
             backstory=backstory,
             tools=tools or [],
-            llm=llm.client,
+            llm=llm.get_crew_llm(),
             verbose=True,
             allow_delegation=False,
             max_iter=3
@@ -0,0 +1,193 @@
+import json
+import threading
+import weakref
+from collections import OrderedDict
+from config.llm_config import llm, count_tokens, model_for
+from config.settings import (
+    MEMORY_WINDOW_TURNS, MEMORY_MAX_CONTEXT_TOKENS, MEMORY_SUMMARY_MAX_TOKENS, MEMORY_MAX_SESSIONS
+)
+from database.sql_manager import db
+from database.usage_ledger import usage_context
+
+# user_info fields that identify the customer, most specific first
+CUSTOMER_ID_FIELDS = ["customer_id", "account_number", "account_id", "phone_number", "order_id", "email", "phone", "name"]
+
+# Times add_turn re-reads a session another process updated before giving up
+SAVE_ATTEMPTS = 3
+
+def customer_id_from_info(user_info):
+    for field in CUSTOMER_ID_FIELDS:
+        value = (user_info or {}).get(field)
+        if value:
+            return str(value)
+    return "anonymous"
+
+class ConversationMemory:
+    """Token-bounded rolling memory of a chat session.
+
+    The last ``window_turns`` exchanges are kept verbatim. When the window
+    (or the token budget) overflows, only the exchanges falling out of it
+    are folded into a running summary, so each summarization call is small
+    and the context fed to the crews stays bounded however long the
+    session runs. State is persisted as JSON in the chat_sessions table.
+
+    At most ``max_sessions`` states are cached, least recently used first
+    out. Turns of one session are recorded one at a time, and each save is
+    a compare-and-set on the row's version, so a process holding a stale
+    copy re-reads the session instead of overwriting newer turns.
+    """
+
+    def __init__(self, manager=db, window_turns=MEMORY_WINDOW_TURNS,
+                 max_context_tokens=MEMORY_MAX_CONTEXT_TOKENS, summary_max_tokens=MEMORY_SUMMARY_MAX_TOKENS,
+                 max_sessions=MEMORY_MAX_SESSIONS):
+        self.manager = manager
+        self.window_turns = window_turns
+        self.max_context_tokens = max_context_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per session in use; entries go away with their last holder
+        self._session_locks = weakref.WeakValueDictionary()
+        self.summarizations = 0
+
+    def _empty_state(self):
+        return {"summary": "", "turns": [], "version": 0}
+
+    def _cache(self, session_id, state):
+        with self._lock:
+            self._sessions[session_id] = state
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def _session_lock(self, session_id):
+        with self._lock:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.Lock()
+            return lock
+
+    def _load(self, session_id, refresh=False):
+        """Return the session state, reading it from the database on first use or when ``refresh``"""
+        if not refresh:
+            with self._lock:
+                if session_id in self._sessions:
+                    self._sessions.move_to_end(session_id)
+                    return self._sessions[session_id]
+
+        state = self._empty_state()
+        try:
+            row = self.manager.get_chat_session(session_id)
+            if row is not None:
+                state["version"] = row['version']
+                stored = json.loads(row['messages']) if row['messages'] else None
+                # Rows written by log_chat_session hold free-form messages
+                if isinstance(stored, dict) and "turns" in stored:
+                    state.update(summary=stored.get("summary", ""), turns=stored["turns"])
+        except Exception as e:
+            print(f"Could not load conversation memory for {session_id}: {e}")
+
+        self._cache(session_id, state)
+        return state
+
+    def _format_turns(self, turns):
+        return "\n".join(
+            f"Customer: {turn['user']}\nAgent: {turn['assistant']}" for turn in turns
+        )
+
+    def _context_tokens(self, state):
+        return count_tokens(state["summary"]) + count_tokens(self._format_turns(state["turns"]))
+
+    def _summarize(self, summary, turns):
+        """Fold the given exchanges into the running summary"""
+        messages = [
+            {
+                "role": "system",
+                "content": "You maintain a running summary of a customer support conversation. "
+                           "Keep facts the agent may need later: identifiers, orders, accounts, "
+                           "amounts, problems reported and what was already answered or promised."
+            },
+            {
+                "role": "user",
+                "content": f"Current summary:\n{summary or 'None yet.'}\n\n"
+                           f"New exchanges to add:\n{self._format_turns(turns)}\n\n"
+                           f"Write the updated summary in at most {self.summary_max_tokens // 2} words."
+            }
+        ]
+
+        with usage_context(stage="memory"):
+            updated = llm.generate_response(
+                messages, max_tokens=self.summary_max_tokens, temperature=0.2, model=model_for("memory")
+            )
+
+        self.summarizations += 1
+        if updated.startswith("Error generating response"):
+            # Keep the facts even without an LLM, trimmed to the summary budget
+            updated = f"{summary}\n{self._format_turns(turns)}".strip()
+            updated = updated[-self.summary_max_tokens * 4:]
+        return updated.strip()
+
+    def get_context(self, session_id):
+        """Conversation context for the crews, or an empty string for a new session"""
+        if not session_id:
+            return ""
+
+        state = self._load(session_id)
+        sections = []
+        if state["summary"]:
+            sections.append(f"Summary of earlier conversation:\n{state['summary']}")
+        if state["turns"]:
+            sections.append(f"Recent conversation:\n{self._format_turns(state['turns'])}")
+        return "\n\n".join(sections)
+
+    def add_turn(self, session_id, user_message, assistant_message, user_info=None, domain=""):
+        """Record an exchange, summarizing whatever overflows the window, and persist"""
+        if not session_id:
+            return
+
+        with self._session_lock(session_id):
+            for attempt in range(SAVE_ATTEMPTS):
+                # The cached state is replaced, never modified, so readers see whole turns
+                state = self._load(session_id, refresh=attempt > 0)
+                updated = {
+                    "summary": state["summary"],
+                    "turns": state["turns"] + [{"user": user_message, "assistant": assistant_message}],
+                    "version": state["version"]
+                }
+
+                overflow = []
+                while updated["turns"] and (
+                    len(updated["turns"]) > self.window_turns
+                    or (len(updated["turns"]) > 1 and self._context_tokens(updated) > self.max_context_tokens)
+                ):
+                    overflow.append(updated["turns"].pop(0))
+
+                if overflow:
+                    updated["summary"] = self._summarize(updated["summary"], overflow)
+
+                try:
+                    saved = self.manager.save_chat_session(
+                        session_id,
+                        customer_id_from_info(user_info),
+                        domain,
+                        json.dumps({"summary": updated["summary"], "turns": updated["turns"]}),
+                        version=updated["version"]
+                    )
+                except Exception as e:
+                    print(f"Could not save conversation memory for {session_id}: {e}")
+                    self._cache(session_id, updated)
+                    return
+
+                if saved:
+                    updated["version"] += 1
+                    self._cache(session_id, updated)
+                    return
+            print(f"Could not save conversation memory for {session_id}: it kept changing underneath")
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+# Global conversation memory
+conversation_memory = ConversationMemory()
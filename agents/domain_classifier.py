@@ -0,0 +1,118 @@
+import math
+import re
+
+# Keyword profiles per domain, built from the domain descriptions and
+# examples used in the RouterCrew classification prompt.
+DOMAIN_KEYWORDS = {
+    "ecommerce": [
+        "order", "orders", "shipping", "shipment", "ship", "shipped", "return", "returns",
+        "refund", "product", "products", "tracking", "track", "delivery", "deliver",
+        "delivered", "arrive", "package", "shopping", "cart", "purchase", "item",
+        "headphones", "laptop", "stand", "speaker", "cable", "case", "cancel", "exchange"
+    ],
+    "banking": [
+        "account", "balance", "transaction", "transactions", "payment", "card", "cards",
+        "loan", "loans", "transfer", "transfers", "deposit", "withdrawal", "withdraw",
+        "atm", "savings", "checking", "charge", "charged", "fraud", "credit", "debit",
+        "money", "bank", "statement", "overdraft", "wire", "salary"
+    ],
+    "telecom": [
+        "phone", "bill", "billing", "payment", "data", "usage", "network", "signal", "internet",
+        "plan", "plans", "roaming", "upgrade", "unlimited", "basic", "coverage", "outage",
+        "connection", "slow", "calls", "sms", "text", "mobile", "sim", "minutes",
+        "wifi", "speed", "line"
+    ]
+}
+
+# Identifiers from the customer database are the strongest possible signal
+ID_PATTERNS = {
+    "ecommerce": [r"\bord\d+\b", r"\btrk\d+\b", r"\bprod\d+\b"],
+    "banking": [r"\bacc\d+\b", r"\btxn\d+\b"],
+    "telecom": [r"\b\d{3}-\d{4}\b"]
+}
+
+ID_WEIGHT = 3.0
+
+# First-person words: the answer depends on who is asking
+PERSONAL_PATTERN = re.compile(r"\b(?:i|i'm|i've|me|my|mine)\b", re.IGNORECASE)
+
+# Score needed before a single domain is trusted at full confidence
+MIN_EVIDENCE = 2.5
+
+
+class LocalDomainClassifier:
+    """Keyword classifier that routes obvious queries without an LLM call"""
+
+    def __init__(self, keywords=None, id_patterns=None):
+        self.keywords = keywords or DOMAIN_KEYWORDS
+        self.id_patterns = {
+            domain: [re.compile(pattern) for pattern in patterns]
+            for domain, patterns in (id_patterns or ID_PATTERNS).items()
+        }
+        self.weights = self._build_weights()
+
+    def _build_weights(self):
+        """Weight each keyword by inverse domain frequency so shared words count less"""
+        domain_count = len(self.keywords)
+        document_frequency = {}
+        for terms in self.keywords.values():
+            for term in set(terms):
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        weights = {}
+        for domain, terms in self.keywords.items():
+            weights[domain] = {
+                term: 1.0 + math.log(domain_count / document_frequency[term])
+                for term in terms
+            }
+        return weights
+
+    def tokenize(self, text):
+        return re.findall(r"[a-z0-9]+", text.lower())
+
+    def score(self, query):
+        """Return the raw score for every domain"""
+        text = query.lower()
+        tokens = self.tokenize(text)
+        scores = {}
+
+        for domain, term_weights in self.weights.items():
+            score = sum(term_weights.get(token, 0.0) for token in tokens)
+            for pattern in self.id_patterns.get(domain, []):
+                if pattern.search(text):
+                    score += ID_WEIGHT
+            scores[domain] = score
+
+        return scores
+
+    def has_identifier(self, query):
+        """True when the query references an order, account or phone number"""
+        text = (query or "").lower()
+        return any(
+            pattern.search(text)
+            for patterns in self.id_patterns.values()
+            for pattern in patterns
+        )
+
+    def is_personal(self, query):
+        """True when the query is about the customer's own orders, accounts or service"""
+        return bool(PERSONAL_PATTERN.search(query or ""))
+
+    def classify(self, query):
+        """Return (domain, confidence) where confidence is in [0, 1]"""
+        scores = self.score(query or "")
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_domain, best_score = ranked[0]
+        total = sum(scores.values())
+
+        if best_score <= 0 or total <= 0:
+            return best_domain, 0.0
+
+        # Share of the evidence held by the winning domain, damped when
+        # the query only contains a single weak keyword
+        confidence = (best_score / total) * min(1.0, best_score / MIN_EVIDENCE)
+        return best_domain, round(confidence, 3)
+
+
+# Shared instance; the classifier is stateless after construction
+local_classifier = LocalDomainClassifier()
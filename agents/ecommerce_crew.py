@@ -1,5 +1,8 @@
 from crewai import Agent, Task, Crew
 from config.llm_config import llm
+from config.deadline import limit_agent
+from database.usage_ledger import usage_context
+from config.tracing import span
 from tools.ecommerce_tools import get_order_status, get_customer_orders, search_ecommerce_knowledge, check_product_availability
 
 class EcommerceCrew:
@@ -9,14 +12,17 @@ class EcommerceCrew:
     
     def setup_agents(self):
 
-        llm_config = llm.get_llm_config()
+        # Lookup agents mostly relay tool results, so they stay on the fast model
+        lookup_llm = llm.get_crew_llm(role="lookup")
+        crew_llm = llm.get_crew_llm(role="answer")
+        self.llms = [lookup_llm, crew_llm]
         
         self.order_specialist = Agent(
             role="Order Management Specialist",
             goal="Help customers with order tracking, status updates, and order-related inquiries",
             backstory="You are an experienced e-commerce order specialist with deep knowledge of order processing, shipping, and tracking systems.",
             tools=self.tools,
-            llm=llm_config["model"],  
+            llm=lookup_llm,  
             verbose=True
         )
         
@@ -25,14 +31,19 @@ class EcommerceCrew:
             goal="Provide comprehensive customer support for e-commerce inquiries including returns, policies, and general questions",
             backstory="You are a friendly and knowledgeable customer service representative specializing in e-commerce support.",
             tools=self.tools,
-            llm=llm_config["model"],  
+            llm=crew_llm,  
             verbose=True
         )
-    
-    def handle_query(self, user_query, customer_info):
+
+        # Agents and crews are built once per pooled instance
+        self.crews = {agent.role: self.build_crew(agent) for agent in (self.order_specialist, self.customer_service)}
+
+    def build_crew(self, agent):
+        """A crew led by ``agent``, built once; each query only fills in the task template"""
         task = Task(
-            description=f"""
+            description="""
             Customer Information: {customer_info}
+            Conversation So Far: {conversation_context}
             Customer Query: {user_query}
             
             Please help this customer with their e-commerce inquiry. Use the available tools to:
@@ -42,17 +53,30 @@ class EcommerceCrew:
             
             Be friendly, professional, and thorough in your response.
             """,
-            agent=self.determine_best_agent(user_query),
+            agent=agent,
             expected_output="A helpful and comprehensive response to the customer's e-commerce inquiry"
         )
-        
-        crew = Crew(
+        return Crew(
             agents=[self.order_specialist, self.customer_service],
             tasks=[task],
             verbose=True
         )
-        
-        result = crew.kickoff()
+
+    def handle_query(self, user_query, customer_info, conversation_context=None, tier=None):
+        # The tier ("strong" for an escalation) is set on the LLMs themselves,
+        # as CrewAI may call them from a thread without this context
+        for crew_llm in self.llms:
+            crew_llm.tier = tier
+        # Iteration limits shrink to fit the request deadline
+        agent = limit_agent(self.determine_best_agent(user_query))
+        inputs = {
+            "customer_info": str(customer_info) if customer_info else "Not provided",
+            "conversation_context": conversation_context or "This is the start of the conversation.",
+            "user_query": user_query
+        }
+
+        with usage_context(crew="ecommerce", agent=agent.role), span("crew.ecommerce", domain="ecommerce", agent=agent.role):
+            result = self.crews[agent.role].kickoff(inputs=inputs)
         return result
     
     def determine_best_agent(self, query):
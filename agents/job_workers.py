@@ -0,0 +1,105 @@
+import os
+import time
+import socket
+import argparse
+import threading
+from config.settings import JOB_WORKERS_IN_PROCESS, JOB_POLL_SECONDS
+from database.job_queue import job_queue
+from agents.pipeline import run_turn, remember_turn
+
+class JobWorkerPool:
+    """Background threads that claim chat jobs from the queue and run the crews"""
+
+    def __init__(self, workers=JOB_WORKERS_IN_PROCESS, queue=job_queue, poll_seconds=JOB_POLL_SECONDS):
+        self.workers = workers
+        self.queue = queue
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads = []
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        for index in range(self.workers):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+            thread = threading.Thread(target=self._loop, args=(worker_id,), name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker_id)
+            except Exception as e:
+                print(f"Job claim failed: {e}")
+                job = None
+
+            if job is None:
+                self._stop.wait(self.poll_seconds)
+                continue
+            self._run(job, worker_id)
+
+    def _keep_leased(self, job_id, worker_id, done):
+        """Renew the lease until the job finishes or another worker takes it over"""
+        interval = max(1.0, self.queue.visibility_timeout / 3)
+        while not done.wait(interval):
+            if not self.queue.heartbeat(job_id, worker_id):
+                print(f"Lost the lease on job {job_id}; its result will be discarded")
+                return
+
+    def _run(self, job, worker_id):
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._keep_leased, args=(job["job_id"], worker_id, done), daemon=True)
+        heartbeat.start()
+
+        try:
+            turn = run_turn(
+                job["domain"],
+                job["payload"]["query"],
+                job["payload"]["user_info"],
+                session_id=job["session_id"],
+                remember=False
+            )
+            # Only the attempt that still holds the lease records the turn,
+            # so a reclaimed job cannot append the same exchange twice
+            if self.queue.complete(job["job_id"], worker_id, turn):
+                self.completed += 1
+                remember_turn(job["session_id"], job["payload"]["query"], turn,
+                              job["payload"]["user_info"], job["domain"])
+        except Exception as e:
+            self.failed += 1
+            print(f"Job {job['job_id']} attempt {job['attempts']} failed: {e}")
+            self.queue.fail(job["job_id"], worker_id, f"{type(e).__name__}: {e}")
+        finally:
+            done.set()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def start_job_workers(workers=JOB_WORKERS_IN_PROCESS):
+    """Start the in-process worker pool once per process"""
+    global _pool
+    with _pool_lock:
+        if _pool is None and workers > 0:
+            _pool = JobWorkerPool(workers).start()
+        return _pool
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run chat job workers outside the Streamlit process")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS_IN_PROCESS))
+    args = parser.parse_args()
+
+    pool = JobWorkerPool(args.workers).start()
+    print(f"{args.workers} job workers running")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"Jobs: {job_queue.get_stats()} (this process: {pool.completed} completed, {pool.failed} failed)")
+    except KeyboardInterrupt:
+        pool.stop(timeout=5)
@@ -0,0 +1,359 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config.settings import (
+    AGENT_EXECUTION_MODE, ROUTING_ENABLED, ROUTING_DEADLINE_SECONDS, ROUTING_WORKERS,
+    TURN_DEADLINE_SECONDS, ROUTING_BUDGET_FRACTION,
+    LLM_CASCADE_ENABLED, LLM_SELF_CHECK_ENABLED, LLM_ESCALATION_MIN_SECONDS
+)
+from config.llm_config import llm, suppress_streaming, request_priority, model_for
+from config.deadline import Deadline, DeadlineExceeded, deadline_scope, current_deadline, remaining_time, run_stage
+from agents.registry import crew_registry
+from agents.domain_classifier import local_classifier
+from database.semantic_cache import semantic_cache
+from database.vector_manager import vector_db
+from tools.tool_tracking import track_turn
+from database.usage_ledger import usage_context
+from config.tracing import span
+from agents.conversation_memory import conversation_memory
+
+# Shared pool for routing work that runs alongside the domain crew
+_routing_executor = ThreadPoolExecutor(max_workers=ROUTING_WORKERS, thread_name_prefix="router")
+
+DOMAIN_CREWS = ["ecommerce", "banking", "telecom"]
+
+# Draft answers containing these never pass the self-check
+FAILED_ANSWER_MARKERS = [
+    "agent stopped due to iteration limit",
+    "error generating response",
+    "i encountered an error",
+    "i don't have enough information",
+    "i am unable to",
+    "i'm unable to"
+]
+
+def route_query(user_query, user_info):
+    """Run a pooled router and return its routing dict"""
+    # Routing output is never shown to the customer
+    with suppress_streaming(), usage_context(stage="routing"), crew_registry.acquire("router") as router:
+        return router.route_customer(user_query, user_info)
+
+def build_query_context(user_query, routing_info=None):
+    """Combine the customer query with whatever routing analysis is available"""
+    if routing_info and routing_info.get("intent_analysis"):
+        return f"Customer Query: {user_query}\nRouting Analysis: {routing_info['intent_analysis']}"
+    return f"Customer Query: {user_query}"
+
+def mentions_customer_data(text, user_info):
+    """True when any word of the customer's details appears in the text"""
+    text = str(text).lower()
+    for value in (user_info or {}).values():
+        for word in str(value).lower().split():
+            if len(word) >= 3 and word in text:
+                return True
+    return False
+
+def is_complex(routing_info):
+    return bool(routing_info) and routing_info.get("complexity") == "complex"
+
+def passes_self_check(user_query, answer):
+    """Quick check, on the fast model, that a draft answer addresses the query"""
+    text = str(answer).strip()
+    if len(text) < 20 or any(marker in text.lower() for marker in FAILED_ANSWER_MARKERS):
+        return False
+    if not LLM_SELF_CHECK_ENABLED:
+        return True
+
+    messages = [
+        {
+            "role": "system",
+            "content": "You review customer support replies. Reply with PASS if the reply directly and "
+                       "plausibly answers the customer's question, otherwise reply with FAIL. One word only."
+        },
+        {"role": "user", "content": f"Question: {user_query}\n\nReply: {text}"}
+    ]
+    with suppress_streaming(), usage_context(stage="self_check"), span("self_check") as check_span:
+        verdict = llm.generate_response(messages, max_tokens=5, temperature=0.0, model=model_for("self_check"))
+        check_span.set_attribute("verdict", verdict.strip()[:20])
+
+    # An unavailable reviewer never forces an escalation
+    if verdict.startswith("Error generating response"):
+        return True
+    return not verdict.strip().upper().startswith("FAIL")
+
+def answer_with_crew(crew, user_query, user_info, routing_info=None, conversation_context=None, timings=None):
+    """Run the domain crew, queueing its LLM calls by the routed urgency.
+
+    Queries the router marked complex go straight to the strong model.
+    Otherwise the fast model drafts the answer and the strong model retries
+    when the draft fails the self-check, if enough of the deadline is left.
+    Self-check and escalation times are added to ``timings``.
+    """
+    timings = {} if timings is None else timings
+    urgency = routing_info.get("urgency", "medium") if routing_info else "medium"
+    query_context = build_query_context(user_query, routing_info)
+    tier = "strong" if is_complex(routing_info) else None
+
+    with request_priority(urgency), usage_context(stage="answer"):
+        result = crew.handle_query(query_context, user_info, conversation_context, tier=tier)
+
+    if not LLM_CASCADE_ENABLED or tier == "strong":
+        return result
+
+    start = time.perf_counter()
+    passed = passes_self_check(user_query, result)
+    timings["self_check"] = time.perf_counter() - start
+    if passed or remaining_time(default=float("inf")) < LLM_ESCALATION_MIN_SECONDS:
+        return result
+
+    start = time.perf_counter()
+    with request_priority(urgency), usage_context(stage="escalation"), span("escalation"):
+        result = crew.handle_query(query_context, user_info, conversation_context, tier="strong")
+    timings["escalation"] = time.perf_counter() - start
+    return result
+
+def answer_tier(routing_info, timings):
+    """Which model tier produced the final answer"""
+    if not LLM_CASCADE_ENABLED:
+        return "strong"
+    return "strong" if is_complex(routing_info) or "escalation" in timings else "fast"
+
+def _timed_route(user_query, user_info):
+    start = time.perf_counter()
+    routing_info = route_query(user_query, user_info)
+    return routing_info, time.perf_counter() - start
+
+def _stage_budget(fraction=1.0, cap=None):
+    """Seconds a stage may take under the current deadline (``cap`` when there is none)"""
+    deadline = current_deadline()
+    return cap if deadline is None else deadline.budget_for(fraction, cap)
+
+def _answer(domain, user_query, user_info, routing_info, conversation_context, timings):
+    # The crew is checked out inside the stage worker, so a crew abandoned
+    # at the deadline goes back to the pool only once it has really stopped
+    start = time.perf_counter()
+    with crew_registry.acquire(domain) as crew:
+        result = answer_with_crew(crew, user_query, user_info, routing_info, conversation_context, timings)
+    timings["answer"] = time.perf_counter() - start
+    return result
+
+def run_sequential(domain, user_query, user_info, routing_enabled=ROUTING_ENABLED, conversation_context=None):
+    """Route first, then answer with the selected domain crew.
+
+    Routing gets ROUTING_BUDGET_FRACTION of the remaining deadline; if it
+    runs over, the crew answers without the intent analysis. Raises
+    DeadlineExceeded when the answer itself does not finish in time.
+    """
+    timings = {}
+    routing_info = None
+
+    if routing_enabled:
+        budget = _stage_budget(ROUTING_BUDGET_FRACTION)
+        try:
+            routing_info, timings["routing"] = run_stage("routing", budget, _timed_route, user_query, user_info)
+        except DeadlineExceeded:
+            timings["routing_missed_deadline"] = budget
+
+    if domain not in DOMAIN_CREWS:
+        return None, routing_info, timings
+
+    result = run_stage(
+        "answer", _stage_budget(),
+        _answer, domain, user_query, user_info, routing_info, conversation_context, timings
+    )
+    return result, routing_info, timings
+
+def _routing_if_ready(routing_future, timings):
+    """Routing's result if it has already finished, without waiting for it"""
+    if routing_future is None or not routing_future.done():
+        return None
+    try:
+        routing_info, timings["routing"] = routing_future.result()
+    except Exception as e:
+        print(f"Routing failed, keeping the speculative answer: {e}")
+        return None
+    return routing_info
+
+def _disagrees(routing_info, domain):
+    return bool(routing_info) and routing_info.get("domain") not in (None, domain)
+
+def _speculative_answer(domain, user_query, user_info, routing_future, routing_deadline,
+                        conversation_context, timings):
+    # Routing runs alongside the crew; once the answer is ready, wait only for what is left of its budget
+    routing_expires = time.monotonic() + _stage_budget(ROUTING_BUDGET_FRACTION, routing_deadline)
+
+    start = time.perf_counter()
+    with crew_registry.acquire(domain) as crew:
+        # Routing that is already in before the crew's first LLM call costs nothing to use
+        routing_info = _routing_if_ready(routing_future, timings)
+        crew_routing = None if _disagrees(routing_info, domain) else routing_info
+        result = answer_with_crew(crew, user_query, user_info, crew_routing, conversation_context, timings)
+    timings["answer"] = time.perf_counter() - start
+
+    if routing_future is not None and not routing_future.done():
+        budget = max(0.0, routing_expires - time.monotonic())
+        try:
+            routing_future.result(timeout=budget)
+        except FutureTimeoutError:
+            timings["routing_missed_deadline"] = budget
+        except Exception:
+            pass
+    if routing_info is None:
+        routing_info = _routing_if_ready(routing_future, timings)
+
+    # The answer stands either way; a second crew run would not fit the stage
+    if _disagrees(routing_info, domain):
+        timings["routing_disagreed"] = routing_info["domain"]
+    return result, routing_info
+
+def run_speculative(domain, user_query, user_info, routing_enabled=ROUTING_ENABLED,
+                    routing_deadline=ROUTING_DEADLINE_SECONDS, conversation_context=None):
+    """Start the domain crew immediately, without intent analysis, and route concurrently.
+
+    If routing finishes before the crew makes its first LLM call and agrees
+    with ``domain``, the crew answers with its analysis. The crew's answer
+    is always kept: routing that arrives later, within ``routing_deadline``
+    seconds (or its share of the request deadline, if smaller), is only
+    returned, and a different domain is recorded in
+    ``timings["routing_disagreed"]``.
+    """
+    timings = {}
+    routing_future = None
+
+    if domain not in DOMAIN_CREWS:
+        return None, None, timings
+
+    if routing_enabled:
+        # Run in a copy of this context so router tool calls land in the turn log
+        context = contextvars.copy_context()
+        routing_future = _routing_executor.submit(context.run, _timed_route, user_query, user_info)
+
+    result, routing_info = run_stage(
+        "answer", _stage_budget(),
+        _speculative_answer, domain, user_query, user_info, routing_future, routing_deadline,
+        conversation_context, timings
+    )
+    return result, routing_info, timings
+
+def fallback_answer(domain, user_query):
+    """Best-effort reply from the knowledge base when the crew ran out of time"""
+    apology = "I'm sorry, this is taking longer than expected."
+    try:
+        results = vector_db.search_knowledge(domain, user_query, n_results=1)
+        if results and results['documents'] and results['documents'][0]:
+            return f"{apology} Here is what I found that may help: {results['documents'][0][0]} " \
+                   "Please ask again if you need more detail."
+    except Exception as e:
+        print(f"Fallback knowledge search failed: {e}")
+    return f"{apology} Please try again in a moment or contact our support team."
+
+def remember_turn(session_id, user_query, turn, user_info, domain):
+    """Add an answered turn to the session's conversation memory"""
+    # A fallback answer does not address the message, so it is not remembered as one
+    if session_id and turn["domain"] in DOMAIN_CREWS and turn["mode"] != "deadline_fallback":
+        conversation_memory.add_turn(session_id, user_query, turn["response"], user_info, domain)
+
+def run_turn(domain, user_query, user_info, mode=None, routing_enabled=None, session_id=None, remember=True):
+    """Answer one customer message.
+
+    Returns a dict with the response text, the routing analysis (or None
+    when routing was skipped or too slow), per-stage timings in seconds
+    and whether the answer came from the semantic cache. LLM usage is
+    recorded against ``session_id`` and ``domain``.
+
+    The whole turn shares a TURN_DEADLINE_SECONDS budget. When it runs out
+    the crew is abandoned and a knowledge-base fallback answer is returned;
+    ``deadline["blown_stage"]`` names the stage that ran over.
+
+    With ``remember=False`` the caller adds the turn to conversation memory
+    itself, through remember_turn, once it knows the turn is final.
+    """
+    deadline = Deadline(TURN_DEADLINE_SECONDS)
+    with usage_context(session_id=session_id, domain=domain), deadline_scope(deadline), \
+            span("turn", domain=domain, session_id=session_id) as turn_span:
+        turn = _run_turn(domain, user_query, user_info, mode, routing_enabled, session_id)
+        turn_span.set_attributes(mode=turn.get("mode"), model_tier=turn.get("model_tier"),
+                                 blown_stage=deadline.blown_stage)
+    turn["deadline"] = deadline.to_dict()
+
+    if remember:
+        remember_turn(session_id, user_query, turn, user_info, domain)
+    return turn
+
+def _run_turn(domain, user_query, user_info, mode, routing_enabled, session_id):
+    mode = mode or AGENT_EXECUTION_MODE
+    routing_enabled = ROUTING_ENABLED if routing_enabled is None else routing_enabled
+    start = time.perf_counter()
+    conversation_context = conversation_memory.get_context(session_id)
+
+    # Questions naming an account, order or the customer never use the semantic cache
+    cacheable = (
+        semantic_cache.enabled
+        and domain in DOMAIN_CREWS
+        and not local_classifier.has_identifier(user_query)
+        and not mentions_customer_data(user_query, user_info)
+    )
+    # General questions about nothing the customer said before are answered
+    # without their details, so the answer can be shared with other customers
+    shareable = cacheable and not conversation_context and not local_classifier.is_personal(user_query)
+    crew_user_info = {} if shareable else user_info
+
+    if cacheable:
+        try:
+            cached = semantic_cache.lookup(domain, user_query)
+        except Exception as e:
+            print(f"Semantic cache lookup failed: {e}")
+            cached = None
+
+        if cached is not None:
+            answer, similarity = cached
+            return {
+                "response": answer,
+                "domain": domain,
+                "routing": None,
+                "mode": "semantic_cache",
+                "timings": {"total": time.perf_counter() - start},
+                "semantic_cache": {"hit": True, "similarity": similarity}
+            }
+
+    timed_out = False
+    with track_turn() as tool_log:
+        try:
+            if mode == "speculative":
+                result, routing_info, timings = run_speculative(
+                    domain, user_query, crew_user_info, routing_enabled, conversation_context=conversation_context
+                )
+            else:
+                result, routing_info, timings = run_sequential(
+                    domain, user_query, crew_user_info, routing_enabled, conversation_context
+                )
+        except DeadlineExceeded as e:
+            print(f"Turn abandoned: {e}")
+            timed_out = True
+            result, routing_info, timings = fallback_answer(domain, user_query), None, {}
+
+    timings["total"] = time.perf_counter() - start
+    response = "Invalid domain selected." if result is None else str(result)
+
+    # Only answers built without customer details, customer-specific tools
+    # or earlier conversation (which may hold account details) are stored.
+    # A crew the tool log never saw may have used any tool, so it fails closed.
+    stored = False
+    if shareable and result is not None and not timed_out \
+            and tool_log.observed(domain) and tool_log.customer_independent \
+            and not mentions_customer_data(response, user_info):
+        try:
+            stored = semantic_cache.store(domain, user_query, response, timings["answer"], True)
+        except Exception as e:
+            print(f"Semantic cache store failed: {e}")
+
+    return {
+        "response": response,
+        "domain": domain,
+        "routing": routing_info,
+        "mode": "deadline_fallback" if timed_out else mode,
+        "model_tier": None if timed_out or result is None else answer_tier(routing_info, timings),
+        "timings": timings,
+        "tool_calls": list(tool_log.tool_calls),
+        "semantic_cache": {"hit": False, "stored": stored}
+    }
@@ -0,0 +1,102 @@
+import threading
+from contextlib import contextmanager
+
+def _build_router():
+    from agents.router_crew import RouterCrew
+    return RouterCrew()
+
+def _build_ecommerce():
+    from agents.ecommerce_crew import EcommerceCrew
+    return EcommerceCrew()
+
+def _build_banking():
+    from agents.banking_crew import BankingCrew
+    return BankingCrew()
+
+def _build_telecom():
+    from agents.telecom_crew import TelecomCrew
+    return TelecomCrew()
+
+CREW_FACTORIES = {
+    "router": _build_router,
+    "ecommerce": _build_ecommerce,
+    "banking": _build_banking,
+    "telecom": _build_telecom
+}
+
+class CrewRegistry:
+    """Process-wide pool of ready-built crews.
+
+    Agents are expensive to construct, so each crew is built once and
+    reused across requests. A crew instance is checked out by one request
+    at a time; concurrent sessions get another pooled instance, which is
+    only built (a cold start) when every existing one is busy.
+    """
+
+    def __init__(self, factories=None):
+        self.factories = factories or CREW_FACTORIES
+        self._lock = threading.Lock()
+        self._idle = {name: [] for name in self.factories}
+        self._created = {name: 0 for name in self.factories}
+        self._warm = {name: 0 for name in self.factories}
+        self._cold = {name: 0 for name in self.factories}
+
+    def has(self, name):
+        return name in self.factories
+
+    def checkout(self, name):
+        """Take a crew out of the pool, building one if none are idle"""
+        if name not in self.factories:
+            raise KeyError(f"Unknown crew: {name}")
+
+        with self._lock:
+            if self._idle[name]:
+                self._warm[name] += 1
+                return self._idle[name].pop()
+            self._cold[name] += 1
+            self._created[name] += 1
+
+        # Build outside the lock so other crews stay available meanwhile
+        try:
+            return self.factories[name]()
+        except Exception:
+            with self._lock:
+                self._created[name] -= 1
+            raise
+
+    def checkin(self, name, crew):
+        """Return a crew to the pool"""
+        with self._lock:
+            self._idle[name].append(crew)
+
+    @contextmanager
+    def acquire(self, name):
+        crew = self.checkout(name)
+        try:
+            yield crew
+        finally:
+            self.checkin(name, crew)
+
+    def warm_up(self, names=None):
+        """Build one instance of each crew ahead of the first request"""
+        for name in names or self.factories:
+            with self._lock:
+                if self._idle[name]:
+                    continue
+            with self.acquire(name):
+                pass
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                name: {
+                    "instances": self._created[name],
+                    "idle": len(self._idle[name]),
+                    "warm": self._warm[name],
+                    "cold": self._cold[name]
+                }
+                for name in self.factories
+            }
+
+# Global crew registry
+crew_registry = CrewRegistry()
@@ -1,21 +1,87 @@
+import json
+import re
+from dataclasses import dataclass, field, asdict
 from crewai import Agent, Task, Crew
 from config.llm_config import llm
+from config.deadline import limit_agent
+from database.usage_ledger import usage_context
+from config.tracing import span
+from config.settings import ROUTER_CONFIDENCE_THRESHOLD, ROUTER_STRATEGY
+from agents.domain_classifier import local_classifier
 from tools.common_tools import get_customer_info, search_general_knowledge, get_system_status, validate_user_input
 
+VALID_DOMAINS = ["ecommerce", "banking", "telecom"]
+URGENCY_LEVELS = ["low", "medium", "high"]
+COMPLEXITY_LEVELS = ["simple", "complex"]
+
+@dataclass
+class RoutingResult:
+    """Structured outcome of routing a single customer query"""
+    domain: str
+    confidence: float
+    routed_by: str
+    intent: str = ""
+    urgency: str = "medium"
+    complexity: str = "simple"
+    tone: str = "neutral"
+    needed_info: list = field(default_factory=list)
+    intent_analysis: str = ""
+    routing_reason: str = ""
+    
+    def to_dict(self):
+        return asdict(self)
+
+def extract_domain(text, default="ecommerce"):
+    """Find the first valid domain name mentioned in free-form LLM output"""
+    text = str(text).lower()
+    for domain in VALID_DOMAINS:
+        if domain in text:
+            return domain
+    return default
+
+def extract_urgency(text, default="medium"):
+    """Pull an urgency level out of a free-form intent analysis"""
+    match = re.search(r"urgency(?: level)?[^a-z]*(low|medium|high)", str(text).lower())
+    return match.group(1) if match else default
+
+def extract_complexity(text, default="simple"):
+    """Pull the complexity rating out of a free-form intent analysis"""
+    match = re.search(r"complexity(?: level)?[^a-z]*(simple|complex)", str(text).lower())
+    return match.group(1) if match else default
+
+def parse_routing_json(raw_output):
+    """Parse the combined routing response, tolerating prose around the JSON.
+
+    Returns a dict, or None when no JSON object can be decoded.
+    """
+    text = str(raw_output).strip()
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
 class RouterCrew:
-    def __init__(self):
+    def __init__(self, confidence_threshold=ROUTER_CONFIDENCE_THRESHOLD, strategy=ROUTER_STRATEGY):
         self.tools = [get_customer_info, search_general_knowledge, get_system_status, validate_user_input]
+        self.confidence_threshold = confidence_threshold
+        self.strategy = strategy
+        self.local_classifier = local_classifier
         self.setup_agents()
     
     def setup_agents(self):
-        llm_config = llm.get_llm_config()
+        # Routing is short classification work, so it runs on the fast model
+        crew_llm = llm.get_crew_llm(role="router")
         
         self.domain_classifier = Agent(
             role="Domain Classification Specialist",
             goal="Analyze customer queries and determine the most appropriate domain",
             backstory="You are an expert at understanding customer inquiries and routing them to the right department.",
             tools=self.tools,
-            llm=llm_config["model"], 
+            llm=crew_llm, 
             verbose=True,
             allow_delegation=False
         )
@@ -25,7 +91,7 @@ class RouterCrew:
             goal="Understand the customer's specific intent and gather additional context",
             backstory="You are skilled at reading between the lines of customer messages.",
             tools=self.tools,
-            llm=llm_config["model"], 
+            llm=crew_llm, 
             verbose=True,
             allow_delegation=False
         )
@@ -35,6 +101,8 @@ class RouterCrew:
     def classify_domain(self, user_query, user_info=None):
         """Classify the domain for a user query"""
         
+        limit_agent(self.domain_classifier)
+        
         task = Task(
             description=f"""
             Analyze the following customer query and determine which domain it belongs to:
@@ -75,23 +143,18 @@ class RouterCrew:
         )
         
     
-        result = crew.kickoff()
-        
-        # Extract domain from result (clean up the response)
-        domain_result = str(result).lower().strip()
-        
-        # Ensure we return a valid domain
-        valid_domains = ["ecommerce", "banking", "telecom"]
-        for domain in valid_domains:
-            if domain in domain_result:
-                return domain
+        with usage_context(crew="router", agent=self.domain_classifier.role), \
+                span("router.classify_domain", agent=self.domain_classifier.role):
+            result = crew.kickoff()
         
-        # Default fallback
-        return "ecommerce"
+        # Extract domain from result, defaulting to ecommerce
+        return extract_domain(result)
     
     def analyze_intent(self, user_query, user_info=None):
         """Analyze customer intent and urgency"""
         
+        limit_agent(self.intent_analyzer)
+        
         task = Task(
             description=f"""
             Analyze the customer's intent and provide context for better service:
@@ -102,9 +165,10 @@ class RouterCrew:
             Analyze and provide:
             1. Primary intent (what does the customer want?)
             2. Urgency level (low, medium, high)
-            3. Emotional tone (frustrated, neutral, happy, confused)
-            4. Key information needed (what info might the agent need?)
-            5. Suggested approach (how should the agent handle this?)
+            3. Complexity (simple or complex - complex means several steps, policies or accounts involved, or careful judgement needed)
+            4. Emotional tone (frustrated, neutral, happy, confused)
+            5. Key information needed (what info might the agent need?)
+            6. Suggested approach (how should the agent handle this?)
             
             Consider:
             - Keywords indicating urgency (urgent, emergency, asap, immediately)
@@ -124,28 +188,170 @@ class RouterCrew:
         verbose=True
       )
         
-        result = crew.kickoff()
+        with usage_context(crew="router", agent=self.intent_analyzer.role), \
+                span("router.analyze_intent", agent=self.intent_analyzer.role):
+            result = crew.kickoff()
         return str(result)
     
-    def route_customer(self, user_query, user_info=None):
-        """Complete routing analysis - domain + intent"""
+    def fast_classify(self, user_query, user_info=None):
+        """Classify locally and only fall back to the LLM crew when unsure.
+
+        Returns (domain, confidence, routed_by) where routed_by is "local"
+        or "llm".
+        """
+        domain, confidence = self.local_classifier.classify(user_query)
+        
+        if confidence >= self.confidence_threshold:
+            return domain, confidence, "local"
         
-        # Get domain classification
-        domain = self.classify_domain(user_query, user_info)
+        return self.classify_domain(user_query, user_info), confidence, "llm"
+    
+    def analyze_combined(self, user_query, user_info=None):
+        """Classify domain and analyze intent with a single LLM call"""
         
-        # Get intent analysis
-        intent_analysis = self.analyze_intent(user_query, user_info)
+        limit_agent(self.intent_analyzer)
         
-        return {
-            "domain": domain,
-            "intent_analysis": intent_analysis,
-            "confidence": "high",  # You could implement confidence scoring
-            "routing_reason": f"Query classified as {domain} based on content analysis"
-        }
+        task = Task(
+            description=f"""
+            Analyze the following customer query for routing:
+            
+            Customer Query: "{user_query}"
+            Customer Info: {user_info if user_info else "Not provided"}
+            
+            Available domains:
+            1. ecommerce - Orders, shipping, returns, products, refunds, tracking, shopping
+            2. banking - Account balance, transactions, payments, cards, loans, transfers
+            3. telecom - Phone bills, data usage, network issues, plan changes, roaming
+            
+            Respond with ONLY a JSON object, no other text, using exactly these keys:
+            {{
+                "domain": "ecommerce" | "banking" | "telecom",
+                "confidence": number between 0 and 1,
+                "intent": "one sentence describing what the customer wants",
+                "urgency": "low" | "medium" | "high",
+                "complexity": "simple" | "complex",
+                "tone": "frustrated" | "neutral" | "happy" | "confused",
+                "needed_info": ["information the agent will need"]
+            }}
+            """,
+            agent=self.intent_analyzer,
+            expected_output="A single JSON object with domain, confidence, intent, urgency, complexity, tone and needed_info"
+        )
+        
+        crew = Crew(
+            agents=[self.intent_analyzer],
+            tasks=[task],
+            verbose=True
+        )
+        
+        with usage_context(crew="router", agent=self.intent_analyzer.role), \
+                span("router.analyze_combined", agent=self.intent_analyzer.role):
+            result = crew.kickoff()
+        return self.parse_combined_result(result)
+    
+    def parse_combined_result(self, raw_output):
+        """Turn the combined routing response into a RoutingResult"""
+        data = parse_routing_json(raw_output)
+        
+        if data is None:
+            # Malformed output: fall back to the substring domain match
+            return RoutingResult(
+                domain=extract_domain(raw_output),
+                confidence=0.0,
+                routed_by="llm",
+                urgency=extract_urgency(raw_output),
+                complexity=extract_complexity(raw_output),
+                intent_analysis=str(raw_output)
+            )
+        
+        domain = str(data.get("domain", "")).lower().strip()
+        if domain not in VALID_DOMAINS:
+            domain = extract_domain(domain)
+        
+        try:
+            confidence = min(1.0, max(0.0, float(data.get("confidence", 0.0))))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        
+        urgency = str(data.get("urgency", "medium")).lower().strip()
+        if urgency not in URGENCY_LEVELS:
+            urgency = "medium"
+        
+        complexity = str(data.get("complexity", "simple")).lower().strip()
+        if complexity not in COMPLEXITY_LEVELS:
+            complexity = "simple"
+        
+        needed_info = data.get("needed_info") or []
+        if isinstance(needed_info, str):
+            needed_info = [needed_info]
+        
+        intent = str(data.get("intent", ""))
+        tone = str(data.get("tone", "neutral")).lower().strip()
+        
+        return RoutingResult(
+            domain=domain,
+            confidence=confidence,
+            routed_by="llm",
+            intent=intent,
+            urgency=urgency,
+            complexity=complexity,
+            tone=tone,
+            needed_info=[str(item) for item in needed_info],
+            intent_analysis=(
+                f"Intent: {intent}\nUrgency: {urgency}\nComplexity: {complexity}\nTone: {tone}\n"
+                f"Needed info: {', '.join(str(item) for item in needed_info) or 'None'}"
+            )
+        )
+    
+    def route(self, user_query, user_info=None):
+        """Complete routing analysis as a RoutingResult"""
+        
+        local_domain, local_confidence = self.local_classifier.classify(user_query)
+        confident = local_confidence >= self.confidence_threshold
+        
+        if self.strategy == "combined":
+            # One LLM call for domain + intent; a confident local
+            # classification still wins over the LLM's domain
+            result = self.analyze_combined(user_query, user_info)
+            if confident:
+                result.domain = local_domain
+                result.confidence = local_confidence
+                result.routed_by = "local"
+        else:
+            if confident:
+                domain, confidence, routed_by = local_domain, local_confidence, "local"
+            else:
+                domain, confidence, routed_by = self.classify_domain(user_query, user_info), local_confidence, "llm"
+            
+            intent_analysis = self.analyze_intent(user_query, user_info)
+            result = RoutingResult(
+                domain=domain,
+                confidence=confidence,
+                routed_by=routed_by,
+                urgency=extract_urgency(intent_analysis),
+                complexity=extract_complexity(intent_analysis),
+                intent_analysis=intent_analysis
+            )
+        
+        if result.routed_by == "local":
+            result.routing_reason = f"Query classified as {result.domain} by local keyword classifier (confidence {result.confidence:.2f})"
+        else:
+            result.routing_reason = f"Query classified as {result.domain} by LLM (local confidence {local_confidence:.2f} below {self.confidence_threshold:.2f})"
+        
+        return result
+    
+    def route_customer(self, user_query, user_info=None):
+        """Complete routing analysis - domain + intent"""
+        with span("router.route", strategy=self.strategy) as route_span:
+            result = self.route(user_query, user_info)
+            route_span.set_attributes(domain=result.domain, routed_by=result.routed_by,
+                                      urgency=result.urgency, complexity=result.complexity)
+            return result.to_dict()
     
     def get_domain_from_query(self, user_query, user_info=None):
         """Simple method to get just the domain (used by main app)"""
-        return self.classify_domain(user_query, user_info)
+        domain, _, _ = self.fast_classify(user_query, user_info)
+        return domain
 
 # Example usage and testing
 if __name__ == "__main__":
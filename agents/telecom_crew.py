@@ -1,5 +1,8 @@
 from crewai import Agent, Task, Crew
 from config.llm_config import llm
+from config.deadline import limit_agent
+from database.usage_ledger import usage_context
+from config.tracing import span
 from tools.telecom_tools import get_telecom_account_info, get_data_usage, search_telecom_knowledge, check_network_status
 
 class TelecomCrew:
@@ -8,14 +11,17 @@ class TelecomCrew:
         self.setup_agents()
     
     def setup_agents(self):
-        llm_config = llm.get_llm_config()
+        # Lookup agents mostly relay tool results, so they stay on the fast model
+        lookup_llm = llm.get_crew_llm(role="lookup")
+        crew_llm = llm.get_crew_llm(role="answer")
+        self.llms = [lookup_llm, crew_llm]
         
         self.technical_support = Agent(
             role="Telecom Technical Support Specialist",
             goal="Provide technical assistance for network issues, connectivity problems, and device troubleshooting",
             backstory="You are a skilled technical support specialist with deep knowledge of telecommunications networks and mobile technologies.",
             tools=self.tools,
-            llm=llm_config["model"],  
+            llm=crew_llm,  
             verbose=True
         )
         
@@ -24,16 +30,19 @@ class TelecomCrew:
             goal="Handle billing inquiries, plan changes, usage questions, and account management",
             backstory="You are an experienced billing specialist who helps customers understand their telecom services, usage, and billing.",
             tools=self.tools,
-            llm=llm_config["model"],  
+            llm=lookup_llm,  
             verbose=True
         )
-    
 
+        # Agents and crews are built once per pooled instance
+        self.crews = {agent.role: self.build_crew(agent) for agent in (self.technical_support, self.billing_specialist)}
 
-    def handle_query(self, user_query, customer_info):
+    def build_crew(self, agent):
+        """A crew led by ``agent``, built once; each query only fills in the task template"""
         task = Task(
-            description=f"""
+            description="""
             Customer Information: {customer_info}
+            Conversation So Far: {conversation_context}
             Customer Query: {user_query}
             
             Please help this telecom customer with their inquiry. Use the available tools to:
@@ -44,17 +53,30 @@ class TelecomCrew:
             
             Be technical when needed but explain things clearly for the customer.
             """,
-            agent=self.determine_best_agent(user_query),
+            agent=agent,
             expected_output="A helpful technical or billing response to the customer's telecom inquiry"
         )
-        
-        crew = Crew(
-        agents=[self.technical_support, self.billing_specialist],
-        tasks=[task],
-        verbose=True
+        return Crew(
+            agents=[self.technical_support, self.billing_specialist],
+            tasks=[task],
+            verbose=True
         )
-        
-        result = crew.kickoff()
+
+    def handle_query(self, user_query, customer_info, conversation_context=None, tier=None):
+        # The tier ("strong" for an escalation) is set on the LLMs themselves,
+        # as CrewAI may call them from a thread without this context
+        for crew_llm in self.llms:
+            crew_llm.tier = tier
+        # Iteration limits shrink to fit the request deadline
+        agent = limit_agent(self.determine_best_agent(user_query))
+        inputs = {
+            "customer_info": str(customer_info) if customer_info else "Not provided",
+            "conversation_context": conversation_context or "This is the start of the conversation.",
+            "user_query": user_query
+        }
+
+        with usage_context(crew="telecom", agent=agent.role), span("crew.telecom", domain="telecom", agent=agent.role):
+            result = self.crews[agent.role].kickoff(inputs=inputs)
         return result
     
     def determine_best_agent(self, query):
@@ -0,0 +1,192 @@
+"""Headless HTTP API for the support crews.
+
+Runs alongside (or instead of) the Streamlit UI and shares its crews, the
+SQLite database and the vector store. Crew runs are blocking, so they
+execute on a bounded thread pool; requests beyond API_MAX_PENDING waiting
+runs are turned away with 503 instead of queueing without limit.
+
+    uvicorn api.server:app --host 0.0.0.0 --port 8000
+"""
+import json
+import uuid
+import asyncio
+from typing import Literal
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from config.settings import API_HOST, API_PORT, API_WORKERS, API_MAX_PENDING
+from config.llm_config import llm, stream_final_answer
+from config.deadline import stage_executor
+from agents.pipeline import DOMAIN_CREWS, route_query, run_turn
+from agents.registry import crew_registry
+from database.sql_manager import db
+from database.vector_manager import vector_db
+from tools.tool_metrics import tool_metrics
+
+class RouteRequest(BaseModel):
+    query: str
+    user_info: dict = Field(default_factory=dict)
+
+class ChatRequest(BaseModel):
+    domain: str
+    query: str
+    user_info: dict = Field(default_factory=dict)
+    session_id: str = None
+    mode: Literal["sequential", "speculative"] | None = None
+
+class CrewRunner:
+    """Bounded pool for blocking crew runs, shared by all requests"""
+
+    def __init__(self, workers=API_WORKERS, max_pending=API_MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-crew")
+        # Running plus waiting runs; past this the API sheds load
+        self.slots = asyncio.Semaphore(workers + max_pending)
+        self.active = 0
+
+    async def acquire(self):
+        """Claim a slot for one run, or raise 503 when the API is saturated"""
+        if self.slots.locked():
+            raise HTTPException(status_code=503, detail="Too many requests in progress, try again shortly")
+        # A free slot was just seen, so this returns without waiting
+        await self.slots.acquire()
+
+    def submit(self, func, *args):
+        """Start func in a slot claimed with acquire(); the slot is freed when the run really ends"""
+        loop = asyncio.get_running_loop()
+        self.active += 1
+        try:
+            job = self.executor.submit(func, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Called from the worker thread, and even if the awaiting request is cancelled
+        job.add_done_callback(lambda _: self._release_soon(loop))
+        return asyncio.wrap_future(job)
+
+    def _release_soon(self, loop):
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # The event loop closed with the server
+
+    def _release(self):
+        self.active -= 1
+        self.slots.release()
+
+    async def run(self, func, *args):
+        await self.acquire()
+        return await self.submit(func, *args)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+runner = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global runner
+    runner = CrewRunner()
+    # Build one of each crew before taking traffic
+    await asyncio.get_running_loop().run_in_executor(runner.executor, crew_registry.warm_up)
+    yield
+    runner.shutdown()
+    await llm.aclose()
+
+app = FastAPI(title="Support Crew API", lifespan=lifespan)
+
+def check_domain(domain):
+    if domain not in DOMAIN_CREWS:
+        raise HTTPException(status_code=400, detail=f"domain must be one of {', '.join(DOMAIN_CREWS)}")
+
+def chat_turn(request, session_id):
+    return run_turn(request.domain, request.query, request.user_info, mode=request.mode, session_id=session_id)
+
+@app.get("/health")
+async def health():
+    """Liveness plus the state of the database, vector store, LLM and crews"""
+    checks = {}
+    try:
+        db.fetch_one("SELECT 1")
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+    checks["vector_store"] = "ok" if vector_db.collections else "no collections"
+
+    status = "ok" if all(value == "ok" for value in checks.values()) else "degraded"
+    return {
+        "status": status,
+        "checks": checks,
+        "crews": crew_registry.get_stats(),
+        "workers": {"active": runner.active if runner else 0, "limit": API_WORKERS, "max_pending": API_MAX_PENDING},
+        "stages": stage_executor.get_stats(),
+        "llm": llm.scheduler.get_stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Tool call counts, errors and latency histograms in Prometheus text format"""
+    return PlainTextResponse(tool_metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/tools")
+async def tool_metrics_snapshot():
+    """The same tool metrics as JSON, with p50/p95/p99 latency per tool and agent role"""
+    return tool_metrics.snapshot()
+
+@app.post("/route")
+async def route(request: RouteRequest):
+    """Domain, urgency and intent analysis for a query, without answering it"""
+    return await runner.run(route_query, request.query, request.user_info)
+
+@app.post("/chat")
+async def chat(request: ChatRequest):
+    """Answer one customer message; pass the returned session_id back to continue the conversation"""
+    check_domain(request.domain)
+    session_id = request.session_id or uuid.uuid4().hex
+    turn = await runner.run(chat_turn, request, session_id)
+    return dict(turn, session_id=session_id)
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Answer one customer message as server-sent events.
+
+    "answer" events carry the final answer text so far; a closing "done"
+    event carries the full turn result.
+    """
+    check_domain(request.domain)
+    session_id = request.session_id or uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    updates = asyncio.Queue()
+
+    def streamed_turn():
+        with stream_final_answer(lambda text: loop.call_soon_threadsafe(updates.put_nowait, text)):
+            return chat_turn(request, session_id)
+
+    # Claim a worker before the response starts so overload is still a 503
+    await runner.acquire()
+    task = runner.submit(streamed_turn)
+
+    async def events():
+        while True:
+            getter = asyncio.ensure_future(updates.get())
+            done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield f"event: answer\ndata: {json.dumps({'text': getter.result()})}\n\n"
+                continue
+            getter.cancel()
+            break
+
+        while not updates.empty():
+            yield f"event: answer\ndata: {json.dumps({'text': updates.get_nowait()})}\n\n"
+        try:
+            turn = dict(task.result(), session_id=session_id)
+            yield f"event: done\ndata: {json.dumps(turn, default=str)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=API_HOST, port=API_PORT)
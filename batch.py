@@ -0,0 +1,272 @@
+"""Run a JSONL file of customer queries through the support crews.
+
+Each input line is a JSON object with "domain", "query" and optionally
+"user_info", "session_id" and "id" (defaults to the line number):
+
+    {"id": "T-1001", "domain": "banking", "user_info": {"name": "Jane Johnson"}, "query": "What's my balance?"}
+
+Results are appended to the output file as they finish, in input order by
+default. Records already present in the output are skipped, so an
+interrupted run resumes where it stopped.
+
+    python batch.py tickets.jsonl results.jsonl --workers 8
+    python batch.py tickets.jsonl results.jsonl --executor process --workers 4 --unordered
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from benchmarks.pipeline_benchmark import percentile
+
+# Records in flight when a worker process dies are retried this many times
+MAX_WORKER_CRASHES = 2
+
+def read_records(path, skip_ids):
+    """Yield (record_id, record) from the input file, skipping finished ids"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping malformed line {line_number}: {e}")
+                continue
+            record_id = str(record.get("id", line_number))
+            if record_id not in skip_ids:
+                yield record_id, record
+
+def completed_ids(path, retry_errors=False):
+    """Ids already written to the output, dropping a line cut short by a crash"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    valid_bytes = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            try:
+                result = json.loads(raw)
+                if not (retry_errors and result.get("error")):
+                    done.add(str(result["id"]))
+            except (json.JSONDecodeError, KeyError, UnicodeDecodeError):
+                break
+            valid_bytes += len(raw)
+
+    if valid_bytes < os.path.getsize(path):
+        with open(path, "rb+") as f:
+            f.truncate(valid_bytes)
+    return done
+
+def process_record(record_id, record):
+    """Answer one record; runs in a worker thread or process"""
+    from agents.pipeline import run_turn
+
+    start = time.perf_counter()
+    result = {"id": record_id, "domain": record.get("domain"), "query": record.get("query")}
+    try:
+        turn = run_turn(
+            record["domain"],
+            record["query"],
+            record.get("user_info") or {},
+            session_id=record.get("session_id")
+        )
+        result.update({
+            "response": turn["response"],
+            "mode": turn["mode"],
+            "routing": turn.get("routing"),
+            "tool_calls": turn.get("tool_calls", []),
+            "timings": turn["timings"],
+            "error": None
+        })
+    except Exception as e:
+        result.update({"response": None, "error": f"{type(e).__name__}: {e}"})
+    result["latency"] = time.perf_counter() - start
+    return result
+
+class BatchWriter:
+    """Append results to the output file, in input order unless ``ordered`` is False"""
+
+    def __init__(self, path, ordered=True):
+        self.file = open(path, "a", encoding="utf-8")
+        self.ordered = ordered
+        self.pending = {}
+        self.next_index = 0
+        self.results = []
+
+    def add(self, index, result):
+        self.pending[index] = result
+        if not self.ordered:
+            self._write(self.pending.pop(index))
+            return
+        # Hold results back until everything before them is written
+        while self.next_index in self.pending:
+            self._write(self.pending.pop(self.next_index))
+            self.next_index += 1
+
+    def skip(self, index):
+        """Account for an index that will never produce a result"""
+        self.add(index, None)
+
+    def _write(self, result):
+        if result is None:
+            return
+        self.file.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        self.file.flush()
+        self.results.append(result)
+
+    def close(self):
+        self.file.close()
+
+def crashed_result(record_id, record, crashes):
+    """Error result for a record whose worker process kept dying"""
+    return {
+        "id": record_id,
+        "domain": record.get("domain"),
+        "query": record.get("query"),
+        "response": None,
+        "error": f"BrokenProcessPool: worker process died {crashes} times while this record was in flight",
+        "latency": 0.0
+    }
+
+def run_batch(input_path, output_path, workers=4, executor="thread", ordered=True, limit=None, retry_errors=False):
+    """Answer every new input record, appending results to the output file.
+
+    A worker process that dies breaks the whole process pool: the pool is
+    replaced and the records that were in flight are submitted again one
+    at a time, so a record that kills its worker cannot take others down
+    with it. A record whose worker dies more than MAX_WORKER_CRASHES times
+    is written as an error.
+    """
+    done = completed_ids(output_path, retry_errors)
+    if done:
+        print(f"Resuming: {len(done)} records already in {output_path}")
+
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    writer = BatchWriter(output_path, ordered)
+    records = read_records(input_path, done)
+    # Keep a bounded number of records in flight so huge inputs stream through
+    max_in_flight = workers * 2
+    # future -> (index, record_id, record, pool generation)
+    in_flight = {}
+    # Records to submit again after a worker crash, ahead of new input
+    retries = deque()
+    crashes = {}
+    submitted = 0
+    start = time.perf_counter()
+
+    pool = pool_class(max_workers=workers)
+    generation = 0
+
+    def replace_pool(broken_generation):
+        """Swap in a fresh pool, once per broken one"""
+        nonlocal pool, generation
+        if broken_generation == generation:
+            print("A worker process died; restarting the pool")
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = pool_class(max_workers=workers)
+            generation += 1
+
+    try:
+        while True:
+            # Nothing else is submitted while a record retried after a crash runs
+            while len(in_flight) < max_in_flight and not any(entry[0] in crashes for entry in in_flight.values()):
+                if retries:
+                    if in_flight:
+                        break
+                    item = retries.popleft()
+                elif limit is None or submitted < limit:
+                    try:
+                        record_id, record = next(records)
+                    except StopIteration:
+                        break
+                    item = (submitted, record_id, record)
+                    submitted += 1
+                else:
+                    break
+                try:
+                    in_flight[pool.submit(process_record, item[1], item[2])] = item + (generation,)
+                except BrokenProcessPool:
+                    retries.appendleft(item)
+                    replace_pool(generation)
+
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, record_id, record, pool_generation = in_flight.pop(future)
+                try:
+                    writer.add(index, future.result())
+                except BrokenProcessPool:
+                    replace_pool(pool_generation)
+                    crashes[index] = crashes.get(index, 0) + 1
+                    if crashes[index] > MAX_WORKER_CRASHES:
+                        print(f"Record #{index} ({record_id}) gave up after {crashes[index]} worker crashes")
+                        writer.add(index, crashed_result(record_id, record, crashes[index]))
+                    else:
+                        retries.append((index, record_id, record))
+                except Exception as e:
+                    # The record could not be handed to the worker (e.g. it does not pickle)
+                    print(f"Record #{index} failed: {e}")
+                    writer.skip(index)
+
+            completed = len(writer.results)
+            if completed and completed % 50 == 0:
+                print(f"{completed} records done ({completed / (time.perf_counter() - start):.2f}/s)")
+    except KeyboardInterrupt:
+        print("Interrupted; finished records are saved, rerun to resume")
+    finally:
+        pool.shutdown(cancel_futures=True)
+        writer.close()
+
+    return summarize(writer.results, time.perf_counter() - start)
+
+def summarize(results, elapsed):
+    latencies = [r["latency"] for r in results]
+    errors = sum(1 for r in results if r.get("error"))
+    return {
+        "records": len(results),
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "throughput_per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99)
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of support queries with the agent crews")
+    parser.add_argument("input", help="JSONL file of {domain, user_info, query} records")
+    parser.add_argument("output", help="JSONL file results are appended to")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="Threads share one crew pool; processes each build their own crews")
+    parser.add_argument("--unordered", action="store_true", help="Write results as they finish, keyed by id")
+    parser.add_argument("--limit", type=int, help="Process at most this many new records")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="On resume, rerun records that failed (the newer result line wins)")
+    parser.add_argument("--summary", help="Also write the summary to this JSON file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    summary = run_batch(
+        args.input, args.output, args.workers, args.executor, not args.unordered, args.limit, args.retry_errors
+    )
+
+    print(f"\nProcessed {summary['records']} records ({summary['errors']} errors) "
+          f"in {summary['elapsed_seconds']:.1f}s - {summary['throughput_per_second']:.2f} records/s")
+    print(f"Latency: mean {summary['latency_mean']:.2f}s, p50 {summary['latency_p50']:.2f}s, "
+          f"p95 {summary['latency_p95']:.2f}s, p99 {summary['latency_p99']:.2f}s")
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+    sys.exit(1 if summary["errors"] else 0)
@@ -0,0 +1,413 @@
+"""Offline stand-in for an OpenAI-compatible chat completions API.
+
+Point the app at it with LLM_BASE_URL=http://127.0.0.1:8765/v1 to run the
+whole pipeline without network access. Replies are rule-based (or scripted
+from a JSON file), latency follows a configurable time-to-first-token and
+token-rate model, and 429/500 errors can be injected at fixed rates.
+
+    python -m benchmarks.mock_llm_server --port 8765 --ttft-ms 300 --tokens-per-second 40
+"""
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import itertools
+import threading
+from dataclasses import dataclass, field, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DOMAIN_WORDS = {
+    "ecommerce": ["order", "shipping", "delivery", "return", "refund", "product", "track", "package"],
+    "banking": ["account", "balance", "transaction", "transfer", "card", "loan", "payment", "bank"],
+    "telecom": ["data", "plan", "network", "signal", "roaming", "bill", "phone", "call"]
+}
+
+ID_PATTERN = re.compile(r"\b(?:ORD|TRK|PROD|ACC|TXN)[-_]?\d+\b|\b\d{3}-\d{4}\b", re.IGNORECASE)
+REACT_TOOL_PATTERN = re.compile(r"Tool Name: ([\w-]+)\s*\nTool Arguments: (\{.*?\})\s*\n", re.DOTALL)
+
+FILLER = (
+    "I have checked the details on our side and here is what you need to know. "
+    "Please let me know if there is anything else I can help you with today."
+).split()
+
+@dataclass
+class MockLLMConfig:
+    """Behaviour of the mock server; every field has a command-line flag"""
+    seed: int = 0
+    ttft_ms: float = 300.0
+    ttft_jitter: str = "lognormal"      # fixed, uniform or lognormal
+    ttft_sigma: float = 0.4
+    tokens_per_second: float = 40.0
+    completion_tokens: int = 80
+    tool_use_rate: float = 0.5
+    error_429_rate: float = 0.0
+    error_500_rate: float = 0.0
+    retry_after_seconds: float = 1.0
+    script_path: str = None
+    rules: list = field(default_factory=list)
+
+    def load_script(self):
+        """Read scripted replies: a JSON list of {"pattern": regex, "response": text}"""
+        if self.script_path:
+            with open(self.script_path) as f:
+                self.rules = [(re.compile(rule["pattern"], re.IGNORECASE), rule["response"]) for rule in json.load(f)]
+
+def count_tokens(text):
+    return max(1, len(str(text)) // 4)
+
+def message_text(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+def guess_domain(text):
+    text = text.lower()
+    scores = {domain: sum(text.count(word) for word in words) for domain, words in DOMAIN_WORDS.items()}
+    return max(scores, key=scores.get)
+
+def customer_query(prompt):
+    """The customer's words inside a CrewAI task prompt, or the whole prompt"""
+    match = re.search(r"Customer Query:\s*\"?([^\n\"]+)", prompt)
+    return match.group(1).strip() if match else prompt.strip()[-300:]
+
+class MockResponder:
+    """Decide what the mock model says for a given request"""
+
+    def __init__(self, config):
+        self.config = config
+
+    def _filler(self, rng, tokens):
+        offset = rng.randrange(len(FILLER))
+        words = []
+        while count_tokens(" ".join(words)) < tokens:
+            words.append(FILLER[(offset + len(words)) % len(FILLER)])
+        return " ".join(words)
+
+    def _answer(self, rng, query):
+        tokens = max(5, int(rng.gauss(self.config.completion_tokens, self.config.completion_tokens * 0.2)))
+        return f"Thanks for your question about \"{query[:80]}\". {self._filler(rng, tokens)}"
+
+    def _tool_arguments(self, schema, query):
+        """Fill a tool's arguments from identifiers in the query"""
+        ids = ID_PATTERN.findall(query)
+        arguments = {}
+        for index, name in enumerate(schema):
+            if "query" in name or "question" in name:
+                arguments[name] = query
+            else:
+                arguments[name] = ids[index] if index < len(ids) else (ids[0] if ids else "unknown")
+        return arguments
+
+    def _pick_tool(self, names, query):
+        words = set(re.findall(r"[a-z]+", query.lower()))
+        for name in names:
+            if words & set(name.lower().split("_")):
+                return name
+        return names[0]
+
+    def _react_step(self, rng, prompt, query):
+        """ReAct text as emitted by CrewAI agents without native function calling"""
+        tools = REACT_TOOL_PATTERN.findall(prompt)
+        if tools and "Observation:" not in prompt and rng.random() < self.config.tool_use_rate:
+            names = [name for name, _ in tools]
+            name = self._pick_tool(names, query)
+            schema = dict(tools)[name]
+            try:
+                argument_names = list(json.loads(schema.replace("'", '"')).keys())
+            except json.JSONDecodeError:
+                argument_names = re.findall(r"'(\w+)':\s*\{", schema)
+            return (
+                f"Thought: I should look this up with {name}.\n"
+                f"Action: {name}\n"
+                f"Action Input: {json.dumps(self._tool_arguments(argument_names, query))}"
+            )
+        return f"Thought: I now know the final answer\nFinal Answer: {self._answer(rng, query)}"
+
+    def reply(self, rng, request):
+        """Return (content, tool_calls) for a chat completions request"""
+        messages = request.get("messages") or []
+        prompt = "\n".join(message_text(message) for message in messages)
+        last_user = next((message_text(m) for m in reversed(messages) if m.get("role") == "user"), prompt)
+        query = customer_query(prompt)
+
+        for pattern, response in self.config.rules:
+            if pattern.search(last_user):
+                return response, None
+
+        tools = request.get("tools")
+        if tools and messages and messages[-1].get("role") != "tool" and rng.random() < self.config.tool_use_rate:
+            names = [tool["function"]["name"] for tool in tools if tool.get("type") == "function"]
+            name = self._pick_tool(names, query)
+            parameters = next(t["function"].get("parameters", {}) for t in tools if t["function"]["name"] == name)
+            arguments = self._tool_arguments(list(parameters.get("properties", {})), query)
+            return None, [{
+                "id": f"call_{rng.getrandbits(48):012x}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)}
+            }]
+
+        if "PASS" in prompt and "FAIL" in prompt:
+            return "PASS", None
+        if "Respond with ONLY a JSON object" in prompt:
+            domain = guess_domain(query)
+            return json.dumps({
+                "domain": domain,
+                "confidence": 0.9,
+                "intent": f"Customer needs help with {domain}",
+                "urgency": "high" if re.search(r"urgent|asap|immediately", query, re.I) else "medium",
+                "complexity": "complex" if len(query.split()) > 40 else "simple",
+                "tone": "neutral",
+                "needed_info": []
+            }), None
+        if "running summary" in prompt:
+            return f"The customer asked about: {query[:200]}", None
+        if "Final Answer:" in prompt:
+            if "Available domains" in prompt:
+                return f"Thought: I now know the final answer\nFinal Answer: {guess_domain(query)}", None
+            return self._react_step(rng, prompt, query), None
+        return self._answer(rng, query), None
+
+class MockLLMServer:
+    """Threaded HTTP server speaking the chat completions protocol"""
+
+    def __init__(self, host="127.0.0.1", port=8765, config=None):
+        self.config = config or MockLLMConfig()
+        self.config.load_script()
+        self.responder = MockResponder(self.config)
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors_429": 0, "errors_500": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve in a background thread (for benchmarks) and return self"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _ttft(self, rng):
+        base = self.config.ttft_ms / 1000
+        if self.config.ttft_jitter == "uniform":
+            return rng.uniform(0.5 * base, 1.5 * base)
+        if self.config.ttft_jitter == "lognormal":
+            # Median stays at ttft_ms, with a long right tail
+            return base * math.exp(rng.gauss(0, self.config.ttft_sigma))
+        return base
+
+    def _fault(self, rng):
+        roll = rng.random()
+        if roll < self.config.error_429_rate:
+            return 429
+        if roll < self.config.error_429_rate + self.config.error_500_rate:
+            return 500
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                elif self.path.rstrip("/").endswith("/stats"):
+                    with server._lock:
+                        self._send_json(200, dict(server.stats, config=asdict(server.config, dict_factory=_plain)))
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    request = json.loads(raw or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "Request body is not JSON"}})
+                    return
+                server._count("requests")
+
+                # Faults and latency vary per request; content depends only on the prompt
+                index = next(server._request_ids)
+                timing_rng = random.Random(f"{server.config.seed}:{index}")
+                digest = hashlib.sha256(raw).hexdigest()
+                content_rng = random.Random(f"{server.config.seed}:{digest}")
+
+                status = server._fault(timing_rng)
+                if status == 429:
+                    server._count("errors_429")
+                    self._send_json(429, {"error": {"message": "Rate limit exceeded (mock)", "type": "rate_limit"}},
+                                    {"Retry-After": str(server.config.retry_after_seconds)})
+                    return
+                if status == 500:
+                    server._count("errors_500")
+                    self._send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+                    return
+
+                content, tool_calls = server.responder.reply(content_rng, request)
+                stop = request.get("stop") or []
+                if content and stop:
+                    # Honour stop sequences like a real model
+                    for sequence in ([stop] if isinstance(stop, str) else stop):
+                        if sequence in content:
+                            content = content[:content.index(sequence)]
+
+                prompt_tokens = sum(count_tokens(message_text(m)) for m in request.get("messages") or [])
+                completion_tokens = count_tokens(content or json.dumps(tool_calls))
+                if request.get("max_tokens"):
+                    completion_tokens = min(completion_tokens, int(request["max_tokens"]))
+                server._count("prompt_tokens", prompt_tokens)
+                server._count("completion_tokens", completion_tokens)
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+
+                ttft = server._ttft(timing_rng)
+                per_token = 1 / server.config.tokens_per_second if server.config.tokens_per_second > 0 else 0
+                completion_id = f"chatcmpl-mock-{index}"
+                model = request.get("model", "mock")
+
+                if request.get("stream"):
+                    self._stream(completion_id, model, content, tool_calls, usage, ttft, per_token,
+                                 (request.get("stream_options") or {}).get("include_usage"))
+                    return
+
+                time.sleep(ttft + per_token * completion_tokens)
+                message = {"role": "assistant", "content": content}
+                if tool_calls:
+                    message["tool_calls"] = tool_calls
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": message,
+                        "finish_reason": "tool_calls" if tool_calls else "stop"
+                    }],
+                    "usage": usage
+                })
+
+            def _stream(self, completion_id, model, content, tool_calls, usage, ttft, per_token, include_usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def chunk(delta, finish_reason=None, chunk_usage=None):
+                    body = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [] if delta is None else [
+                            {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                        ]
+                    }
+                    if chunk_usage:
+                        body["usage"] = chunk_usage
+                    self.wfile.write(f"data: {json.dumps(body)}\n\n".encode())
+                    self.wfile.flush()
+
+                time.sleep(ttft)
+                chunk({"role": "assistant", "content": ""})
+                if tool_calls:
+                    chunk({"tool_calls": [dict(call, index=i) for i, call in enumerate(tool_calls)]})
+                else:
+                    # Roughly one token per chunk
+                    for start in range(0, len(content), 4):
+                        time.sleep(per_token)
+                        chunk({"content": content[start:start + 4]})
+                chunk({}, "tool_calls" if tool_calls else "stop")
+                if include_usage:
+                    chunk(None, chunk_usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+def _plain(items):
+    # Compiled script rules are not JSON serializable; report how many there are
+    return {key: (len(value) if key == "rules" else value) for key, value in items}
+
+def parse_args():
+    defaults = MockLLMConfig()
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--ttft-ms", type=float, default=defaults.ttft_ms, help="Median time to first token")
+    parser.add_argument("--ttft-jitter", choices=["fixed", "uniform", "lognormal"], default=defaults.ttft_jitter)
+    parser.add_argument("--ttft-sigma", type=float, default=defaults.ttft_sigma, help="Lognormal sigma")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens,
+                        help="Mean length of generated answers")
+    parser.add_argument("--tool-use-rate", type=float, default=defaults.tool_use_rate,
+                        help="Chance an agent's first step calls a tool")
+    parser.add_argument("--error-429-rate", type=float, default=defaults.error_429_rate)
+    parser.add_argument("--error-500-rate", type=float, default=defaults.error_500_rate)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after_seconds)
+    parser.add_argument("--script", help="JSON list of {\"pattern\": regex, \"response\": text} replies")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = MockLLMConfig(
+        seed=args.seed,
+        ttft_ms=args.ttft_ms,
+        ttft_jitter=args.ttft_jitter,
+        ttft_sigma=args.ttft_sigma,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        tool_use_rate=args.tool_use_rate,
+        error_429_rate=args.error_429_rate,
+        error_500_rate=args.error_500_rate,
+        retry_after_seconds=args.retry_after,
+        script_path=args.script
+    )
+    server = MockLLMServer(args.host, args.port, config)
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,248 @@
+"""End-to-end benchmark of the support pipeline.
+
+Drives the sample questions of every domain through RouterCrew.route_customer
+and each crew's handle_query, and reports per-stage p50/p95/p99 latency,
+LLM calls, tool calls and tokens per turn, plus peak RSS.
+
+    # Against the in-process mock LLM (default)
+    python -m benchmarks.pipeline_benchmark --iterations 3 --output bench.json
+
+    # Against a recorded cassette, failing on regressions versus a baseline
+    python -m benchmarks.pipeline_benchmark --llm replay --cassette data/llm_cassette.jsonl \
+        --output bench.json --baseline benchmarks/baseline.json
+
+Settings are read at import time, so the LLM backend is configured through
+environment variables before any application module is imported.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Metrics compared against the baseline; higher is worse for all of them
+COMPARED_METRICS = ["p50", "p95", "p99", "llm_calls_per_turn", "tool_calls_per_turn", "tokens_per_turn"]
+
+def percentile(values, pct):
+    """Linear-interpolated percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def configure_backend(args):
+    """Point the app at the chosen LLM backend before it is imported"""
+    server = None
+    if args.llm == "mock":
+        from benchmarks.mock_llm_server import MockLLMServer, MockLLMConfig
+        server = MockLLMServer(port=0, config=MockLLMConfig(
+            seed=args.seed,
+            ttft_ms=args.ttft_ms,
+            tokens_per_second=args.tokens_per_second,
+            error_429_rate=args.error_429_rate,
+            error_500_rate=args.error_500_rate
+        )).start()
+        os.environ["LLM_BASE_URL"] = server.base_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "mock-key")
+    elif args.llm == "replay":
+        os.environ["LLM_CASSETTE_MODE"] = "replay"
+        os.environ["LLM_CASSETTE_PATH"] = args.cassette
+        os.environ["LLM_CASSETTE_TIME_SCALE"] = str(args.time_scale)
+
+    if not args.with_cache:
+        # Every run should exercise the LLM path, not earlier runs' answers
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+        os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+    if args.llm != "live":
+        os.environ["LLM_RATE_LIMIT_ENABLED"] = "false"
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    return server
+
+class StageRecorder:
+    """Per-turn samples for one benchmark stage"""
+
+    def __init__(self):
+        self.latencies = []
+        self.llm_calls = []
+        self.tool_calls = []
+        self.tokens = []
+        self.errors = 0
+
+    def measure(self, llm, func, *args):
+        from tools.tool_tracking import track_turn
+
+        calls_before, tokens_before = llm.llm_calls, llm.token_usage
+        start = time.perf_counter()
+        with track_turn() as tool_log:
+            try:
+                func(*args)
+            except Exception as e:
+                self.errors += 1
+                print(f"  error: {e}")
+        self.latencies.append(time.perf_counter() - start)
+        self.llm_calls.append(llm.llm_calls - calls_before)
+        self.tokens.append(llm.token_usage - tokens_before)
+        self.tool_calls.append(len(tool_log.tool_calls))
+
+    def summary(self):
+        turns = len(self.latencies) or 1
+        return {
+            "turns": len(self.latencies),
+            "errors": self.errors,
+            "mean": sum(self.latencies) / turns,
+            "p50": percentile(self.latencies, 50),
+            "p95": percentile(self.latencies, 95),
+            "p99": percentile(self.latencies, 99),
+            "llm_calls_per_turn": sum(self.llm_calls) / turns,
+            "tool_calls_per_turn": sum(self.tool_calls) / turns,
+            "tokens_per_turn": sum(self.tokens) / turns
+        }
+
+def run_benchmark(domains, iterations, warmup):
+    from config.llm_config import llm
+    from config.settings import SAMPLE_QUESTIONS, SAMPLE_CUSTOMERS
+    from agents.registry import CREW_FACTORIES
+    from tools.tool_metrics import tool_metrics
+
+    # Build crews up front so construction is not timed as a turn
+    router = CREW_FACTORIES["router"]()
+    crews = {domain: CREW_FACTORIES[domain]() for domain in domains}
+    stages = {"routing": StageRecorder()}
+    stages.update({f"answer:{domain}": StageRecorder() for domain in domains})
+
+    for iteration in range(warmup + iterations):
+        recording = iteration >= warmup
+        if iteration == warmup:
+            # Per-tool counts cover the measured passes only
+            tool_metrics.reset()
+        label = f"run {iteration - warmup + 1}/{iterations}" if recording else f"warmup {iteration + 1}/{warmup}"
+        print(f"{label}")
+
+        for domain in domains:
+            user_info = SAMPLE_CUSTOMERS[domain]
+            for query in SAMPLE_QUESTIONS[domain]:
+                routing = StageRecorder() if not recording else stages["routing"]
+                answer = StageRecorder() if not recording else stages[f"answer:{domain}"]
+                routing.measure(llm, router.route_customer, query, user_info)
+                answer.measure(llm, crews[domain].handle_query, f"Customer Query: {query}", user_info)
+
+    return {name: recorder.summary() for name, recorder in stages.items()}
+
+def compare(results, baseline, threshold):
+    """List metrics that got worse than the baseline by more than ``threshold``"""
+    regressions = []
+    for stage, metrics in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > 1e-9:
+                change = (new - old) / old * 100 if old else float("inf")
+                regressions.append({"stage": stage, "metric": metric, "baseline": old, "current": new,
+                                    "change_percent": change})
+
+    old_rss, new_rss = baseline.get("peak_rss_mb"), results.get("peak_rss_mb")
+    if old_rss and new_rss and new_rss > old_rss * (1 + threshold):
+        regressions.append({"stage": "process", "metric": "peak_rss_mb", "baseline": old_rss, "current": new_rss,
+                            "change_percent": (new_rss - old_rss) / old_rss * 100})
+    return regressions
+
+def print_report(results, regressions=None):
+    print(f"\n{'stage':<20}{'p50':>8}{'p95':>8}{'p99':>8}{'llm':>7}{'tools':>7}{'tokens':>9}{'errors':>8}")
+    for stage, m in results["stages"].items():
+        print(f"{stage:<20}{m['p50']:>8.2f}{m['p95']:>8.2f}{m['p99']:>8.2f}"
+              f"{m['llm_calls_per_turn']:>7.1f}{m['tool_calls_per_turn']:>7.1f}{m['tokens_per_turn']:>9.0f}{m['errors']:>8}")
+    if results.get("peak_rss_mb") is not None:
+        print(f"\nPeak RSS: {results['peak_rss_mb']:.1f} MB")
+
+    if regressions is None:
+        return
+    if not regressions:
+        print("\nNo regressions against baseline")
+        return
+    print(f"\n{len(regressions)} regression(s) against baseline:")
+    for r in regressions:
+        print(f"  {r['stage']} {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} (+{r['change_percent']:.0f}%)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark routing and domain crews end to end")
+    parser.add_argument("--llm", choices=["mock", "replay", "live"], default="mock")
+    parser.add_argument("--domains", nargs="+", default=["ecommerce", "banking", "telecom"])
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over the sample questions")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes before measuring")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before flagging, 0.10 = 10%%")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the response and semantic caches on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="Mock time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Mock generation speed")
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    parser.add_argument("--error-500-rate", type=float, default=0.0)
+    parser.add_argument("--cassette", default="data/llm_cassette.jsonl", help="Cassette for --llm replay")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Replay latency scale for --llm replay")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    server = configure_backend(args)
+    from tools.tool_metrics import tool_metrics
+
+    started = time.perf_counter()
+    try:
+        stages = run_benchmark(args.domains, args.iterations, args.warmup)
+    finally:
+        if server is not None:
+            server.stop()
+
+    results = {
+        "metadata": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "llm": args.llm,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "domains": args.domains,
+            "cache": args.with_cache,
+            "python": platform.python_version(),
+            "wall_seconds": time.perf_counter() - started
+        },
+        "stages": stages,
+        "tools": tool_metrics.snapshot()["tools"],
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    regressions = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        results["regressions"] = regressions
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_report(results, regressions)
+    print(f"\nResults written to {args.output}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from config.settings import (
+    TURN_DEADLINE_SECONDS, CREW_AGENT_MAX_ITER, CREW_SECONDS_PER_ITERATION,
+    DEADLINE_STAGE_WORKERS, API_WORKERS, JOB_WORKERS_IN_PROCESS
+)
+
+# Deadline of the request being served in the current context
+_current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+class StageExecutor:
+    """Thread pool the deadline stages run on, counting busy workers.
+
+    Stages submitted while every worker is busy queue, and their wait
+    counts against the request deadline, so saturation is logged and
+    reported by get_stats.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deadline-stage")
+        self._lock = threading.Lock()
+        self.busy = 0
+        self.peak = 0
+        self.saturated = 0
+
+    def _run(self, func, *args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.busy -= 1
+
+    def submit(self, func, *args, **kwargs):
+        with self._lock:
+            self.busy += 1
+            self.peak = max(self.peak, self.busy)
+            queued = self.busy > self.workers
+            if queued:
+                self.saturated += 1
+        if queued:
+            print(f"Deadline stage pool saturated: {self.busy} stages for {self.workers} workers")
+        return self._executor.submit(self._run, func, *args, **kwargs)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "busy": min(self.busy, self.workers),
+                "queued": max(0, self.busy - self.workers),
+                "peak": self.peak,
+                "saturated": self.saturated
+            }
+
+# Stages run here so the caller can stop waiting when the deadline expires. Each
+# turn may hold two workers (a stage abandoned at its timeout and the next one),
+# and never fewer than one per turn that can run at once
+_concurrent_turns = API_WORKERS + JOB_WORKERS_IN_PROCESS
+stage_executor = StageExecutor(max(DEADLINE_STAGE_WORKERS or 2 * _concurrent_turns, _concurrent_turns))
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of its time budget"""
+
+    def __init__(self, stage=None):
+        self.stage = stage
+        super().__init__(f"Deadline exceeded during {stage or 'request'}")
+
+class Deadline:
+    """End-to-end time budget for one request, shared by every stage"""
+
+    def __init__(self, budget_seconds=TURN_DEADLINE_SECONDS):
+        self.budget_seconds = budget_seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_seconds
+        self.stage_seconds = {}
+        self.blown_stage = None
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def budget_for(self, fraction=1.0, cap=None):
+        """Seconds a stage may use: a share of what is left, optionally capped"""
+        budget = self.remaining() * fraction
+        return min(budget, cap) if cap is not None else budget
+
+    def mark_blown(self, stage):
+        """Remember the first stage that ran out of time"""
+        if self.blown_stage is None:
+            self.blown_stage = stage
+
+    def check(self, stage=None):
+        if self.expired():
+            self.mark_blown(stage)
+            raise DeadlineExceeded(stage)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.monotonic()
+        try:
+            yield self
+        finally:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + time.monotonic() - start
+            if self.expired():
+                self.mark_blown(name)
+
+    def to_dict(self):
+        return {
+            "budget_seconds": self.budget_seconds,
+            "elapsed_seconds": self.elapsed(),
+            "stage_seconds": dict(self.stage_seconds),
+            "blown_stage": self.blown_stage
+        }
+
+@contextmanager
+def deadline_scope(deadline):
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def current_deadline():
+    return _current_deadline.get()
+
+def remaining_time(default=None):
+    """Seconds left on the current deadline, or ``default`` when there is none"""
+    deadline = _current_deadline.get()
+    return default if deadline is None else deadline.remaining()
+
+def run_stage(stage, timeout, func, *args, **kwargs):
+    """Run func in a worker, abandoning it if it outlives ``timeout`` seconds.
+
+    The worker runs in a copy of the caller's context, so it keeps the
+    deadline (and any other request-scoped state). An abandoned worker
+    finishes in the background; its LLM and tool calls fail fast once the
+    deadline has expired. Raises DeadlineExceeded on timeout; ``timeout``
+    of None waits indefinitely.
+    """
+    deadline = _current_deadline.get()
+    context = contextvars.copy_context()
+    future = stage_executor.submit(context.run, func, *args, **kwargs)
+
+    try:
+        if deadline is None:
+            return future.result(timeout=timeout)
+        with deadline.stage(stage):
+            return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        # A stage that only overran its own share leaves the turn budget intact
+        if deadline is not None and deadline.expired():
+            deadline.mark_blown(stage)
+        raise DeadlineExceeded(stage)
+
+def limit_agent(agent, max_iter=CREW_AGENT_MAX_ITER, seconds_per_iteration=CREW_SECONDS_PER_ITERATION):
+    """Shrink an agent's iteration limit to fit the current deadline.
+
+    ``max_execution_time`` is always left unset: CrewAI enforces it by
+    running the agent on a fresh thread without the caller's context, which
+    drops the deadline, usage tags, model tier and stream sink. The deadline
+    is enforced by run_stage instead, whose worker keeps that context.
+    """
+    agent.max_execution_time = None
+    deadline = _current_deadline.get()
+    if deadline is None:
+        agent.max_iter = max_iter
+        return agent
+
+    agent.max_iter = max(1, min(max_iter, int(deadline.remaining() // seconds_per_iteration)))
+    return agent
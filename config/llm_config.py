@@ -1,74 +1,1130 @@
 import os
-from openai import OpenAI
-from config.settings import OPENROUTER_API_KEY
+import json
+import time
+import random
+import atexit
+import asyncio
+import heapq
+import sqlite3
+import hashlib
+import weakref
+import collections
+import itertools
+import threading
+import contextvars
+from types import SimpleNamespace
+from contextlib import contextmanager
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError
+from crewai import BaseLLM
+from database.usage_ledger import usage_ledger, usage_context, get_usage_tags
+from config.deadline import DeadlineExceeded, current_deadline, remaining_time
+from config.tracing import tracer, span, current_span, NOOP_SPAN
+from config.settings import (
+    OPENROUTER_API_KEY,
+    LLM_BASE_URL,
+    CREW_LLM_TEMPERATURE,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_POOL_MAX_CONNECTIONS,
+    LLM_RATE_LIMIT_ENABLED,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_DAY,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MAX_TEMPERATURE,
+    LLM_CASCADE_ENABLED,
+    LLM_FAST_MODEL,
+    LLM_STRONG_MODEL,
+    LLM_CASSETTE_MODE,
+    LLM_CASSETTE_PATH,
+    LLM_CASSETTE_TIME_SCALE
+)
 
 # Set environment variables for CrewAI
 os.environ["OPENAI_API_KEY"] = OPENROUTER_API_KEY
-os.environ["OPENAI_API_BASE"] = "https://openrouter.ai/api/v1"
+os.environ["OPENAI_API_BASE"] = LLM_BASE_URL
+
+def normalize_messages(messages):
+    """Collapse whitespace so trivially different prompts share a cache entry"""
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            content = " ".join(content.split())
+        normalized.append({"role": message.get("role"), "content": content})
+    return normalized
+
+def make_cache_key(model, messages, **params):
+    """Stable hash of model, normalized messages and sampling params"""
+    payload = json.dumps(
+        {"model": model, "messages": normalize_messages(messages), "params": params},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+def is_retryable_error(error):
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying"""
+    if isinstance(error, APIConnectionError):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+    return False
+
+def backoff_delay(attempt, error=None, base=LLM_BACKOFF_BASE_SECONDS, cap=LLM_BACKOFF_MAX_SECONDS):
+    """Exponential backoff with full jitter, honouring a server Retry-After header"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(cap, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def count_tokens(text):
+    """Approximate token count of a piece of text (about four characters per token)"""
+    return (len(text) + 3) // 4 if text else 0
+
+def estimate_tokens(messages, max_tokens=None):
+    """Upper-bound token estimate used to reserve rate-limit capacity before a call"""
+    prompt_tokens = sum(count_tokens(str(message.get("content") or "")) for message in messages)
+    return prompt_tokens + (500 if max_tokens is None else max_tokens)
+
+# Model cascade: every role maps to a tier, every tier to a model
+MODEL_TIERS = {"fast": LLM_FAST_MODEL, "strong": LLM_STRONG_MODEL}
+ROLE_TIERS = {
+    "router": "fast",       # domain classification and intent analysis
+    "lookup": "fast",       # agents that mostly relay tool results
+    "answer": "fast",       # domain agents, escalated to "strong" when needed
+    "memory": "fast",       # conversation summaries
+    "self_check": "fast",   # grading a draft answer
+    "default": "strong"
+}
+# Roles whose output should not vary run greedy, which also makes their calls cacheable;
+# the others sample at CREW_LLM_TEMPERATURE
+ROLE_TEMPERATURES = {"router": 0.0, "lookup": 0.0, "self_check": 0.0}
+
+def model_for(role="default", tier=None):
+    """Model for an agent role, or for ``tier`` when the call is escalated"""
+    if not LLM_CASCADE_ENABLED:
+        return LLM_STRONG_MODEL
+    tier = tier or ROLE_TIERS.get(role, ROLE_TIERS["default"])
+    return MODEL_TIERS.get(tier, LLM_STRONG_MODEL)
+
+# Queue priority of LLM calls made in the current context; lower runs first
+URGENCY_PRIORITIES = {"high": 0, "medium": 1, "low": 2}
+_request_priority = contextvars.ContextVar("request_priority", default=URGENCY_PRIORITIES["medium"])
+
+@contextmanager
+def request_priority(urgency):
+    """Queue LLM calls made in this context according to conversation urgency"""
+    token = _request_priority.set(URGENCY_PRIORITIES.get(urgency, URGENCY_PRIORITIES["medium"]))
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+class TokenBucket:
+    """Continuously refilling bucket; not thread-safe on its own"""
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def time_until(self, amount):
+        """Seconds until ``amount`` can be taken (amounts above capacity wait for a full bucket)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.refill_per_second
+
+    def take(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def give_back(self, amount):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+class RateLimitScheduler:
+    """Queue LLM calls against request-per-minute and token-per-day buckets.
+
+    Calls that would exceed a bucket wait instead of failing, for at most
+    what is left of the request deadline. Waiting calls are served strictly
+    by priority (conversation urgency), then arrival.
+    """
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_day=LLM_TOKENS_PER_DAY,
+                 enabled=LLM_RATE_LIMIT_ENABLED):
+        self.enabled = enabled
+        self.request_bucket = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.token_bucket = TokenBucket(tokens_per_day, tokens_per_day / 86400.0)
+        self._condition = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self.served = 0
+        self.delayed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    # How often queued async calls re-check the queue; they cannot wait on the thread condition
+    POLL_SECONDS = 0.05
+
+    def _time_until_ready(self, estimated_tokens):
+        return max(self.request_bucket.time_until(1), self.token_bucket.time_until(estimated_tokens))
+
+    def _enqueue(self, priority):
+        priority = _request_priority.get() if priority is None else priority
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _ready_in(self, ticket, estimated_tokens):
+        """Seconds until the ticket may proceed, or None while another call is ahead of it"""
+        if self._waiting[0] != ticket:
+            return None
+        return self._time_until_ready(estimated_tokens)
+
+    def _admit(self, estimated_tokens, start):
+        """Take capacity for the call at the head of the queue and return its wait"""
+        heapq.heappop(self._waiting)
+        self.request_bucket.take(1)
+        self.token_bucket.take(estimated_tokens)
+
+        waited = time.monotonic() - start
+        self.served += 1
+        if waited > 0.001:
+            self.delayed += 1
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self._condition.notify_all()
+        return waited
+
+    def _abandon(self, ticket):
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._condition.notify_all()
+
+    def _wait_for(self, wait, expires):
+        """How long to wait before re-checking; raises DeadlineExceeded once ``expires`` cannot be met"""
+        if expires is None:
+            return wait
+        left = expires - time.monotonic()
+        if left <= 0 or (wait is not None and wait > left):
+            raise DeadlineExceeded("rate_limit")
+        return left if wait is None else wait
+
+    def acquire(self, estimated_tokens, priority=None, timeout=None):
+        """Block until the call may proceed; returns the seconds spent waiting.
+
+        Raises DeadlineExceeded, leaving the queue, when the call could not
+        proceed within ``timeout`` seconds.
+        """
+        if not self.enabled:
+            return 0.0
+
+        start = time.monotonic()
+        expires = None if timeout is None else start + timeout
+        with self._condition:
+            ticket = self._enqueue(priority)
+            try:
+                while True:
+                    wait = self._ready_in(ticket, estimated_tokens)
+                    if wait is not None and wait <= 0:
+                        return self._admit(estimated_tokens, start)
+                    self._condition.wait(timeout=self._wait_for(wait, expires))
+            except BaseException:
+                self._abandon(ticket)
+                raise
+
+    async def aacquire(self, estimated_tokens, priority=None, timeout=None):
+        """Async counterpart of acquire, waiting on the event loop in the same queue"""
+        if not self.enabled:
+            return 0.0
+
+        start = time.monotonic()
+        expires = None if timeout is None else start + timeout
+        with self._condition:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._ready_in(ticket, estimated_tokens)
+                    if wait is not None and wait <= 0:
+                        return self._admit(estimated_tokens, start)
+                    wait = self._wait_for(wait, expires)
+                await asyncio.sleep(self.POLL_SECONDS if wait is None else min(wait, self.POLL_SECONDS))
+        except BaseException:
+            with self._condition:
+                self._abandon(ticket)
+            raise
+
+    def settle(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once the real usage of a call is known"""
+        if not self.enabled:
+            return
+        with self._condition:
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                self.token_bucket.give_back(difference)
+            elif difference < 0:
+                self.token_bucket.take(-difference)
+            self._condition.notify_all()
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                "queue_depth": len(self._waiting),
+                "served": self.served,
+                "delayed": self.delayed,
+                "avg_wait_seconds": self.total_wait_seconds / self.served if self.served else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+                "requests_available": int(self.request_bucket.tokens),
+                "tokens_available": int(self.token_bucket.tokens)
+            }
+
+class _SlotWaiter:
+    """A thread (event) or coroutine (loop, future) queued for a concurrency slot"""
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+class ConcurrencyLimiter:
+    """Cap on in-flight LLM requests shared by every thread and event loop.
+
+    A released slot is handed straight to the longest-waiting caller,
+    whether it is a thread or a coroutine, so neither can starve the other.
+    """
+
+    def __init__(self, limit=LLM_MAX_CONCURRENCY):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+
+    def _try_take(self):
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._lock:
+            if self._try_take():
+                return
+            waiter = _SlotWaiter(event=threading.Event())
+            self._waiters.append(waiter)
+        waiter.event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_take():
+                return
+            waiter = _SlotWaiter(loop=loop, future=loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except BaseException:
+            # Cancelled while queued; a slot handed over meanwhile goes to the next caller
+            with self._lock:
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+            if waiter.granted:
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                if waiter.event is not None:
+                    waiter.event.set()
+                    return
+                try:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                    return
+                except RuntimeError:
+                    # Its event loop has closed; try the next waiter
+                    continue
+            self.in_flight -= 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def get_stats(self):
+        with self._lock:
+            return {"limit": self.limit, "in_flight": self.in_flight, "waiting": len(self._waiters)}
+
+# Every LLM request in the process, sync or async, takes one of these slots
+request_slots = ConcurrencyLimiter()
+
+# Receives streamed tokens for LLM calls made in the current context
+_stream_sink = contextvars.ContextVar("stream_sink", default=None)
+
+class FinalAnswerStream:
+    """Forward only the final answer of a CrewAI agent to a callback.
+
+    Agents emit ReAct-style "Thought/Action/Final Answer" text on every LLM
+    call; only text after the "Final Answer:" marker is meant for the
+    customer. The callback receives the full answer text so far each time
+    it grows.
+    """
+
+    MARKER = "Final Answer:"
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.begin()
+
+    def begin(self):
+        """Start a new LLM call; any earlier partial answer is discarded"""
+        self._buffer = ""
+        self._answer_start = None
+
+    def feed(self, delta):
+        self._buffer += delta
+        if self._answer_start is None:
+            index = self._buffer.find(self.MARKER)
+            if index == -1:
+                return
+            self._answer_start = index + len(self.MARKER)
+
+        answer = self._buffer[self._answer_start:].lstrip()
+        if answer:
+            self.callback(answer)
+
+@contextmanager
+def stream_final_answer(callback):
+    """Stream the final answer of crews run in this context to callback"""
+    token = _stream_sink.set(FinalAnswerStream(callback))
+    try:
+        yield
+    finally:
+        _stream_sink.reset(token)
+
+@contextmanager
+def suppress_streaming():
+    """Keep LLM calls in this context (e.g. routing) out of any active stream"""
+    token = _stream_sink.set(None)
+    try:
+        yield
+    finally:
+        _stream_sink.reset(token)
+
+class ResponseCache:
+    """On-disk LLM response cache with TTL and size-bounded LRU eviction"""
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                 max_entries=LLM_CACHE_MAX_ENTRIES, max_temperature=LLM_CACHE_MAX_TEMPERATURE,
+                 enabled=LLM_CACHE_ENABLED):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.bypassed_temperature = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL,
+                    hit_count INTEGER DEFAULT 0
+                )
+            ''')
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_accessed ON llm_response_cache(last_accessed)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def bypass_reason(self, temperature=None, use_cache=True):
+        """Why a call skips the cache ("disabled", "requested" or "temperature"), or None"""
+        if not self.enabled:
+            return "disabled"
+        if not use_cache:
+            return "requested"
+        if temperature is not None and temperature > self.max_temperature:
+            return "temperature"
+        return None
+
+    def should_cache(self, temperature=None, use_cache=True):
+        """Skip the cache when disabled, bypassed, or sampling is too random"""
+        return self.bypass_reason(temperature, use_cache) is None
+
+    def record_bypass(self, reason=None):
+        with self._lock:
+            self.bypassed += 1
+            if reason == "temperature":
+                self.bypassed_temperature += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_response_cache WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+                conn.commit()
+                self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE llm_response_cache SET last_accessed = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+                (now, key)
+            )
+            conn.commit()
+            self.hits += 1
+            return response
+
+    def put(self, key, model, response):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                """INSERT OR REPLACE INTO llm_response_cache
+                   (cache_key, model, response, created_at, last_accessed, hit_count)
+                   VALUES (?, ?, ?, ?, ?, 0)""",
+                (key, model, response, now, now)
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        """Drop the least recently used entries beyond max_entries"""
+        if not self.max_entries:
+            return
+        (count,) = conn.execute("SELECT COUNT(*) FROM llm_response_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                """DELETE FROM llm_response_cache WHERE cache_key IN (
+                       SELECT cache_key FROM llm_response_cache
+                       ORDER BY last_accessed ASC LIMIT ?
+                   )""",
+                (overflow,)
+            )
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_response_cache")
+            conn.commit()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "bypassed_temperature": self.bypassed_temperature,
+                "hit_rate": (self.hits / lookups) * 100 if lookups else 0
+            }
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request that was never recorded"""
+
+class Cassette:
+    """Append-only JSONL recording of LLM request/response pairs.
+
+    Each line holds the request's cache key, the reply and its token usage
+    and latency. In replay mode requests are served from the file: repeated
+    keys are played back in recording order (the last one repeats), and
+    with ``time_scale`` > 0 the recorded latency is reproduced.
+    """
+
+    def __init__(self, path=LLM_CASSETTE_PATH, mode=LLM_CASSETTE_MODE, time_scale=LLM_CASSETTE_TIME_SCALE):
+        self.path = path
+        self.mode = mode if mode in ("record", "replay") else "off"
+        self.time_scale = time_scale
+        self.recorded = 0
+        self.played = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._entries = None
+        self._positions = {}
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def key(self, request):
+        return make_cache_key(
+            request["model"], request["messages"], max_tokens=request.get("max_tokens"),
+            temperature=request.get("temperature"), stop=request.get("stop")
+        )
+
+    def record(self, request, content, usage, elapsed, cached=False):
+        entry = {
+            "key": self.key(request),
+            "model": request["model"],
+            "content": content,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "elapsed": round(elapsed, 4),
+            "cached": cached
+        }
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def _load(self):
+        entries = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash while recording
+                        continue
+                    entries.setdefault(entry["key"], []).append(entry)
+        except FileNotFoundError:
+            print(f"LLM cassette {self.path} not found, every request will miss")
+        return entries
+
+    def play(self, request):
+        """Return the recorded entry for a request, raising CassetteMiss if there is none"""
+        key = self.key(request)
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            recordings = self._entries.get(key)
+            if not recordings:
+                self.missed += 1
+                raise CassetteMiss(f"No recorded LLM response for request {key[:12]}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.played += 1
+            return recordings[min(position, len(recordings) - 1)]
+
+    def delay(self, entry, timeout=None):
+        """Seconds to wait to emulate the recorded latency"""
+        delay = entry["elapsed"] * self.time_scale
+        return min(delay, timeout) if timeout else delay
+
+    def get_stats(self):
+        with self._lock:
+            return {"mode": self.mode, "recorded": self.recorded, "played": self.played, "missed": self.missed}
 
 class DeepSeekFreeLLM:
     def __init__(self):
+        self.timeout = LLM_REQUEST_TIMEOUT_SECONDS
+        self.max_retries = LLM_MAX_RETRIES
+
+        # Retries are handled here rather than by the SDK so both clients share one policy
         self.client = OpenAI(
             api_key=OPENROUTER_API_KEY,
-            base_url="https://openrouter.ai/api/v1"
+            base_url=LLM_BASE_URL,
+            timeout=self.timeout,
+            max_retries=0,
+            http_client=httpx.Client(limits=self._pool_limits())
         )
-        
-        # Fixed model - DeepSeek Chat Free only
-        self.model = "deepseek/deepseek-chat:free"
+
+        # Default model; cascade roles pick their own through model_for()
+        self.model = LLM_STRONG_MODEL
         self.token_usage = 0
-        self.max_daily_tokens = 1000000  # Estimate for free tier
-    
-    def generate_response(self, messages, max_tokens=500, temperature=0.7):
+        self.llm_calls = 0
+        self.max_daily_tokens = LLM_TOKENS_PER_DAY  # Estimate for free tier
+        self.cache = ResponseCache()
+        self.cassette = Cassette()
+        self.scheduler = RateLimitScheduler()
+        self.retry_count = 0
+        # Guards the counters above, updated from many threads at once
+        self._counter_lock = threading.Lock()
+
+        # Caps in-flight requests across all threads and event loops of the process
+        self._slots = request_slots
+        # Async clients are bound to the event loop that created them
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Tasks that close each loop's client when the loop shuts down
+        self._client_closers = set()
+
+    def _pool_limits(self):
+        return httpx.Limits(
+            max_connections=LLM_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_POOL_MAX_CONNECTIONS
+        )
+
+    def _async_client(self):
+        """Return the pooled async client for the running loop"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=OPENROUTER_API_KEY,
+                base_url=LLM_BASE_URL,
+                timeout=self.timeout,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=self._pool_limits())
+            )
+            self._async_clients[loop] = client
+            closer = loop.create_task(self._close_with_loop(loop, client))
+            self._client_closers.add(closer)
+            closer.add_done_callback(self._client_closers.discard)
+        return client
+
+    async def _close_with_loop(self, loop, client):
+        """Wait for the loop to shut down (asyncio.run cancels leftover tasks), then close its client"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                extra_headers={
-                    "HTTP-Referer": "https://github.com/your-username/support-crew",
-                    "X-Title": "Support Crew AI System"
-                }
+            await loop.create_future()
+        finally:
+            if self._async_clients.get(loop) is client:
+                del self._async_clients[loop]
+                await client.close()
+
+    async def aclose(self):
+        """Close the running loop's async client and its connection pool"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def close(self):
+        """Close the sync client and any async client whose loop never shut down"""
+        self.client.close()
+        for client in list(self._async_clients.values()):
+            try:
+                # The owning loop is gone; a fresh one can still release the sockets
+                asyncio.run(client.close())
+            except Exception as e:
+                print(f"Could not close an async LLM client: {e}")
+        self._async_clients.clear()
+        self._client_closers.clear()
+
+    def _count_retry(self):
+        with self._counter_lock:
+            self.retry_count += 1
+
+    def _create_with_retries(self, request, timeout=None):
+        """Send a completion request, retrying transient failures with jittered backoff"""
+        attempt = 0
+        while True:
+            try:
+                return self.client.chat.completions.create(timeout=timeout or self.timeout, **request)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                time.sleep(backoff_delay(attempt, e))
+                attempt += 1
+                self._count_retry()
+                current_span().set_attribute("retries", attempt)
+
+    async def _acreate_with_retries(self, client, request, timeout=None):
+        attempt = 0
+        while True:
+            try:
+                return await client.chat.completions.create(timeout=timeout or self.timeout, **request)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, e))
+                attempt += 1
+                self._count_retry()
+                current_span().set_attribute("retries", attempt)
+
+    def _build_request(self, messages, max_tokens=None, temperature=None, stop=None, model=None):
+        request = {
+            "model": model or self.model,
+            "messages": messages,
+            "extra_headers": {
+                "HTTP-Referer": "https://github.com/your-username/support-crew",
+                "X-Title": "Support Crew AI System"
+            }
+        }
+        if max_tokens is not None:
+            request["max_tokens"] = max_tokens
+        if temperature is not None:
+            request["temperature"] = temperature
+        if stop:
+            request["stop"] = stop
+        return request
+
+    def _track_usage(self, usage, messages, content, estimated_tokens=None, model=None):
+        """Record the prompt and completion tokens of one call in the usage ledger"""
+        if usage:
+            prompt_tokens = usage.prompt_tokens or 0
+            completion_tokens = usage.completion_tokens or 0
+        else:
+            # Estimate tokens if not provided
+            prompt_tokens = sum(count_tokens(str(message.get("content") or "")) for message in messages)
+            completion_tokens = count_tokens(content)
+
+        used = prompt_tokens + completion_tokens
+        with self._counter_lock:
+            self.token_usage += used
+            self.llm_calls += 1
+        usage_ledger.record(model or self.model, prompt_tokens, completion_tokens)
+        current_span().set_attributes(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+        if estimated_tokens is not None:
+            self.scheduler.settle(estimated_tokens, used)
+        return used
+
+    def _stream_chunks(self, request, timeout=None):
+        """Yield text deltas from a streaming completion, tracking usage at the end"""
+        estimated = estimate_tokens(request["messages"], request.get("max_tokens"))
+        self.scheduler.acquire(estimated, timeout=remaining_time())
+
+        usage = None
+        parts = []
+        started = time.perf_counter()
+        try:
+            with self._slots:
+                stream = self._create_with_retries(
+                    dict(request, stream=True, stream_options={"include_usage": True}),
+                    timeout
+                )
+                for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        except Exception:
+            self.scheduler.settle(estimated, 0)
+            raise
+        content = "".join(parts)
+        self._track_usage(usage, request["messages"], content, estimated, request["model"])
+        if self.cassette.recording:
+            self.cassette.record(request, content, usage, time.perf_counter() - started)
+
+    def _request_timeout(self, timeout=None):
+        """Per-request timeout, shortened to whatever is left of the request deadline"""
+        timeout = timeout or self.timeout
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check("llm")
+            timeout = max(1.0, min(timeout, deadline.remaining()))
+        return timeout
+
+    def _replay_usage(self, entry):
+        """Account for a replayed call as if it had been made"""
+        if entry.get("cached"):
+            usage_ledger.record(entry["model"], 0, 0, cached=True)
+            return
+        usage = SimpleNamespace(prompt_tokens=entry["prompt_tokens"], completion_tokens=entry["completion_tokens"])
+        self._track_usage(usage, [], entry["content"], model=entry["model"])
+
+    def _replay(self, request, sink, timeout):
+        """Serve a request from the cassette, streaming it into the sink if one is active"""
+        entry = self.cassette.play(request)
+        current_span().set_attributes(cassette="replay", cache_hit=bool(entry.get("cached")))
+        content = entry["content"]
+        delay = self.cassette.delay(entry, timeout)
+
+        if sink is not None:
+            sink.begin()
+            pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+            for piece in pieces:
+                if delay:
+                    time.sleep(delay / len(pieces))
+                sink.feed(piece)
+        elif delay:
+            time.sleep(delay)
+
+        self._replay_usage(entry)
+        return content
+
+    def _cache_lookup(self, messages, max_tokens, temperature, stop, use_cache, model):
+        """Return (cache_key, cached_text); cache_key is None when the call is not cacheable"""
+        reason = self.cache.bypass_reason(temperature, use_cache)
+        if reason is not None:
+            self.cache.record_bypass(reason)
+            return None, None
+
+        cache_key = make_cache_key(
+            model, messages, max_tokens=max_tokens, temperature=temperature, stop=stop
+        )
+        cached = self.cache.get(cache_key)
+        current_span().set_attribute("cache_hit", cached is not None)
+        if cached is not None:
+            usage_ledger.record(model, 0, 0, cached=True)
+        return cache_key, cached
+
+    def complete(self, messages, max_tokens=None, temperature=None, stop=None, use_cache=True, timeout=None,
+                 model=None):
+        """Run a chat completion and return the text, raising on API errors.
+
+        Shared by generate_response and the CrewAI adapter so both go
+        through the response cache. When a stream sink is active in the
+        current context the completion is streamed into it as it arrives.
+        ``model`` defaults to the client's model.
+        """
+        model = model or self.model
+        sink = _stream_sink.get()
+        with self._llm_span(model, streamed=sink is not None):
+            return self._complete(messages, max_tokens, temperature, stop, use_cache, timeout, model, sink)
+
+    def _llm_span(self, model, **attributes):
+        if not tracer.enabled:
+            return NOOP_SPAN
+        tags = get_usage_tags()
+        return span("llm.complete", model=model, crew=tags.get("crew"), agent=tags.get("agent"),
+                    stage=tags.get("stage"), **attributes)
+
+    def _complete(self, messages, max_tokens, temperature, stop, use_cache, timeout, model, sink):
+        if self.cassette.replaying:
+            request = self._build_request(messages, max_tokens, temperature, stop, model)
+            return self._replay(request, sink, self._request_timeout(timeout))
+
+        cache_key, cached = self._cache_lookup(messages, max_tokens, temperature, stop, use_cache, model)
+
+        if cached is not None:
+            if self.cassette.recording:
+                self.cassette.record(self._build_request(messages, max_tokens, temperature, stop, model),
+                                     cached, None, 0.0, cached=True)
+            if sink is not None:
+                sink.begin()
+                sink.feed(cached)
+            return cached
+
+        request = self._build_request(messages, max_tokens, temperature, stop, model)
+        timeout = self._request_timeout(timeout)
+
+        if sink is not None:
+            sink.begin()
+            parts = []
+            for delta in self._stream_chunks(request, timeout):
+                parts.append(delta)
+                sink.feed(delta)
+            content = "".join(parts)
+        else:
+            # Wait for rate-limit capacity before taking a concurrency slot
+            estimated = estimate_tokens(messages, max_tokens)
+            self.scheduler.acquire(estimated, timeout=remaining_time())
+            started = time.perf_counter()
+            try:
+                with self._slots:
+                    response = self._create_with_retries(request, timeout)
+            except Exception:
+                self.scheduler.settle(estimated, 0)
+                raise
+            content = response.choices[0].message.content or ""
+            usage = getattr(response, 'usage', None)
+            self._track_usage(usage, messages, content, estimated, model)
+            if self.cassette.recording:
+                self.cassette.record(request, content, usage, time.perf_counter() - started)
+
+        if cache_key is not None and content:
+            self.cache.put(cache_key, model, content)
+
+        return content
+
+    async def acomplete(self, messages, max_tokens=None, temperature=None, stop=None, use_cache=True, timeout=None,
+                        model=None):
+        """Async counterpart of complete() using the pooled AsyncOpenAI client"""
+        model = model or self.model
+        with self._llm_span(model, streamed=False):
+            return await self._acomplete(messages, max_tokens, temperature, stop, use_cache, timeout, model)
+
+    async def _acomplete(self, messages, max_tokens, temperature, stop, use_cache, timeout, model):
+        if self.cassette.replaying:
+            request = self._build_request(messages, max_tokens, temperature, stop, model)
+            entry = self.cassette.play(request)
+            delay = self.cassette.delay(entry, self._request_timeout(timeout))
+            if delay:
+                await asyncio.sleep(delay)
+            self._replay_usage(entry)
+            return entry["content"]
+
+        cache_key, cached = self._cache_lookup(messages, max_tokens, temperature, stop, use_cache, model)
+        if cached is not None:
+            if self.cassette.recording:
+                self.cassette.record(self._build_request(messages, max_tokens, temperature, stop, model),
+                                     cached, None, 0.0, cached=True)
+            return cached
+
+        client = self._async_client()
+        request = self._build_request(messages, max_tokens, temperature, stop, model)
+        timeout = self._request_timeout(timeout)
+
+        estimated = estimate_tokens(messages, max_tokens)
+        await self.scheduler.aacquire(estimated, timeout=remaining_time())
+        started = time.perf_counter()
+        try:
+            async with self._slots:
+                response = await self._acreate_with_retries(client, request, timeout)
+        except Exception:
+            self.scheduler.settle(estimated, 0)
+            raise
+
+        content = response.choices[0].message.content or ""
+        usage = getattr(response, 'usage', None)
+        self._track_usage(usage, messages, content, estimated, model)
+        if self.cassette.recording:
+            self.cassette.record(request, content, usage, time.perf_counter() - started)
+
+        if cache_key is not None and content:
+            self.cache.put(cache_key, model, content)
+
+        return content
+
+    def generate_response(self, messages, max_tokens=500, temperature=0.7, use_cache=True, model=None):
+        try:
+            return self.complete(
+                messages, max_tokens=max_tokens, temperature=temperature, use_cache=use_cache, model=model
             )
-            
-            # Track usage
-            if hasattr(response, 'usage') and response.usage:
-                self.token_usage += response.usage.total_tokens
-            else:
-                # Estimate tokens if not provided
-                self.token_usage += len(str(messages)) + max_tokens
-            
-            return response.choices[0].message.content
-        
+
         except Exception as e:
             return f"Error generating response: {str(e)}"
-    
+
+    async def agenerate_response(self, messages, max_tokens=500, temperature=0.7, use_cache=True, timeout=None,
+                                 model=None):
+        try:
+            return await self.acomplete(
+                messages, max_tokens=max_tokens, temperature=temperature, use_cache=use_cache, timeout=timeout,
+                model=model
+            )
+
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
+
+    def stream_response(self, messages, max_tokens=500, temperature=0.7):
+        """Yield the response text incrementally as the model generates it"""
+        request = self._build_request(messages, max_tokens, temperature)
+        try:
+            if self.cassette.replaying:
+                yield self._replay(request, None, None)
+                return
+            yield from self._stream_chunks(request)
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+
     def get_usage_stats(self):
+        cache_stats = self.cache.get_stats()
+        queue_stats = self.scheduler.get_stats()
+
+        # Persisted usage for today across all sessions and restarts
+        try:
+            today = usage_ledger.get_totals_today()
+        except Exception as e:
+            print(f"Usage ledger unavailable: {e}")
+            today = {"total_tokens": self.token_usage, "prompt_tokens": 0, "completion_tokens": 0, "calls": 0}
+        tokens_used = today["total_tokens"]
+
         return {
-            "tokens_used": self.token_usage,
-            "tokens_remaining": max(0, self.max_daily_tokens - self.token_usage),
-            "usage_percentage": (self.token_usage / self.max_daily_tokens) * 100 if self.max_daily_tokens > 0 else 0,
+            "tokens_used": tokens_used,
+            "prompt_tokens": today["prompt_tokens"],
+            "completion_tokens": today["completion_tokens"],
+            "llm_calls": today["calls"],
+            "tokens_remaining": max(0, self.max_daily_tokens - tokens_used),
+            "usage_percentage": (tokens_used / self.max_daily_tokens) * 100 if self.max_daily_tokens > 0 else 0,
             "model": "DeepSeek Chat (Free)",
+            "models": dict(MODEL_TIERS) if LLM_CASCADE_ENABLED else {"strong": self.model},
             "cost": "FREE",
-            "provider": "OpenRouter"
+            "provider": "OpenRouter",
+            "cache_hits": cache_stats["hits"],
+            "cache_misses": cache_stats["misses"],
+            "cache_hit_rate": cache_stats["hit_rate"],
+            "cache_bypassed": cache_stats["bypassed"],
+            "cache_bypassed_temperature": cache_stats["bypassed_temperature"],
+            "retries": self.retry_count,
+            "queue_depth": queue_stats["queue_depth"],
+            "avg_queue_wait": queue_stats["avg_wait_seconds"],
+            "max_queue_wait": queue_stats["max_wait_seconds"],
+            "cassette": self.cassette.get_stats()
         }
-    
+
 
     def get_llm_config(self):
         """Return LLM configuration for CrewAI"""
         api_key = os.getenv("OPENROUTER_API_KEY")
         base_url = os.getenv("OPENAI_API_BASE")
-        
+
         if not api_key or not base_url:
             raise ValueError("DEEPSEEK_API_KEY and DEEPSEEK_BASE_URL must be set in environment variables")
-        
+
         return {
             "model": f"openai/{self.model}",
             "api_key": api_key,
             "base_url": base_url
         }
-    
-    
+
+    def get_crew_llm(self, temperature=None, role="default"):
+        """Return a CrewAI LLM that sends every call through this client on the role's model"""
+        if temperature is None:
+            temperature = ROLE_TEMPERATURES.get(role, CREW_LLM_TEMPERATURE)
+        self.get_llm_config()
+        return SupportCrewLLM(self, temperature=temperature, role=role)
+
+
     def test_connection(self):
         """Test if API key and connection work"""
         try:
@@ -81,5 +1137,49 @@ class DeepSeekFreeLLM:
         except Exception as e:
             return False, f"❌ Error: {str(e)}"
 
+class SupportCrewLLM(BaseLLM):
+    """CrewAI LLM adapter backed by DeepSeekFreeLLM.complete"""
+
+    def __init__(self, client, temperature=None, role="default"):
+        super().__init__(model=model_for(role), temperature=temperature)
+        self.client = client
+        self.role = role
+        # Overrides the role's tier; set per request by the crew that owns this LLM
+        self.tier = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None, **kwargs):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+
+        # Newer CrewAI versions say which agent is calling
+        agent_role = getattr(kwargs.get("from_agent"), "role", None)
+
+        # Imported here as the tools package pulls in the knowledge base
+        from tools.tool_tracking import get_turn_log
+        turn_log = get_turn_log()
+        if turn_log is not None:
+            # Proves the turn's tool log reached the thread the crew runs in
+            turn_log.record_llm_call(get_usage_tags().get("crew"))
+
+        with usage_context(agent=agent_role):
+            return self.client.complete(
+                messages,
+                temperature=self.temperature,
+                stop=self.stop or None,
+                # Resolved per call so an escalated turn switches model
+                model=model_for(self.role, self.tier)
+            )
+
+    def supports_function_calling(self):
+        # Agents use CrewAI's text-based ReAct tool format
+        return False
+
+    def supports_stop_words(self):
+        return True
+
+    def get_context_window_size(self):
+        return 64000
+
 # Global LLM instance
-llm = DeepSeekFreeLLM()
\ No newline at end of file
+llm = DeepSeekFreeLLM()
+atexit.register(llm.close)
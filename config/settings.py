@@ -5,10 +5,143 @@ load_dotenv()
 
 # OpenRouter API Configuration
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "your-openrouter-api-key")
+# Any OpenAI-compatible endpoint, e.g. the offline mock in benchmarks/mock_llm_server.py
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+
+# LLM Client Configuration
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+# Retries on 429/5xx/timeouts, with jittered exponential backoff between attempts
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# Maximum LLM requests in flight at once
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_POOL_MAX_CONNECTIONS = int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20"))
+
+# OpenRouter free-tier rate limits; calls over the limit are queued, not failed
+LLM_RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "20"))
+LLM_TOKENS_PER_DAY = int(os.getenv("LLM_TOKENS_PER_DAY", "1000000"))
+
+# Token usage ledger: rows are written in batches of this size, or after this many seconds
+USAGE_LEDGER_BATCH_SIZE = int(os.getenv("USAGE_LEDGER_BATCH_SIZE", "50"))
+USAGE_LEDGER_FLUSH_SECONDS = float(os.getenv("USAGE_LEDGER_FLUSH_SECONDS", "5"))
+
+# Sampling temperature of the answering agents; router and lookup agents run at 0.0
+CREW_LLM_TEMPERATURE = float(os.getenv("CREW_LLM_TEMPERATURE", "0.7"))
+
+# Model Cascade Configuration
+# Routing, lookups and first answers use the fast model; hard or failed answers escalate
+LLM_CASCADE_ENABLED = os.getenv("LLM_CASCADE_ENABLED", "true").lower() == "true"
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "meta-llama/llama-3.1-8b-instruct:free")
+LLM_STRONG_MODEL = os.getenv("LLM_STRONG_MODEL", "deepseek/deepseek-chat:free")
+LLM_SELF_CHECK_ENABLED = os.getenv("LLM_SELF_CHECK_ENABLED", "true").lower() == "true"
+# Skip escalation when less than this much of the turn deadline is left
+LLM_ESCALATION_MIN_SECONDS = float(os.getenv("LLM_ESCALATION_MIN_SECONDS", "20"))
+
+# LLM Response Cache Configuration
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.db")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+# Calls sampled above this temperature are treated as non-deterministic and bypass the cache;
+# by default that caches the greedy router, lookup and self-check calls, not sampled answers
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.0"))
+
+# LLM Cassette Configuration
+# "record" appends every LLM request/response to the cassette, "replay" serves them back offline
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", "data/llm_cassette.jsonl")
+# Replay with the recorded latency, scaled (0 serves instantly)
+LLM_CASSETTE_TIME_SCALE = float(os.getenv("LLM_CASSETTE_TIME_SCALE", "0"))
+
+# Semantic Answer Cache Configuration
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+# Minimum cosine similarity between a new question and a cached one
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(7 * 24 * 60 * 60)))
 
 # Database Configuration
 DATABASE_PATH = "data/customer_support.db"
 VECTOR_DB_PATH = "data/knowledge_base"
+# Pooled SQLite connections, each opened once with the pragmas below
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+# Seconds a thread waits for a free pooled connection before giving up
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+DB_MMAP_SIZE_MB = int(os.getenv("DB_MMAP_SIZE_MB", "64"))
+
+# Routing Configuration
+# Queries the local keyword classifier scores at or above this confidence
+# are routed without an LLM call; set to a value above 1 to always use the LLM
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.75"))
+# "sequential" runs separate domain and intent crews, "combined" asks for
+# domain, intent, urgency and tone in a single structured LLM call
+ROUTER_STRATEGY = os.getenv("ROUTER_STRATEGY", "sequential")
+
+# Agent Execution Configuration
+# "sequential" waits for routing before starting the domain crew,
+# "speculative" starts the domain crew right away and routes concurrently,
+# passing the intent analysis to the crew only if it is ready before the crew starts
+AGENT_EXECUTION_MODE = os.getenv("AGENT_EXECUTION_MODE", "sequential")
+# Set to "false" to skip the router entirely for a deployment
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "true").lower() == "true"
+# Routing still running this long after the crew started is ignored by the speculative mode
+ROUTING_DEADLINE_SECONDS = float(os.getenv("ROUTING_DEADLINE_SECONDS", "2.0"))
+ROUTING_WORKERS = int(os.getenv("ROUTING_WORKERS", "4"))
+
+# Request Deadline Configuration
+# End-to-end time budget for answering one message
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "90"))
+# Share of the remaining budget routing may use before the crew answers without it
+ROUTING_BUDGET_FRACTION = float(os.getenv("ROUTING_BUDGET_FRACTION", "0.25"))
+# Agent reasoning iterations, reduced as the deadline approaches
+CREW_AGENT_MAX_ITER = int(os.getenv("CREW_AGENT_MAX_ITER", "5"))
+CREW_SECONDS_PER_ITERATION = float(os.getenv("CREW_SECONDS_PER_ITERATION", "8"))
+# Threads running deadline stages, at least API_WORKERS + JOB_WORKERS_IN_PROCESS;
+# 0 lets every one of those turns hold two stages at once
+DEADLINE_STAGE_WORKERS = int(os.getenv("DEADLINE_STAGE_WORKERS", "0"))
+
+# Conversation Memory Configuration
+# Exchanges kept verbatim; older ones are folded into a running summary
+MEMORY_WINDOW_TURNS = int(os.getenv("MEMORY_WINDOW_TURNS", "4"))
+# Upper bound on the conversation context (summary + recent turns) fed to the crews
+MEMORY_MAX_CONTEXT_TOKENS = int(os.getenv("MEMORY_MAX_CONTEXT_TOKENS", "1500"))
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "300"))
+# Sessions whose state is kept in memory; the least recently used are re-read from the database
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "1000"))
+
+# Job Queue Configuration
+# Run chat turns as durable background jobs so a slow crew or a page refresh loses nothing
+JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "false").lower() == "true"
+# Workers started inside the Streamlit process; 0 when run separately (python -m agents.job_workers)
+JOB_WORKERS_IN_PROCESS = int(os.getenv("JOB_WORKERS_IN_PROCESS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# A running job whose worker stops renewing its lease for this long is handed to another worker
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "60"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+# HTTP API Configuration
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+# Crew runs executing at once, and how many more may wait before requests get 503
+API_WORKERS = int(os.getenv("API_WORKERS", "8"))
+API_MAX_PENDING = int(os.getenv("API_MAX_PENDING", "32"))
+# When set, the Streamlit UI sends chat turns to this API instead of running crews itself
+SUPPORT_API_URL = os.getenv("SUPPORT_API_URL", "")
+
+# Tracing Configuration
+# Spans for routing, crews, tools and LLM calls; disabled tracing costs one attribute check per span
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+# Comma-separated: jsonl (TRACING_JSONL_PATH) and/or otlp (OTLP/HTTP JSON to a collector)
+TRACING_EXPORTERS = [name.strip() for name in os.getenv("TRACING_EXPORTERS", "jsonl").split(",") if name.strip()]
+TRACING_JSONL_PATH = os.getenv("TRACING_JSONL_PATH", "data/traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "support-crew")
+TRACING_BATCH_SIZE = int(os.getenv("TRACING_BATCH_SIZE", "100"))
+TRACING_FLUSH_SECONDS = float(os.getenv("TRACING_FLUSH_SECONDS", "5"))
 
 # UI Configuration
 PAGE_TITLE = "AI Customer Support System"
@@ -41,4 +174,36 @@ USER_INFO_FIELDS = {
     "ecommerce": ["name", "email", "order_id"],
     "banking": ["name", "account_number", "phone"],
     "telecom": ["name", "phone_number", "account_id"]
-}
\ No newline at end of file
+}
+
+# Sample questions per domain, matching the sample data (shown in the sidebar, used by benchmarks)
+SAMPLE_QUESTIONS = {
+    "ecommerce": [
+        "Where is my order ORD001?",
+        "Track shipment TRK001",
+        "What's the status of order ORD003?",
+        "I want to return my headphones",
+        "When will my laptop stand arrive?"
+    ],
+    "banking": [
+        "What's my balance for account ACC001?",
+        "Show recent transactions for ACC001",
+        "I see a charge for $89.99, what was it?",
+        "Transfer money between accounts",
+        "Why was I charged $25 ATM fee?"
+    ],
+    "telecom": [
+        "How much data have I used on 555-0103?",
+        "My internet is very slow today",
+        "I want to upgrade from Basic to Unlimited",
+        "When is my next payment due?",
+        "Why is my bill $89.99 this month?"
+    ]
+}
+
+# Sample customer details per domain, as entered in the user info form
+SAMPLE_CUSTOMERS = {
+    "ecommerce": {"name": "John Smith", "email": "john.smith@email.com", "order_id": "ORD001"},
+    "banking": {"name": "Jane Johnson", "account_number": "ACC001", "phone": "555-0102"},
+    "telecom": {"name": "Bob Wilson", "phone_number": "555-0103", "account_id": "CUST003"}
+}
@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import atexit
+import random
+import threading
+import functools
+import contextvars
+import urllib.request
+from config.settings import (
+    TRACING_ENABLED, TRACING_EXPORTERS, TRACING_JSONL_PATH, TRACING_OTLP_ENDPOINT,
+    TRACING_SERVICE_NAME, TRACING_BATCH_SIZE, TRACING_FLUSH_SECONDS
+)
+
+# Innermost open span in the current context
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """A timed operation with attributes, nested under the span open when it started"""
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.parent = _current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.start_ns = None
+        self.end_ns = None
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_error(self, error):
+        self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None and self.error is None:
+            self.record_error(exc)
+        self.tracer.export(self)
+        return False
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled; every method does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def record_error(self, error):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class JsonlSpanExporter:
+    """Append finished spans to a JSONL file, one span per line"""
+
+    def __init__(self, path=TRACING_JSONL_PATH):
+        self.path = path
+
+    def export(self, spans):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class OtlpJsonSpanExporter:
+    """Send spans to an OpenTelemetry collector over OTLP/HTTP with JSON encoding"""
+
+    def __init__(self, endpoint=TRACING_OTLP_ENDPOINT, service_name=TRACING_SERVICE_NAME, timeout=5):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def _span(self, span):
+        otlp = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+        }
+        if span.parent:
+            otlp["parentSpanId"] = span.parent.span_id
+        return otlp
+
+    def export(self, spans):
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "support-crew"}, "spans": [self._span(span) for span in spans]}]
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+EXPORTERS = {"jsonl": JsonlSpanExporter, "otlp": OtlpJsonSpanExporter}
+
+class Tracer:
+    """Collects finished spans and hands them to the exporters in batches"""
+
+    def __init__(self, enabled=TRACING_ENABLED, exporters=TRACING_EXPORTERS,
+                 batch_size=TRACING_BATCH_SIZE, flush_seconds=TRACING_FLUSH_SECONDS):
+        self.enabled = enabled
+        self.exporters = [EXPORTERS[name]() for name in exporters if name in EXPORTERS]
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def start_span(self, name, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def export(self, span):
+        with self._lock:
+            self._pending.append(span)
+            due = len(self._pending) >= self.batch_size
+            if not due and self._timer is None:
+                # Spans of a quiet period are still written out
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                spans, self._pending = self._pending, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not spans:
+                return 0
+
+            for exporter in self.exporters:
+                try:
+                    exporter.export(spans)
+                except Exception as e:
+                    # Tracing must never break a customer turn
+                    print(f"{type(exporter).__name__} failed to export {len(spans)} spans: {e}")
+            return len(spans)
+
+# Global tracer
+tracer = Tracer()
+
+def span(name, **attributes):
+    """Context manager timing a block as a child of the current span"""
+    return tracer.start_span(name, **attributes)
+
+def current_span():
+    """The innermost open span, or a no-op span when there is none"""
+    return _current_span.get() or NOOP_SPAN
+
+def traced(name=None, **attributes):
+    """Decorator running the function inside a span"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.start_span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
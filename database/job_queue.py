@@ -0,0 +1,154 @@
+import json
+import time
+import uuid
+import sqlite3
+from database.sql_manager import db, ConnectionPool
+from config.settings import JOB_MAX_ATTEMPTS, JOB_VISIBILITY_TIMEOUT_SECONDS, JOB_RETRY_BACKOFF_SECONDS
+
+# queued -> running -> succeeded, or back to queued for a retry, or failed
+JOB_STATES = ("queued", "running", "succeeded", "failed")
+TERMINAL_STATES = ("succeeded", "failed")
+
+class JobQueue:
+    """Durable queue of chat turns in the chat_jobs table.
+
+    A worker claims a job by taking a lease: the job turns "running" and
+    becomes invisible to other workers until ``visible_at``. Workers renew
+    the lease while the crew runs; if a worker dies, the lease runs out and
+    another worker picks the job up again. Completing or failing a job only
+    succeeds for the worker holding the current lease, so a slow worker
+    whose job was reassigned cannot overwrite the new attempt's result.
+    Enqueueing is idempotent per ``idempotency_key``.
+    """
+
+    def __init__(self, manager=db, max_attempts=JOB_MAX_ATTEMPTS,
+                 visibility_timeout=JOB_VISIBILITY_TIMEOUT_SECONDS, retry_backoff=JOB_RETRY_BACKOFF_SECONDS):
+        self.manager = manager
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        # Autocommit connections so claims can take an explicit write lock
+        self.pool = ConnectionPool(manager.db_path, isolation_level=None, row_factory=sqlite3.Row)
+
+    def _to_dict(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, domain, query, user_info=None, session_id=None, idempotency_key=None):
+        """Add a turn and return its job id; an existing key returns the original job"""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        payload = json.dumps({"query": query, "user_info": user_info or {}})
+
+        with self.pool.connection() as conn:
+            conn.execute(
+                """INSERT OR IGNORE INTO chat_jobs
+                   (job_id, idempotency_key, session_id, domain, payload, status,
+                    max_attempts, visible_at, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?)""",
+                (job_id, idempotency_key or job_id, session_id, domain, payload,
+                 self.max_attempts, now, now, now)
+            )
+            row = conn.execute(
+                "SELECT job_id FROM chat_jobs WHERE idempotency_key = ?", (idempotency_key or job_id,)
+            ).fetchone()
+            return row["job_id"]
+
+    def claim(self, worker_id):
+        """Lease the oldest runnable job to worker_id; returns the job dict or None"""
+        now = time.time()
+        # A failure inside the transaction is rolled back when the connection returns to the pool
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs whose last lease expired with no attempts left are given up on
+            conn.execute(
+                """UPDATE chat_jobs SET status = 'failed', updated_at = ?,
+                          error = COALESCE(error, 'Worker lease expired on the final attempt')
+                   WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts""",
+                (now, now)
+            )
+            row = conn.execute(
+                """SELECT job_id FROM chat_jobs
+                   WHERE status IN ('queued', 'running') AND visible_at <= ?
+                   ORDER BY created_at LIMIT 1""",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                """UPDATE chat_jobs SET status = 'running', attempts = attempts + 1, worker_id = ?,
+                          visible_at = ?, updated_at = ?
+                   WHERE job_id = ?""",
+                (worker_id, now + self.visibility_timeout, now, row["job_id"])
+            )
+            job = conn.execute("SELECT * FROM chat_jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+            conn.execute("COMMIT")
+            return self._to_dict(job)
+
+    def _update_leased(self, job_id, worker_id, assignments, params):
+        """Apply an update only while worker_id still holds the job's lease"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                f"""UPDATE chat_jobs SET {assignments}, updated_at = ?
+                    WHERE job_id = ? AND worker_id = ? AND status = 'running'""",
+                (*params, time.time(), job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job_id, worker_id):
+        """Extend the lease; False means the job was reassigned and the work should stop"""
+        return self._update_leased(job_id, worker_id, "visible_at = ?", (time.time() + self.visibility_timeout,))
+
+    def complete(self, job_id, worker_id, result):
+        return self._update_leased(
+            job_id, worker_id, "status = 'succeeded', result = ?, error = NULL", (json.dumps(result, default=str),)
+        )
+
+    def fail(self, job_id, worker_id, error):
+        """Schedule a retry with linear backoff, or mark the job failed after its last attempt"""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if job["attempts"] >= job["max_attempts"]:
+            return self._update_leased(job_id, worker_id, "status = 'failed', error = ?", (str(error),))
+        retry_at = time.time() + self.retry_backoff * job["attempts"]
+        return self._update_leased(
+            job_id, worker_id, "status = 'queued', error = ?, visible_at = ?", (str(error), retry_at)
+        )
+
+    def get(self, job_id):
+        with self.pool.connection() as conn:
+            return self._to_dict(conn.execute("SELECT * FROM chat_jobs WHERE job_id = ?", (job_id,)).fetchone())
+
+    def wait(self, job_id, timeout, poll_seconds=0.5):
+        """Poll until the job reaches a terminal state or timeout passes; returns the latest job"""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATES or time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_seconds)
+
+    def get_session_jobs(self, session_id):
+        """All jobs of a session, oldest first"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT * FROM chat_jobs WHERE session_id = ? ORDER BY created_at", (session_id,)
+            ).fetchall()
+            return [self._to_dict(row) for row in rows]
+
+    def get_stats(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS jobs FROM chat_jobs GROUP BY status").fetchall()
+            stats = {state: 0 for state in JOB_STATES}
+            stats.update({row["status"]: row["jobs"] for row in rows})
+            return stats
+
+# Global job queue
+job_queue = JobQueue()
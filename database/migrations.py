@@ -0,0 +1,290 @@
+"""Versioned schema migrations for the customer support database.
+
+Each migration runs once, in version order, inside its own write
+transaction, and is recorded in the schema_version table. Add new steps to
+the end of MIGRATIONS; never edit one that has shipped.
+
+    python -m database.migrations            # apply pending migrations
+    python -m database.migrations --verify   # check the hot queries use their indexes
+"""
+import sys
+import sqlite3
+import argparse
+from datetime import datetime
+from config.settings import DATABASE_PATH
+
+def create_baseline_tables(conn):
+    """Tables as they were before schema versioning; IF NOT EXISTS keeps older databases intact"""
+    cursor = conn.cursor()
+    
+    # Customers table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id VARCHAR(50) UNIQUE NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100),
+            phone VARCHAR(20),
+            domain VARCHAR(20) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # E-commerce tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id VARCHAR(50) UNIQUE NOT NULL,
+            customer_id VARCHAR(50) NOT NULL,
+            product_name VARCHAR(200),
+            status VARCHAR(20) DEFAULT 'processing',
+            total_amount DECIMAL(10,2),
+            shipping_address TEXT,
+            tracking_number VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id VARCHAR(50) UNIQUE NOT NULL,
+            name VARCHAR(200) NOT NULL,
+            price DECIMAL(10,2),
+            stock_quantity INTEGER DEFAULT 0,
+            category VARCHAR(50),
+            description TEXT
+        )
+    ''')
+    
+    # Banking tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bank_accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            account_number VARCHAR(20) UNIQUE NOT NULL,
+            customer_id VARCHAR(50) NOT NULL,
+            account_type VARCHAR(20) DEFAULT 'checking',
+            balance DECIMAL(15,2) DEFAULT 0.00,
+            status VARCHAR(20) DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transaction_id VARCHAR(50) UNIQUE NOT NULL,
+            account_number VARCHAR(20) NOT NULL,
+            amount DECIMAL(15,2) NOT NULL,
+            transaction_type VARCHAR(20) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (account_number) REFERENCES bank_accounts(account_number)
+        )
+    ''')
+    
+    # Telecom tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS telecom_accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone_number VARCHAR(15) UNIQUE NOT NULL,
+            customer_id VARCHAR(50) NOT NULL,
+            plan_type VARCHAR(50),
+            monthly_charge DECIMAL(8,2),
+            data_usage_gb DECIMAL(5,2) DEFAULT 0,
+            status VARCHAR(20) DEFAULT 'active',
+            last_payment_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        )
+    ''')
+    
+    # Chat sessions
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id VARCHAR(50) NOT NULL,
+            customer_id VARCHAR(50) NOT NULL,
+            domain VARCHAR(20) NOT NULL,
+            messages TEXT, -- JSON format
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # LLM token usage ledger
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TIMESTAMP NOT NULL,
+            session_id VARCHAR(50),
+            domain VARCHAR(20),
+            crew VARCHAR(50),
+            agent VARCHAR(100),
+            stage VARCHAR(20),
+            model VARCHAR(100),
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            cached INTEGER DEFAULT 0
+        )
+    ''')
+    
+    # Durable queue of chat turns run by background workers
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_jobs (
+            job_id VARCHAR(32) PRIMARY KEY,
+            idempotency_key VARCHAR(100) UNIQUE NOT NULL,
+            session_id VARCHAR(50),
+            domain VARCHAR(20) NOT NULL,
+            payload TEXT NOT NULL, -- JSON: query, user_info
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            worker_id VARCHAR(100),
+            visible_at REAL NOT NULL,
+            result TEXT, -- JSON turn result
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_chat_jobs_claim ON chat_jobs (status, visible_at)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_chat_jobs_session ON chat_jobs (session_id, created_at)"
+    )
+
+# (version, description, step); a step is a callable taking the connection or a list of SQL statements
+MIGRATIONS = [
+    (1, "Baseline tables", create_baseline_tables),
+    (2, "Indexes for customer lookups and newest-first listings", [
+        "CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders (customer_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_account_created ON transactions (account_number, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_bank_accounts_customer ON bank_accounts (customer_id)",
+        "CREATE INDEX IF NOT EXISTS idx_telecom_accounts_customer ON telecom_accounts (customer_id)",
+        "CREATE INDEX IF NOT EXISTS idx_chat_sessions_session ON chat_sessions (session_id)",
+        "CREATE INDEX IF NOT EXISTS idx_llm_usage_created ON llm_usage (created_at)",
+    ]),
+    (3, "Version counter for compare-and-set saves of chat sessions", [
+        "ALTER TABLE chat_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def current_version(conn):
+    """Highest applied migration, 0 for a database that predates versioning"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+def migrate(conn, target=LATEST_VERSION):
+    """Apply pending migrations up to ``target``; returns the versions applied.
+
+    Each step takes the write lock first and re-reads the version, so
+    processes starting at the same time never apply a step twice.
+    """
+    if current_version(conn) >= target:
+        return []
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    ''')
+    conn.commit()
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version > target:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= version:
+                conn.rollback()
+                continue
+            if callable(step):
+                step(conn)
+            else:
+                for statement in step:
+                    conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (version, description, datetime.now().isoformat(sep=" ", timespec="seconds"))
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+# Hot queries from SQLManager and the tools, with the index each one must use
+QUERY_PLAN_CHECKS = [
+    ("get_customer_orders", "SELECT * FROM orders WHERE customer_id = ? ORDER BY created_at DESC",
+     ("CUST001",), "idx_orders_customer_created"),
+    ("get_recent_transactions",
+     "SELECT * FROM transactions WHERE account_number = ? ORDER BY created_at DESC LIMIT ?",
+     ("ACC001", 5), "idx_transactions_account_created"),
+    ("bank_accounts_by_customer", "SELECT * FROM bank_accounts WHERE customer_id = ?",
+     ("CUST002",), "idx_bank_accounts_customer"),
+    ("telecom_accounts_by_customer", "SELECT * FROM telecom_accounts WHERE customer_id = ?",
+     ("CUST003",), "idx_telecom_accounts_customer"),
+    ("get_chat_session", "SELECT * FROM chat_sessions WHERE session_id = ? ORDER BY id DESC LIMIT 1",
+     ("session",), "idx_chat_sessions_session"),
+    ("usage_totals_today", "SELECT COUNT(*) FROM llm_usage WHERE created_at >= ?",
+     ("2024-01-01",), "idx_llm_usage_created"),
+    ("claim_chat_job",
+     "SELECT job_id FROM chat_jobs WHERE status IN ('queued', 'running') AND visible_at <= ? ORDER BY created_at LIMIT 1",
+     (0,), "idx_chat_jobs_claim"),
+]
+
+def explain(conn, query, params=()):
+    """EXPLAIN QUERY PLAN detail lines for a query"""
+    return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()]
+
+def verify_query_plans(conn, checks=QUERY_PLAN_CHECKS):
+    """Check each hot query searches its index; returns (name, plan, problem) for the failures.
+
+    A plan that scans the table or sorts rows in a temporary B-tree is a
+    failure, except that the job claim may sort its few runnable jobs.
+    """
+    failures = []
+    for name, query, params, index in checks:
+        plan = explain(conn, query, params)
+        text = " | ".join(plan)
+        if index not in text:
+            failures.append((name, text, f"does not use {index}"))
+        elif any(line.startswith("SCAN") for line in plan):
+            failures.append((name, text, "scans a table"))
+        elif "TEMP B-TREE" in text and name != "claim_chat_job":
+            failures.append((name, text, "sorts in a temporary B-tree"))
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply and check database schema migrations")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    parser.add_argument("--verify", action="store_true", help="Check the hot query plans after migrating")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    try:
+        before = current_version(conn)
+        applied = migrate(conn)
+        print(f"Schema version {before} -> {current_version(conn)}"
+              + (f" (applied {', '.join(map(str, applied))})" if applied else " (up to date)"))
+
+        if args.verify:
+            failures = verify_query_plans(conn)
+            for name, plan, problem in failures:
+                print(f"FAIL {name}: {problem}\n     {plan}")
+            print(f"{len(QUERY_PLAN_CHECKS) - len(failures)}/{len(QUERY_PLAN_CHECKS)} query plans use their index")
+            sys.exit(1 if failures else 0)
+    finally:
+        conn.close()
@@ -13,11 +13,10 @@ def populate_sample_data():
         ("CUST005", "Charlie Davis", "charlie.davis@email.com", "555-0105", "banking")
     ]
     
-    for customer in customers_data:
-        query = """INSERT OR REPLACE INTO customers 
-                   (customer_id, name, email, phone, domain) 
-                   VALUES (?, ?, ?, ?, ?)"""
-        db.execute_query(query, customer)
+    query = """INSERT OR REPLACE INTO customers 
+               (customer_id, name, email, phone, domain) 
+               VALUES (?, ?, ?, ?, ?)"""
+    db.execute_many(query, customers_data)
     
     # Sample products
     products_data = [
@@ -28,11 +27,10 @@ def populate_sample_data():
         ("PROD005", "Phone Case", 24.99, 75, "Accessories")
     ]
     
-    for product in products_data:
-        query = """INSERT OR REPLACE INTO products 
-                   (product_id, name, price, stock_quantity, category) 
-                   VALUES (?, ?, ?, ?, ?)"""
-        db.execute_query(query, product)
+    query = """INSERT OR REPLACE INTO products 
+               (product_id, name, price, stock_quantity, category) 
+               VALUES (?, ?, ?, ?, ?)"""
+    db.execute_many(query, products_data)
     
     # Sample orders
     orders_data = [
@@ -42,11 +40,10 @@ def populate_sample_data():
         ("ORD004", "CUST004", "Bluetooth Speaker", "shipped", 79.99, "456 Oak Ave, City, State", "TRK003")
     ]
     
-    for order in orders_data:
-        query = """INSERT OR REPLACE INTO orders 
-                   (order_id, customer_id, product_name, status, total_amount, shipping_address, tracking_number) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?)"""
-        db.execute_query(query, order)
+    query = """INSERT OR REPLACE INTO orders 
+               (order_id, customer_id, product_name, status, total_amount, shipping_address, tracking_number) 
+               VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    db.execute_many(query, orders_data)
     
     # Sample bank accounts
     accounts_data = [
@@ -55,11 +52,10 @@ def populate_sample_data():
         ("ACC003", "CUST002", "savings", 5750.25, "active")
     ]
     
-    for account in accounts_data:
-        query = """INSERT OR REPLACE INTO bank_accounts 
-                   (account_number, customer_id, account_type, balance, status) 
-                   VALUES (?, ?, ?, ?, ?)"""
-        db.execute_query(query, account)
+    query = """INSERT OR REPLACE INTO bank_accounts 
+               (account_number, customer_id, account_type, balance, status) 
+               VALUES (?, ?, ?, ?, ?)"""
+    db.execute_many(query, accounts_data)
     
     # Sample transactions
     transactions_data = [
@@ -70,11 +66,10 @@ def populate_sample_data():
         ("TXN005", "ACC003", -25.00, "debit", "ATM Withdrawal")
     ]
     
-    for transaction in transactions_data:
-        query = """INSERT OR REPLACE INTO transactions 
-                   (transaction_id, account_number, amount, transaction_type, description) 
-                   VALUES (?, ?, ?, ?, ?)"""
-        db.execute_query(query, transaction)
+    query = """INSERT OR REPLACE INTO transactions 
+               (transaction_id, account_number, amount, transaction_type, description) 
+               VALUES (?, ?, ?, ?, ?)"""
+    db.execute_many(query, transactions_data)
     
     # Sample telecom accounts
     telecom_data = [
@@ -82,11 +77,10 @@ def populate_sample_data():
         ("555-0106", "CUST003", "Basic Plan", 39.99, 12.1, "active", "2024-01-10")
     ]
     
-    for telecom in telecom_data:
-        query = """INSERT OR REPLACE INTO telecom_accounts 
-                   (phone_number, customer_id, plan_type, monthly_charge, data_usage_gb, status, last_payment_date) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?)"""
-        db.execute_query(query, telecom)
+    query = """INSERT OR REPLACE INTO telecom_accounts 
+               (phone_number, customer_id, plan_type, monthly_charge, data_usage_gb, status, last_payment_date) 
+               VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    db.execute_many(query, telecom_data)
     
     # Populate vector database
     vector_db.populate_sample_knowledge()
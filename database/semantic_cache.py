@@ -0,0 +1,113 @@
+import time
+import hashlib
+import threading
+from database.vector_manager import vector_db
+from config.settings import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL_SECONDS
+
+class SemanticAnswerCache:
+    """Serve stored answers to paraphrases of earlier customer-independent questions.
+
+    Entries live in a ChromaDB collection next to the knowledge bases, so
+    queries are embedded with the same embedding function. Only answers
+    produced without any customer-specific tool call are stored, and
+    lookups are filtered on that flag.
+    """
+
+    COLLECTION_NAME = "answer_cache"
+
+    def __init__(self, vector_manager=vector_db, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 ttl_seconds=SEMANTIC_CACHE_TTL_SECONDS, enabled=SEMANTIC_CACHE_ENABLED):
+        self.vector_manager = vector_manager
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._collection = None
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.seconds_saved = 0.0
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._collection = self.vector_manager.client.get_or_create_collection(
+                name=self.COLLECTION_NAME,
+                metadata={"description": "Semantic cache of customer-independent answers", "hnsw:space": "cosine"}
+            )
+        return self._collection
+
+    def _entry_id(self, domain, query):
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha256(f"{domain}:{normalized}".encode("utf-8")).hexdigest()
+
+    def lookup(self, domain, query):
+        """Return (answer, similarity) for a close enough cached question, else None"""
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        with self._lock:
+            self.lookups += 1
+
+        if self.collection.count() == 0:
+            return None
+
+        results = self.collection.query(
+            query_texts=[query],
+            n_results=1,
+            where={"$and": [{"domain": domain}, {"customer_independent": True}]}
+        )
+
+        if not results or not results["ids"] or not results["ids"][0]:
+            return None
+
+        metadata = results["metadatas"][0][0]
+        similarity = 1.0 - results["distances"][0][0]
+
+        if similarity < self.threshold:
+            return None
+
+        if self.ttl_seconds and time.time() - metadata.get("created_at", 0) > self.ttl_seconds:
+            self.collection.delete(ids=[results["ids"][0][0]])
+            return None
+
+        lookup_seconds = time.perf_counter() - start
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += max(0.0, metadata.get("generation_seconds", 0.0) - lookup_seconds)
+
+        return metadata["answer"], similarity
+
+    def store(self, domain, query, answer, generation_seconds, customer_independent):
+        """Cache an answer; customer-specific answers are never stored"""
+        if not self.enabled or not customer_independent:
+            return False
+
+        self.collection.upsert(
+            ids=[self._entry_id(domain, query)],
+            documents=[query],
+            metadatas=[{
+                "domain": domain,
+                "customer_independent": True,
+                "answer": answer,
+                "generation_seconds": float(generation_seconds),
+                "created_at": time.time()
+            }]
+        )
+        with self._lock:
+            self.stores += 1
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "stores": self.stores,
+                "hit_rate": (self.hits / self.lookups) * 100 if self.lookups else 0,
+                "seconds_saved": self.seconds_saved
+            }
+
+# Global semantic cache instance
+semantic_cache = SemanticAnswerCache()
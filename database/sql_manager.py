@@ -1,166 +1,282 @@
+import os
+import time
+import queue
 import sqlite3
-import pandas as pd
+import threading
 from datetime import datetime
-from config.settings import DATABASE_PATH
+from contextlib import contextmanager
+from database.migrations import migrate, current_version
+from config.settings import (
+    DATABASE_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT_SECONDS, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE_MB
+)
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by all threads.
+
+    Connections are opened lazily up to ``size`` and configured once with
+    WAL journaling, synchronous=NORMAL, a larger page cache, mmap I/O and a
+    busy timeout. A connection is used by one thread at a time; threads
+    that find the pool exhausted wait for one to be returned. A forked
+    child process starts with a fresh pool instead of sharing the parent's
+    connections.
+    """
+
+    def __init__(self, path, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT_SECONDS, isolation_level="",
+                 row_factory=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.isolation_level = isolation_level
+        self.row_factory = row_factory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self.opens = 0
+        self.reuses = 0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self.path, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+            isolation_level=self.isolation_level
+        )
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        conn.execute(f"PRAGMA cache_size=-{int(DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(DB_MMAP_SIZE_MB) * 1024 * 1024}")
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            try:
+                conn = self._idle.get_nowait()
+                self.reuses += 1
+                return conn
+            except queue.Empty:
+                pass
+            if self._opened < self.size:
+                self._opened += 1
+                self.opens += 1
+                opening = True
+            else:
+                opening = False
+
+        if opening:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        start = time.monotonic()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection free after {self.timeout}s (pool size {self.size})")
+        waited = time.monotonic() - start
+        with self._lock:
+            self.reuses += 1
+            self.waits += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return conn
+
+    def release(self, conn):
+        if self._pid != os.getpid():
+            return
+        try:
+            if conn.in_transaction:
+                # Never hand the next user a half-finished transaction
+                conn.rollback()
+        except sqlite3.Error:
+            with self._lock:
+                self._opened -= 1
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._opened -= 1
+
+    def get_stats(self):
+        with self._lock:
+            acquired = self.opens + self.reuses
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "idle": self._idle.qsize(),
+                "in_use": self._opened - self._idle.qsize(),
+                "opens": self.opens,
+                "reuses": self.reuses,
+                "reuse_rate": (self.reuses / acquired) * 100 if acquired else 0,
+                "waits": self.waits,
+                "avg_wait_seconds": self.total_wait_seconds / self.waits if self.waits else 0.0,
+                "max_wait_seconds": self.max_wait_seconds
+            }
 
 class SQLManager:
     def __init__(self):
         self.db_path = DATABASE_PATH
+        self.pool = ConnectionPool(self.db_path, row_factory=sqlite3.Row)
         self.init_database()
     
     def init_database(self):
-        """Initialize database with all required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Customers table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id VARCHAR(50) UNIQUE NOT NULL,
-                name VARCHAR(100) NOT NULL,
-                email VARCHAR(100),
-                phone VARCHAR(20),
-                domain VARCHAR(20) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # E-commerce tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                order_id VARCHAR(50) UNIQUE NOT NULL,
-                customer_id VARCHAR(50) NOT NULL,
-                product_name VARCHAR(200),
-                status VARCHAR(20) DEFAULT 'processing',
-                total_amount DECIMAL(10,2),
-                shipping_address TEXT,
-                tracking_number VARCHAR(50),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id VARCHAR(50) UNIQUE NOT NULL,
-                name VARCHAR(200) NOT NULL,
-                price DECIMAL(10,2),
-                stock_quantity INTEGER DEFAULT 0,
-                category VARCHAR(50),
-                description TEXT
-            )
-        ''')
-        
-        # Banking tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bank_accounts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                account_number VARCHAR(20) UNIQUE NOT NULL,
-                customer_id VARCHAR(50) NOT NULL,
-                account_type VARCHAR(20) DEFAULT 'checking',
-                balance DECIMAL(15,2) DEFAULT 0.00,
-                status VARCHAR(20) DEFAULT 'active',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id VARCHAR(50) UNIQUE NOT NULL,
-                account_number VARCHAR(20) NOT NULL,
-                amount DECIMAL(15,2) NOT NULL,
-                transaction_type VARCHAR(20) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (account_number) REFERENCES bank_accounts(account_number)
-            )
-        ''')
-        
-        # Telecom tables
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS telecom_accounts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                phone_number VARCHAR(15) UNIQUE NOT NULL,
-                customer_id VARCHAR(50) NOT NULL,
-                plan_type VARCHAR(50),
-                monthly_charge DECIMAL(8,2),
-                data_usage_gb DECIMAL(5,2) DEFAULT 0,
-                status VARCHAR(20) DEFAULT 'active',
-                last_payment_date DATE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
-            )
-        ''')
-        
-        # Chat sessions
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS chat_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id VARCHAR(50) NOT NULL,
-                customer_id VARCHAR(50) NOT NULL,
-                domain VARCHAR(20) NOT NULL,
-                messages TEXT, -- JSON format
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        """Initialize database with all required tables, applying any pending migrations"""
+        with self.pool.connection() as conn:
+            migrate(conn)
+    
+    def schema_version(self):
+        with self.pool.connection() as conn:
+            return current_version(conn)
+    
+    def execute_many(self, query, rows):
+        """Execute a write query for many parameter rows in one transaction"""
+        with self.pool.connection() as conn:
+            conn.executemany(query, rows)
+            conn.commit()
+        return True
+    
+    def fetch_one(self, query, params=()):
+        """First row of a SELECT as a sqlite3.Row (columns by name or index), or None"""
+        with self.pool.connection() as conn:
+            return conn.execute(query, params).fetchone()
+    
+    def fetch_all(self, query, params=()):
+        """All rows of a SELECT as a list of sqlite3.Row"""
+        with self.pool.connection() as conn:
+            return conn.execute(query, params).fetchall()
+    
+    def iterate(self, query, params=(), batch_size=500):
+        """Yield the rows of a large SELECT without loading them all at once.
         
-        conn.commit()
-        conn.close()
+        The pooled connection is held until the generator is exhausted or closed.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
     
     def execute_query(self, query, params=None):
-        """Execute a query and return results"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
+        """Execute a query; SELECTs return a pandas DataFrame, meant for analytics callers"""
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            if query.strip().upper().startswith('SELECT'):
+                # Imported here so tools and lookups never load pandas
+                import pandas as pd
+                results = [tuple(row) for row in cursor.fetchall()]
+                columns = [desc[0] for desc in cursor.description]
+                return pd.DataFrame(results, columns=columns) if results else pd.DataFrame()
+            else:
+                conn.commit()
+                return True
+    
+    def get_pool_stats(self):
+        return self.pool.get_stats()
+    
+    # Chat session methods
+    def get_chat_session(self, session_id):
+        query = "SELECT * FROM chat_sessions WHERE session_id = ? ORDER BY id DESC LIMIT 1"
+        return self.fetch_one(query, (session_id,))
+    
+    def save_chat_session(self, session_id, customer_id, domain, messages, version=None):
+        """Update the session's row in place, creating it on first save.
         
-        if query.strip().upper().startswith('SELECT'):
-            results = cursor.fetchall()
-            columns = [desc[0] for desc in cursor.description]
-            conn.close()
-            return pd.DataFrame(results, columns=columns) if results else pd.DataFrame()
-        else:
+        With ``version`` (the one read, 0 for a session with no row yet) the
+        write is a compare-and-set: it only lands while the stored row is
+        still at that version. Returns True when the row was written.
+        """
+        latest = "(SELECT MAX(id) FROM chat_sessions WHERE session_id = ?)"
+        with self.pool.connection() as conn:
+            if version is None:
+                cursor = conn.execute(
+                    f"UPDATE chat_sessions SET customer_id = ?, domain = ?, messages = ?, version = version + 1 WHERE id = {latest}",
+                    (customer_id, domain, messages, session_id)
+                )
+            else:
+                cursor = conn.execute(
+                    f"""UPDATE chat_sessions SET customer_id = ?, domain = ?, messages = ?, version = version + 1
+                        WHERE id = {latest} AND version = ?""",
+                    (customer_id, domain, messages, session_id, version)
+                )
+            if cursor.rowcount == 0 and not version:
+                # INSERT ... WHERE NOT EXISTS, so two first saves cannot both create a row
+                cursor = conn.execute(
+                    """INSERT INTO chat_sessions (session_id, customer_id, domain, messages, version)
+                       SELECT ?, ?, ?, ?, 1
+                       WHERE NOT EXISTS (SELECT 1 FROM chat_sessions WHERE session_id = ?)""",
+                    (session_id, customer_id, domain, messages, session_id)
+                )
             conn.commit()
-            conn.close()
-            return True
+            return cursor.rowcount == 1
     
     # E-commerce methods
     def get_order_status(self, order_id):
         query = "SELECT * FROM orders WHERE order_id = ?"
-        return self.execute_query(query, (order_id,))
+        return self.fetch_one(query, (order_id,))
     
     def get_customer_orders(self, customer_id):
         query = "SELECT * FROM orders WHERE customer_id = ? ORDER BY created_at DESC"
-        return self.execute_query(query, (customer_id,))
+        return self.fetch_all(query, (customer_id,))
     
     # Banking methods
     def get_account_balance(self, account_number):
         query = "SELECT balance FROM bank_accounts WHERE account_number = ?"
-        result = self.execute_query(query, (account_number,))
-        return result.iloc[0]['balance'] if not result.empty else None
+        row = self.fetch_one(query, (account_number,))
+        return row['balance'] if row is not None else None
     
     def get_recent_transactions(self, account_number, limit=5):
         query = """SELECT * FROM transactions 
                    WHERE account_number = ? 
                    ORDER BY created_at DESC LIMIT ?"""
-        return self.execute_query(query, (account_number, limit))
+        return self.fetch_all(query, (account_number, limit))
     
     # Telecom methods
     def get_telecom_account(self, phone_number):
         query = "SELECT * FROM telecom_accounts WHERE phone_number = ?"
-        return self.execute_query(query, (phone_number,))
+        return self.fetch_one(query, (phone_number,))
     
     def get_usage_data(self, phone_number):
         query = "SELECT data_usage_gb, monthly_charge FROM telecom_accounts WHERE phone_number = ?"
-        return self.execute_query(query, (phone_number,))
+        return self.fetch_one(query, (phone_number,))
 
 # Global database instance
 db = SQLManager()
\ No newline at end of file
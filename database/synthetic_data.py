@@ -0,0 +1,304 @@
+"""Synthetic customer data at realistic scale, for load and query-plan testing.
+
+Rows are generated lazily and written with executemany in large
+transactions, so memory stays flat however many rows are loaded. Secondary
+indexes are dropped before loading and rebuilt afterwards. Usage is skewed:
+a small share of customers place most orders and own the busiest accounts,
+and transactions cluster around paydays and short bursts of activity.
+
+    python -m database.synthetic_data --customers 1000000
+"""
+import math
+import time
+import random
+import sqlite3
+import argparse
+import itertools
+from datetime import datetime, timedelta
+from config.settings import DATABASE_PATH
+from database.migrations import migrate
+
+DOMAINS = ("ecommerce", "banking", "telecom")
+FIRST_NAMES = ("James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Aisha")
+LAST_NAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Nguyen", "Khan")
+CATEGORIES = ("Electronics", "Accessories", "Cables", "Home", "Books", "Toys", "Sports", "Beauty")
+ORDER_STATUSES = (("delivered", 0.6), ("shipped", 0.2), ("processing", 0.15), ("cancelled", 0.05))
+TRANSACTION_TYPES = (("debit", 0.8), ("credit", 0.2))
+DEBIT_DESCRIPTIONS = ("Grocery Store Purchase", "Online Purchase", "Restaurant", "Fuel", "Utility Bill",
+                      "ATM Withdrawal", "Subscription", "Pharmacy")
+PLANS = (("Basic 5GB", 25.0, 0.35), ("Standard 20GB", 45.0, 0.4), ("Unlimited", 70.0, 0.2), ("Family Share", 110.0, 0.05))
+
+def scaled_counts(customers):
+    """Row counts per table for a given number of customers"""
+    return {
+        "customers": customers,
+        "products": max(100, customers // 1000),
+        "orders": customers * 3,
+        "bank_accounts": customers // 2,
+        "transactions": customers * 10,
+        "telecom_accounts": customers // 3,
+    }
+
+class SyntheticDataGenerator:
+    """Deterministic row streams for each table; ids are derived from row numbers, never stored.
+
+    ``skew`` shapes how concentrated activity is: a row references entity
+    ``floor(n * u ** skew)`` for uniform ``u``, so with the default of 3 about
+    half of all references land on the busiest 12% of customers or accounts.
+    """
+
+    def __init__(self, counts, seed=0, skew=3.0, days=365, now=None):
+        self.counts = counts
+        self.seed = seed
+        self.skew = skew
+        self.days = days
+        self.now = now or datetime.now().replace(microsecond=0)
+        self.start = self.now - timedelta(days=days)
+
+    def _rng(self, table):
+        # One independent, reproducible stream per table
+        return random.Random(f"{self.seed}:{table}")
+
+    def _skewed(self, rng, n):
+        return min(n - 1, int(n * rng.random() ** self.skew))
+
+    def _domain_customer(self, rng, domain):
+        """A skewed pick among the customers of one domain (customer i has domain DOMAINS[i % 3])"""
+        offset = DOMAINS.index(domain)
+        per_domain = max(1, (self.counts["customers"] - offset + 2) // 3)
+        return customer_id(self._skewed(rng, per_domain) * 3 + offset)
+
+    def _timestamp(self, moment):
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+    def _uniform_time(self, rng):
+        return self.start + timedelta(seconds=rng.uniform(0, self.days * 86400))
+
+    def _bursty_time(self, rng, bursts):
+        """Mostly paydays and a few busy bursts, with a uniform background"""
+        roll = rng.random()
+        if roll < 0.35:
+            # Around the 1st or 15th of a random month in range
+            moment = self._uniform_time(rng)
+            day = 1 if rng.random() < 0.5 else 15
+            moment = moment.replace(day=day) + timedelta(hours=rng.gauss(0, 18))
+        elif roll < 0.65:
+            moment = rng.choice(bursts) + timedelta(minutes=rng.expovariate(1 / 90))
+        else:
+            moment = self._uniform_time(rng)
+        return min(max(moment, self.start), self.now)
+
+    def _weighted(self, rng, choices):
+        return rng.choices([c[0] for c in choices], weights=[c[-1] for c in choices])[0]
+
+    def customers(self):
+        rng = self._rng("customers")
+        for i in range(self.counts["customers"]):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (
+                customer_id(i),
+                f"{first} {last}",
+                f"{first.lower()}.{last.lower()}{i}@example.com",
+                f"555-{i % 10_000_000:07d}",
+                DOMAINS[i % 3],
+                self._timestamp(self._uniform_time(rng))
+            )
+
+    def products(self):
+        rng = self._rng("products")
+        for i in range(self.counts["products"]):
+            category = rng.choice(CATEGORIES)
+            # Log-normal prices: mostly cheap, a long tail of expensive items
+            price = round(min(5000.0, math.exp(rng.gauss(3.5, 1.0))), 2)
+            stock = 0 if rng.random() < 0.08 else rng.randint(1, 500)
+            yield (f"SYNP{i:07d}", f"{category} item {i}", price, stock, category, f"Synthetic {category.lower()} product")
+
+    def orders(self):
+        rng = self._rng("orders")
+        products = self.counts["products"]
+        for i in range(self.counts["orders"]):
+            status = self._weighted(rng, ORDER_STATUSES)
+            # Popular products sell far more often
+            product = self._skewed(rng, products)
+            yield (
+                f"SYNO{i:09d}",
+                self._domain_customer(rng, "ecommerce"),
+                f"{CATEGORIES[product % len(CATEGORIES)]} item {product}",
+                status,
+                round(math.exp(rng.gauss(3.5, 1.0)), 2),
+                f"{rng.randint(1, 9999)} Main St, City, State",
+                f"SYNT{i:09d}" if status in ("shipped", "delivered") else None,
+                self._timestamp(self._uniform_time(rng))
+            )
+
+    def bank_accounts(self):
+        rng = self._rng("bank_accounts")
+        for i in range(self.counts["bank_accounts"]):
+            account_type = "savings" if rng.random() < 0.3 else "checking"
+            yield (
+                account_number(i),
+                self._domain_customer(rng, "banking"),
+                account_type,
+                round(rng.paretovariate(1.2) * 500, 2),
+                "frozen" if rng.random() < 0.01 else "active",
+                self._timestamp(self._uniform_time(rng))
+            )
+
+    def transactions(self):
+        rng = self._rng("transactions")
+        accounts = max(1, self.counts["bank_accounts"])
+        bursts = [self._uniform_time(rng) for _ in range(max(1, self.days // 7))]
+        for i in range(self.counts["transactions"]):
+            kind = self._weighted(rng, TRANSACTION_TYPES)
+            if kind == "credit":
+                amount, description = round(rng.uniform(500, 5000), 2), "Salary Deposit"
+            else:
+                amount, description = -round(math.exp(rng.gauss(3.0, 1.1)), 2), rng.choice(DEBIT_DESCRIPTIONS)
+            yield (
+                f"SYNX{i:010d}",
+                account_number(self._skewed(rng, accounts)),
+                amount,
+                kind,
+                description,
+                self._timestamp(self._bursty_time(rng, bursts))
+            )
+
+    def telecom_accounts(self):
+        rng = self._rng("telecom_accounts")
+        for i in range(self.counts["telecom_accounts"]):
+            plan, charge, _ = rng.choices(PLANS, weights=[weight for _, _, weight in PLANS])[0]
+            paid = self.now - timedelta(days=rng.randint(0, 60))
+            yield (
+                f"SYN{i:09d}",
+                self._domain_customer(rng, "telecom"),
+                plan,
+                charge,
+                round(min(999.99, rng.expovariate(1 / 8)), 2),
+                "suspended" if rng.random() < 0.02 else "active",
+                paid.strftime("%Y-%m-%d"),
+                self._timestamp(self._uniform_time(rng))
+            )
+
+def customer_id(index):
+    return f"SYNC{index:08d}"
+
+def account_number(index):
+    return f"SYNA{index:09d}"
+
+# Table (also the generator method) and its INSERT statement, in foreign-key order
+TABLES = [
+    ("customers", """INSERT OR IGNORE INTO customers
+                     (customer_id, name, email, phone, domain, created_at) VALUES (?, ?, ?, ?, ?, ?)"""),
+    ("products", """INSERT OR IGNORE INTO products
+                    (product_id, name, price, stock_quantity, category, description) VALUES (?, ?, ?, ?, ?, ?)"""),
+    ("orders", """INSERT OR IGNORE INTO orders
+                  (order_id, customer_id, product_name, status, total_amount, shipping_address, tracking_number,
+                   created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""),
+    ("bank_accounts", """INSERT OR IGNORE INTO bank_accounts
+                         (account_number, customer_id, account_type, balance, status, created_at)
+                         VALUES (?, ?, ?, ?, ?, ?)"""),
+    ("transactions", """INSERT OR IGNORE INTO transactions
+                        (transaction_id, account_number, amount, transaction_type, description, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)"""),
+    ("telecom_accounts", """INSERT OR IGNORE INTO telecom_accounts
+                            (phone_number, customer_id, plan_type, monthly_charge, data_usage_gb, status,
+                             last_payment_date, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""),
+]
+
+def secondary_indexes(conn, tables):
+    """(name, CREATE statement) of the explicitly created indexes on the given tables"""
+    placeholders = ", ".join("?" for _ in tables)
+    return conn.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+        tuple(tables)
+    ).fetchall()
+
+def bulk_load(generator, db_path=None, batch_size=50_000, rows_per_transaction=500_000, drop_indexes=True,
+              report=print):
+    """Stream every table of the generator into the database; returns per-table load stats.
+
+    Indexes are rebuilt even if loading fails part-way, so the database is
+    never left without them.
+    """
+    conn = sqlite3.connect(db_path or DATABASE_PATH, isolation_level=None)
+    migrate(conn)
+    # Bulk-load settings for this connection only; a crash can at worst lose the load itself
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-262144")
+
+    stats = {"tables": {}}
+    dropped = secondary_indexes(conn, [table for table, _ in TABLES]) if drop_indexes else []
+    started = time.perf_counter()
+    try:
+        for name, _ in dropped:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        for table, statement in TABLES:
+            total = generator.counts.get(table, 0)
+            rows = iter(getattr(generator, table)())
+            table_start = time.perf_counter()
+            loaded = 0
+            in_transaction = 0
+            conn.execute("BEGIN")
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                conn.executemany(statement, batch)
+                loaded += len(batch)
+                in_transaction += len(batch)
+                if in_transaction >= rows_per_transaction:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    in_transaction = 0
+                    elapsed = time.perf_counter() - table_start
+                    report(f"  {table}: {loaded:,}/{total:,} rows ({loaded / elapsed:,.0f} rows/s)")
+            conn.execute("COMMIT")
+
+            elapsed = time.perf_counter() - table_start
+            stats["tables"][table] = {"rows": loaded, "seconds": elapsed,
+                                      "rows_per_second": loaded / elapsed if elapsed else 0.0}
+            report(f"{table}: {loaded:,} rows in {elapsed:.1f}s ({stats['tables'][table]['rows_per_second']:,.0f} rows/s)")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        index_start = time.perf_counter()
+        for name, sql in dropped:
+            conn.execute(sql)
+        stats["index_seconds"] = time.perf_counter() - index_start
+        if dropped:
+            report(f"Rebuilt {len(dropped)} indexes in {stats['index_seconds']:.1f}s")
+        conn.execute("PRAGMA optimize")
+        conn.close()
+
+    stats["rows"] = sum(table["rows"] for table in stats["tables"].values())
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load skewed synthetic customers, orders, accounts and lines")
+    parser.add_argument("--customers", type=int, default=100_000, help="Other tables scale with this")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skew", type=float, default=3.0, help="Higher concentrates activity on fewer customers")
+    parser.add_argument("--days", type=int, default=365, help="Span of generated dates")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows per executemany call")
+    parser.add_argument("--rows-per-transaction", type=int, default=500_000)
+    parser.add_argument("--keep-indexes", action="store_true", help="Load with indexes in place")
+    parser.add_argument("--database", default=DATABASE_PATH)
+    args = parser.parse_args()
+
+    counts = scaled_counts(args.customers)
+    print(f"Generating {sum(counts.values()):,} rows: " + ", ".join(f"{t} {n:,}" for t, n in counts.items()))
+    stats = bulk_load(
+        SyntheticDataGenerator(counts, seed=args.seed, skew=args.skew, days=args.days),
+        db_path=args.database,
+        batch_size=args.batch_size,
+        rows_per_transaction=args.rows_per_transaction,
+        drop_indexes=not args.keep_indexes
+    )
+    print(f"Loaded {stats['rows']:,} rows in {stats['seconds']:.1f}s ({stats['rows_per_second']:,.0f} rows/s)")
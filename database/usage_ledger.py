@@ -0,0 +1,147 @@
+import time
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from database.sql_manager import db
+from config.settings import USAGE_LEDGER_BATCH_SIZE, USAGE_LEDGER_FLUSH_SECONDS
+
+# Tags (session, domain, crew, agent, stage) applied to LLM calls in this context
+_usage_tags = contextvars.ContextVar("usage_tags", default={})
+
+USAGE_TAGS = ("session_id", "domain", "crew", "agent", "stage")
+
+@contextmanager
+def usage_context(**tags):
+    """Tag LLM calls made in this context; nested contexts add to or override outer tags"""
+    merged = dict(_usage_tags.get())
+    merged.update({key: value for key, value in tags.items() if value is not None})
+    token = _usage_tags.set(merged)
+    try:
+        yield
+    finally:
+        _usage_tags.reset(token)
+
+def get_usage_tags():
+    return _usage_tags.get()
+
+class UsageLedger:
+    """Batched writer and reader for per-call token usage in the llm_usage table"""
+
+    GROUP_COLUMNS = ("session_id", "domain", "crew", "agent", "stage", "model")
+
+    def __init__(self, manager=db, batch_size=USAGE_LEDGER_BATCH_SIZE, flush_seconds=USAGE_LEDGER_FLUSH_SECONDS):
+        self.manager = manager
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def record(self, model, prompt_tokens, completion_tokens, cached=False, **tags):
+        """Queue one LLM call; tags default to the current usage_context"""
+        row_tags = dict(get_usage_tags())
+        row_tags.update({key: value for key, value in tags.items() if value is not None})
+        row = (
+            datetime.now().isoformat(sep=" ", timespec="seconds"),
+            row_tags.get("session_id"),
+            row_tags.get("domain"),
+            row_tags.get("crew"),
+            row_tags.get("agent"),
+            row_tags.get("stage"),
+            model,
+            int(prompt_tokens),
+            int(completion_tokens),
+            1 if cached else 0
+        )
+
+        with self._lock:
+            self._pending.append(row)
+            due = (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+            if not due and self._timer is None:
+                # Make sure a quiet period still gets written out
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write all pending rows in one transaction"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                self._last_flush = time.monotonic()
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+
+            if not rows:
+                return 0
+
+            try:
+                self.manager.execute_many(
+                    """INSERT INTO llm_usage
+                       (created_at, session_id, domain, crew, agent, stage, model,
+                        prompt_tokens, completion_tokens, cached)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    rows
+                )
+            except Exception as e:
+                # Keep the rows for the next attempt rather than losing them
+                with self._lock:
+                    self._pending = rows + self._pending
+                print(f"Usage ledger flush failed: {e}")
+                return 0
+            return len(rows)
+
+    def get_totals(self, since=None):
+        """Token and call totals, optionally from ``since`` (a 'YYYY-MM-DD...' string)"""
+        self.flush()
+        query = """SELECT COUNT(*) AS calls,
+                          COALESCE(SUM(cached), 0) AS cached_calls,
+                          COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                          COALESCE(SUM(completion_tokens), 0) AS completion_tokens
+                   FROM llm_usage"""
+        params = ()
+        if since:
+            query += " WHERE created_at >= ?"
+            params = (since,)
+
+        row = self.manager.fetch_one(query, params)
+        totals = {key: int(row[key]) for key in ("calls", "cached_calls", "prompt_tokens", "completion_tokens")}
+        totals["total_tokens"] = totals["prompt_tokens"] + totals["completion_tokens"]
+        return totals
+
+    def get_totals_today(self):
+        return self.get_totals(since=datetime.now().strftime("%Y-%m-%d"))
+
+    def get_breakdown(self, group_by="stage", since=None):
+        """Token totals grouped by one of GROUP_COLUMNS, as a DataFrame"""
+        if group_by not in self.GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of {', '.join(self.GROUP_COLUMNS)}")
+
+        self.flush()
+        query = f"""SELECT {group_by},
+                           COUNT(*) AS calls,
+                           SUM(prompt_tokens) AS prompt_tokens,
+                           SUM(completion_tokens) AS completion_tokens,
+                           SUM(prompt_tokens + completion_tokens) AS total_tokens
+                    FROM llm_usage"""
+        params = None
+        if since:
+            query += " WHERE created_at >= ?"
+            params = (since,)
+        query += f" GROUP BY {group_by} ORDER BY total_tokens DESC"
+        return self.manager.execute_query(query, params)
+
+# Global usage ledger
+usage_ledger = UsageLedger()
@@ -2,6 +2,7 @@ import chromadb
 from chromadb.config import Settings
 import json
 from config.settings import VECTOR_DB_PATH
+from config.tracing import span
 
 class VectorManager:
     def __init__(self):
@@ -36,10 +37,11 @@ class VectorManager:
     def search_knowledge(self, domain, query, n_results=3):
         """Search knowledge in specific domain"""
         if domain in self.collections:
-            results = self.collections[domain].query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            with span("vector.search", domain=domain, n_results=n_results):
+                results = self.collections[domain].query(
+                    query_texts=[query],
+                    n_results=n_results
+                )
             return results
         return None
     
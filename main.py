@@ -4,14 +4,16 @@ sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
 
 import streamlit as st
 import os
-from config.settings import PAGE_TITLE, PAGE_ICON, DOMAINS
+import uuid
+from config.settings import PAGE_TITLE, PAGE_ICON, DOMAINS, JOB_QUEUE_ENABLED
 from ui.styles import get_custom_css
 from ui.components import (
     render_header, 
     render_domain_selection, 
     render_user_info_form,
     render_chat_interface,
-    render_sidebar
+    render_sidebar,
+    restore_session_from_jobs
 )
 
 # Page configuration
@@ -38,6 +40,18 @@ if "chat_messages" not in st.session_state:
 if "user_info" not in st.session_state:
     st.session_state.user_info = {}
 
+if "session_id" not in st.session_state:
+    # With the job queue the session survives a page refresh through the URL
+    restored_session = st.query_params.get("session") if JOB_QUEUE_ENABLED else None
+    st.session_state.session_id = restored_session or uuid.uuid4().hex
+    if restored_session:
+        restore_session_from_jobs()
+
+if JOB_QUEUE_ENABLED:
+    from agents.job_workers import start_job_workers
+    start_job_workers()
+    st.query_params["session"] = st.session_state.session_id
+
 def main():
     """Main application logic"""
     
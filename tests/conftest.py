@@ -0,0 +1,45 @@
+"""Shared test setup: an offline mock LLM and a throwaway working directory.
+
+Settings are read when the app is first imported, so the environment is
+prepared here, before any test module imports it. Relative paths such as
+data/customer_support.db resolve inside the temporary directory.
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.mock_llm_server import MockLLMServer, MockLLMConfig
+
+mock_llm = MockLLMServer(port=0, config=MockLLMConfig(ttft_ms=0, tokens_per_second=10000, tool_use_rate=0)).start()
+
+os.environ["LLM_BASE_URL"] = mock_llm.base_url
+os.environ.setdefault("OPENROUTER_API_KEY", "mock-key")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+os.environ["LLM_RATE_LIMIT_ENABLED"] = "false"
+os.environ["LLM_SELF_CHECK_ENABLED"] = "false"
+os.environ["TRACING_ENABLED"] = "false"
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+WORKDIR = tempfile.mkdtemp(prefix="support-crew-tests-")
+os.makedirs(os.path.join(WORKDIR, "data"))
+os.chdir(WORKDIR)
+
+@pytest.fixture
+def new_usage_rows():
+    """Callable returning the llm_usage rows written since the test started"""
+    from database.sql_manager import db
+    from database.usage_ledger import usage_ledger
+
+    usage_ledger.flush()
+    start_id = db.fetch_one("SELECT COALESCE(MAX(id), 0) AS id FROM llm_usage")["id"]
+
+    def rows():
+        usage_ledger.flush()
+        return db.fetch_all("SELECT * FROM llm_usage WHERE id > ? ORDER BY id", (start_id,))
+    return rows
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("crewai")
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from api import server
+
+def test_saturated_stream_is_refused_before_the_response_starts(monkeypatch):
+    finish = threading.Event()
+
+    def slow_turn(request, session_id):
+        finish.wait(5)
+        return {"response": "Our branches open at 9am.", "domain": request.domain}
+
+    monkeypatch.setattr(server, "chat_turn", slow_turn)
+    request = server.ChatRequest(domain="banking", query="When do you open?")
+
+    async def scenario():
+        runner = server.CrewRunner(workers=1, max_pending=0)
+        monkeypatch.setattr(server, "runner", runner)
+
+        response = await server.chat_stream(request)
+        assert isinstance(response, StreamingResponse)
+        assert runner.slots.locked()
+
+        # The only slot is taken, so the next stream gets a 503 instead of a 200 with an error event
+        with pytest.raises(HTTPException) as refused:
+            await server.chat_stream(request)
+        assert refused.value.status_code == 503
+
+        finish.set()
+        events = [event async for event in response.body_iterator]
+        assert events[-1].startswith("event: done")
+        await asyncio.sleep(0.01)
+        assert not runner.slots.locked() and runner.active == 0
+        runner.shutdown()
+
+    asyncio.run(scenario())
+
+@pytest.mark.parametrize("path", ["/chat", "/chat/stream"])
+def test_unknown_mode_is_rejected_with_422(monkeypatch, path):
+    testclient = pytest.importorskip("fastapi.testclient")
+    monkeypatch.setattr(server, "chat_turn", lambda request, session_id: pytest.fail("the crew must not run"))
+
+    response = testclient.TestClient(server.app).post(
+        path, json={"domain": "banking", "query": "When do you open?", "mode": "parallel"}
+    )
+
+    assert response.status_code == 422
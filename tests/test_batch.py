@@ -0,0 +1,30 @@
+import os
+import json
+
+import batch
+
+def crash_on_poison(record_id, record):
+    """Stands in for process_record; the "poison" record kills its worker process"""
+    if record["query"] == "poison":
+        os._exit(1)
+    return {"id": record_id, "query": record["query"], "response": "ok", "error": None, "latency": 0.0}
+
+def test_process_pool_recovers_from_a_crashed_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "process_record", crash_on_poison)
+    input_path, output_path = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    queries = ["one", "two", "poison", "three", "four", "five"]
+    with open(input_path, "w") as f:
+        for number, query in enumerate(queries):
+            f.write(json.dumps({"id": f"Q{number}", "domain": "banking", "query": query}) + "\n")
+
+    summary = batch.run_batch(str(input_path), str(output_path), workers=2, executor="process")
+
+    with open(output_path) as f:
+        results = [json.loads(line) for line in f]
+    assert [result["id"] for result in results] == [f"Q{number}" for number in range(len(queries))]
+    assert summary["errors"] == 1
+    for result in results:
+        if result["query"] == "poison":
+            assert result["error"].startswith("BrokenProcessPool")
+        else:
+            assert result["response"] == "ok"
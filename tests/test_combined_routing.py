@@ -0,0 +1,69 @@
+import json
+import pytest
+
+pytest.importorskip("crewai")
+from agents import router_crew
+from agents.router_crew import RouterCrew
+
+ANALYSIS = {
+    "domain": "telecom",
+    "confidence": 0.9,
+    "intent": "Customer wants to know why the bill went up",
+    "urgency": "high",
+    "complexity": "complex",
+    "tone": "frustrated",
+    "needed_info": ["phone number", "last bill"]
+}
+
+@pytest.fixture(scope="module")
+def router():
+    return RouterCrew(strategy="combined")
+
+def test_valid_json_fills_every_field(router):
+    result = router.parse_combined_result(json.dumps(ANALYSIS))
+
+    assert (result.domain, result.confidence, result.routed_by) == ("telecom", 0.9, "llm")
+    assert (result.urgency, result.complexity, result.tone) == ("high", "complex", "frustrated")
+    assert result.needed_info == ["phone number", "last bill"]
+    assert "Urgency: high" in result.intent_analysis
+
+@pytest.mark.parametrize("raw", [
+    f"Here is the analysis you asked for:\n{json.dumps(ANALYSIS)}\nLet me know if you need more.",
+    f"```json\n{json.dumps(ANALYSIS, indent=2)}\n```",
+])
+def test_json_wrapped_in_prose_or_fences_is_parsed(router, raw):
+    result = router.parse_combined_result(raw)
+
+    assert (result.domain, result.urgency, result.complexity) == ("telecom", "high", "complex")
+
+def test_missing_and_invalid_fields_get_defaults(router):
+    raw = json.dumps({"domain": "Banking services", "confidence": "very", "urgency": "urgent", "needed_info": "card"})
+    result = router.parse_combined_result(raw)
+
+    assert (result.domain, result.confidence) == ("banking", 0.0)
+    assert (result.urgency, result.complexity, result.tone) == ("medium", "simple", "neutral")
+    assert result.needed_info == ["card"]
+
+@pytest.mark.parametrize("raw, domain, urgency", [
+    ("This is a banking question. Urgency: high", "banking", "high"),
+    ('{"domain": "telecom", "urgency": ', "telecom", "medium"),
+    ("I cannot tell.", "ecommerce", "medium"),
+])
+def test_malformed_output_falls_back_to_text_extraction(router, raw, domain, urgency):
+    result = router.parse_combined_result(raw)
+
+    assert (result.domain, result.urgency, result.confidence) == (domain, urgency, 0.0)
+    assert result.intent_analysis == raw
+
+def test_analyze_combined_parses_the_crew_output(router, monkeypatch):
+    class FakeCrew:
+        def __init__(self, agents, tasks, verbose):
+            self.tasks = tasks
+
+        def kickoff(self):
+            return f"Sure!\n```json\n{json.dumps(ANALYSIS)}\n```"
+
+    monkeypatch.setattr(router_crew, "Crew", FakeCrew)
+    result = router.analyze_combined("Why is my bill so high?")
+
+    assert (result.domain, result.urgency, result.routed_by) == ("telecom", "high", "llm")
@@ -0,0 +1,69 @@
+import sqlite3
+import threading
+import pytest
+
+from config.settings import DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB
+from database.sql_manager import ConnectionPool
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2, timeout=0.2)
+    yield pool
+    pool.close_all()
+
+def test_returned_connection_is_reused(pool):
+    with pool.connection() as conn:
+        first = conn
+    with pool.connection() as conn:
+        assert conn is first
+
+    stats = pool.get_stats()
+    assert (stats["opens"], stats["reuses"], stats["open"], stats["idle"]) == (1, 1, 1, 1)
+
+def test_pool_never_opens_more_than_its_size(pool):
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    # A waiting thread gets the next connection handed back
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(first)
+    waiter.join(1)
+
+    assert got == [first]
+    assert pool.get_stats()["open"] == 2
+    pool.release(second)
+    pool.release(got[0])
+
+def test_connection_is_clean_after_an_exception_in_a_transaction(pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE items (name TEXT)")
+        conn.commit()
+
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.execute("INSERT INTO items VALUES ('half-written')")
+            raise RuntimeError("boom")
+
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+        conn.execute("INSERT INTO items VALUES ('kept')")
+        conn.commit()
+    assert pool.get_stats()["opens"] == 1
+
+def test_connections_use_wal_and_the_configured_pragmas(pool):
+    with pool.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        # synchronous=NORMAL is 1
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == DB_BUSY_TIMEOUT_MS
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -DB_CACHE_SIZE_KB
+
+def test_row_factory_is_applied(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "rows.db"), size=1, row_factory=sqlite3.Row)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1 AS one").fetchone()["one"] == 1
+    pool.close_all()
@@ -0,0 +1,59 @@
+import pytest
+
+@pytest.mark.parametrize("timed_out", [False, True])
+def test_fallback_answers_are_not_remembered(monkeypatch, timed_out):
+    pytest.importorskip("crewai")
+    from agents import pipeline
+    from config.deadline import DeadlineExceeded
+
+    def answer(domain, user_query, user_info, routing_enabled, conversation_context):
+        if timed_out:
+            raise DeadlineExceeded("answer")
+        return "Our branches open at 9am on weekdays.", None, {"answer": 1.0}
+
+    remembered = []
+    monkeypatch.setattr(pipeline, "run_sequential", answer)
+    monkeypatch.setattr(pipeline.conversation_memory, "add_turn", lambda *args, **kwargs: remembered.append(args))
+
+    turn = pipeline.run_turn("banking", "When do you open?", {}, mode="sequential", session_id="memory-test")
+
+    assert turn["mode"] == ("deadline_fallback" if timed_out else "sequential")
+    assert len(remembered) == (0 if timed_out else 1)
+
+def memory(**kwargs):
+    pytest.importorskip("crewai")
+    from agents.conversation_memory import ConversationMemory
+    # A window large enough that no test turn is summarized
+    return ConversationMemory(window_turns=100, max_context_tokens=100000, **kwargs)
+
+def remembered_users(session_id):
+    return [line for line in memory().get_context(session_id).splitlines() if line.startswith("Customer:")]
+
+def test_session_cache_is_bounded_and_evicts_the_least_recent():
+    conversations = memory(max_sessions=2)
+    for session_id in ["lru-1", "lru-2", "lru-3"]:
+        conversations.add_turn(session_id, f"hello from {session_id}", "hi")
+    conversations.get_context("lru-2")
+    conversations.add_turn("lru-4", "hello from lru-4", "hi")
+
+    assert list(conversations._sessions) == ["lru-2", "lru-4"]
+    # An evicted session is read back from the database
+    assert "hello from lru-1" in conversations.get_context("lru-1")
+
+def test_stale_copy_rereads_the_session_instead_of_overwriting_it():
+    first, second = memory(), memory()
+    first.add_turn("cas-test", "one", "a")
+    second.get_context("cas-test")
+    first.add_turn("cas-test", "two", "b")
+    second.add_turn("cas-test", "three", "c")
+
+    assert remembered_users("cas-test") == ["Customer: one", "Customer: two", "Customer: three"]
+
+def test_concurrent_turns_of_a_session_are_all_kept():
+    from concurrent.futures import ThreadPoolExecutor
+
+    conversations = memory()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda n: conversations.add_turn("lock-test", f"message {n}", "ok"), range(16)))
+
+    assert sorted(remembered_users("lock-test")) == sorted(f"Customer: message {n}" for n in range(16))
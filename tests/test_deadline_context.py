@@ -0,0 +1,58 @@
+import types
+import pytest
+
+from config.deadline import Deadline, deadline_scope, limit_agent, run_stage
+
+def test_limit_agent_leaves_execution_time_unset():
+    agent = types.SimpleNamespace(max_iter=25, max_execution_time=300)
+    with deadline_scope(Deadline(30)):
+        limit_agent(agent, max_iter=5, seconds_per_iteration=8)
+    assert agent.max_execution_time is None
+    assert agent.max_iter == 3
+
+def test_crew_usage_rows_keep_tags_under_deadline(new_usage_rows):
+    pytest.importorskip("crewai")
+    from agents.banking_crew import BankingCrew
+    from database.usage_ledger import usage_context
+
+    crew = BankingCrew()
+    with usage_context(session_id="deadline-test", domain="banking", stage="answer"), deadline_scope(Deadline(60)):
+        run_stage("answer", 60, crew.handle_query, "What's my balance for account ACC001?", {"name": "Jane"})
+
+    rows = new_usage_rows()
+    assert rows
+    for row in rows:
+        assert (row["session_id"], row["crew"], row["stage"]) == ("deadline-test", "banking", "answer")
+
+def test_queries_reuse_the_crew_built_with_the_agents(monkeypatch):
+    pytest.importorskip("crewai")
+    from agents.banking_crew import BankingCrew
+
+    crew = BankingCrew()
+    built = dict(crew.crews)
+    kicked = []
+    for role, prebuilt in built.items():
+        original = prebuilt.kickoff
+        monkeypatch.setattr(prebuilt, "kickoff", lambda inputs, role=role, original=original: kicked.append((role, inputs)) or original(inputs=inputs))
+
+    crew.handle_query("What's my balance for account ACC001?", {"name": "Jane"})
+    crew.handle_query("Is there a fee for wire transfers?", None)
+
+    assert crew.crews == built
+    assert [inputs["user_query"] for _, inputs in kicked] == ["What's my balance for account ACC001?", "Is there a fee for wire transfers?"]
+    assert kicked[1][1]["customer_info"] == "Not provided"
+
+def test_stage_pool_reports_saturation():
+    import threading
+    from config.deadline import StageExecutor
+
+    executor = StageExecutor(workers=1)
+    release = threading.Event()
+    futures = [executor.submit(release.wait) for _ in range(3)]
+    stats = executor.get_stats()
+    release.set()
+    for future in futures:
+        future.result()
+
+    assert (stats["busy"], stats["queued"], stats["saturated"]) == (1, 2, 2)
+    assert executor.get_stats()["busy"] == 0
@@ -0,0 +1,53 @@
+import pytest
+
+from agents.domain_classifier import local_classifier
+from config.settings import SAMPLE_QUESTIONS
+
+# Sample questions whose words fit more than one domain
+AMBIGUOUS_SAMPLES = {"When is my next payment due?"}
+
+CLEAR_CUT = [
+    (domain, question)
+    for domain, questions in SAMPLE_QUESTIONS.items()
+    for question in questions
+    if question not in AMBIGUOUS_SAMPLES
+]
+
+@pytest.fixture(scope="module")
+def router():
+    pytest.importorskip("crewai")
+    from agents.router_crew import RouterCrew
+    return RouterCrew()
+
+@pytest.fixture
+def llm_domain(router, monkeypatch):
+    calls = []
+    monkeypatch.setattr(router, "classify_domain", lambda user_query, user_info=None: calls.append(user_query) or "banking")
+    return calls
+
+@pytest.mark.parametrize("domain, question", CLEAR_CUT)
+def test_clear_cut_samples_are_routed_locally(router, llm_domain, domain, question):
+    assert router.fast_classify(question)[::2] == (domain, "local")
+    assert llm_domain == []
+
+@pytest.mark.parametrize("question", sorted(AMBIGUOUS_SAMPLES) + ["", "Hello there", "Can you help me?",
+                                                                  "My card payment for the order failed"])
+def test_ambiguous_or_empty_queries_go_to_the_llm(router, llm_domain, question):
+    domain, confidence, routed_by = router.fast_classify(question)
+
+    assert (domain, routed_by) == ("banking", "llm")
+    assert confidence < router.confidence_threshold
+    assert llm_domain == [question]
+
+@pytest.mark.parametrize("query, expected", [
+    ("Where is order ORD001?", True),
+    ("track trk042 please", True),
+    ("Balance of ACC001", True),
+    ("Data used on 555-0103", True),
+    ("Where is my order?", False),
+    ("Account 1234", False),
+    ("", False),
+    (None, False),
+])
+def test_has_identifier(query, expected):
+    assert local_classifier.has_identifier(query) is expected
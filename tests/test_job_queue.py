@@ -0,0 +1,62 @@
+import sqlite3
+import time
+import types
+import pytest
+
+from database.job_queue import JobQueue
+from database.migrations import migrate
+
+@pytest.fixture
+def queue(tmp_path):
+    path = tmp_path / "jobs.db"
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    conn.close()
+    return JobQueue(manager=types.SimpleNamespace(db_path=str(path)), visibility_timeout=0.2, retry_backoff=0)
+
+def test_enqueue_is_idempotent_per_key(queue):
+    job_id = queue.enqueue("banking", "When do you open?", idempotency_key="turn-1")
+
+    assert queue.enqueue("banking", "When do you open?", idempotency_key="turn-1") == job_id
+    assert queue.enqueue("banking", "When do you open?", idempotency_key="turn-2") != job_id
+    assert queue.get_stats()["queued"] == 2
+
+def test_expired_lease_is_reclaimed_by_another_worker(queue):
+    job_id = queue.enqueue("banking", "When do you open?")
+
+    assert queue.claim("worker-1")["job_id"] == job_id
+    assert queue.claim("worker-2") is None
+    time.sleep(0.25)
+    job = queue.claim("worker-2")
+
+    assert job["job_id"] == job_id
+    assert job["worker_id"] == "worker-2"
+    assert job["attempts"] == 2
+
+def test_worker_that_lost_the_lease_cannot_complete(queue):
+    job_id = queue.enqueue("banking", "When do you open?")
+    queue.claim("worker-1")
+    time.sleep(0.25)
+    queue.claim("worker-2")
+
+    assert not queue.heartbeat(job_id, "worker-1")
+    assert not queue.complete(job_id, "worker-1", {"response": "stale"})
+    assert queue.complete(job_id, "worker-2", {"response": "fresh"})
+    job = queue.get(job_id)
+    assert (job["status"], job["result"]) == ("succeeded", {"response": "fresh"})
+
+@pytest.mark.parametrize("holds_lease", [True, False])
+def test_turn_is_remembered_only_after_complete(queue, monkeypatch, holds_lease):
+    pytest.importorskip("crewai")
+    from agents import job_workers
+
+    remembered = []
+    turn = {"domain": "banking", "mode": "sequential", "response": "We open at 9am."}
+    monkeypatch.setattr(job_workers, "run_turn", lambda *args, remember, **kwargs: remembered.append("ran") or turn)
+    monkeypatch.setattr(job_workers, "remember_turn", lambda *args: remembered.append("remembered"))
+    monkeypatch.setattr(queue, "complete", lambda *args: holds_lease)
+
+    queue.enqueue("banking", "When do you open?", session_id="job-memory")
+    job_workers.JobWorkerPool(workers=0, queue=queue)._run(queue.claim("worker-1"), "worker-1")
+
+    assert remembered == (["ran", "remembered"] if holds_lease else ["ran"])
@@ -0,0 +1,130 @@
+import time
+import asyncio
+import threading
+import pytest
+
+pytest.importorskip("crewai")
+from config.llm_config import ConcurrencyLimiter, RateLimitScheduler
+
+def test_limiter_is_shared_by_threads_and_event_loops():
+    limiter = ConcurrencyLimiter(limit=3)
+    peak = 0
+    lock = threading.Lock()
+
+    def note_peak():
+        nonlocal peak
+        with lock:
+            peak = max(peak, limiter.in_flight)
+
+    def sync_call():
+        with limiter:
+            note_peak()
+            time.sleep(0.02)
+
+    async def async_call():
+        async with limiter:
+            note_peak()
+            await asyncio.sleep(0.02)
+
+    async def loop_calls():
+        await asyncio.gather(*(async_call() for _ in range(10)))
+
+    threads = [threading.Thread(target=sync_call) for _ in range(10)]
+    threads += [threading.Thread(target=asyncio.run, args=(loop_calls(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 3
+    assert limiter.get_stats() == {"limit": 3, "in_flight": 0, "waiting": 0}
+
+def test_cancelled_async_waiter_does_not_leak_a_slot():
+    limiter = ConcurrencyLimiter(limit=1)
+
+    async def scenario():
+        await limiter.aacquire()
+        waiter = asyncio.ensure_future(limiter.aacquire())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        limiter.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(scenario())
+    assert limiter.get_stats()["in_flight"] == 0
+
+def test_async_rate_limit_waits_on_the_loop_in_priority_order():
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_day=10 ** 9, enabled=True)
+    scheduler.request_bucket.tokens = 0
+    served = []
+
+    async def call(priority, name):
+        await scheduler.aacquire(10, priority=priority)
+        served.append(name)
+
+    async def scenario():
+        threads_before = threading.active_count()
+        tasks = [asyncio.ensure_future(call(2, "low")), asyncio.ensure_future(call(0, "high"))]
+        await asyncio.sleep(0.01)
+        # Queued calls wait on the event loop rather than in executor threads
+        assert threading.active_count() == threads_before
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert served == ["high", "low"]
+
+def test_rate_limit_wait_gives_up_at_the_deadline():
+    from config.deadline import DeadlineExceeded
+
+    # One request per minute, already spent: the next one is ~60s away
+    scheduler = RateLimitScheduler(requests_per_minute=1, tokens_per_day=10 ** 9, enabled=True)
+    scheduler.request_bucket.tokens = 0
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        scheduler.acquire(10, timeout=0.5)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(scheduler.aacquire(10, timeout=0.5))
+
+    assert time.monotonic() - start < 0.5
+    assert scheduler.get_stats()["queue_depth"] == 0
+
+def recording_client(client, closed):
+    async def close():
+        closed.append(client)
+    client.close = close
+    return client
+
+def test_async_client_is_closed_when_its_loop_shuts_down():
+    from config.llm_config import DeepSeekFreeLLM
+
+    llm = DeepSeekFreeLLM()
+    closed = []
+
+    async def use():
+        return recording_client(llm._async_client(), closed)
+
+    client = asyncio.run(use())
+
+    assert closed == [client]
+    assert len(llm._async_clients) == 0
+
+def test_close_releases_clients_of_loops_that_never_shut_down():
+    from config.llm_config import DeepSeekFreeLLM
+
+    llm = DeepSeekFreeLLM()
+    closed = []
+    loop = asyncio.new_event_loop()
+
+    async def use():
+        return recording_client(llm._async_client(), closed)
+
+    # Closed without cancelling its tasks, so the loop never closes the client itself
+    client = loop.run_until_complete(use())
+    loop.close()
+    assert closed == []
+
+    llm.client.close = lambda: closed.append(llm.client)
+    llm.close()
+    assert closed == [llm.client, client]
@@ -0,0 +1,41 @@
+import sqlite3
+import pytest
+
+from database.migrations import LATEST_VERSION, create_baseline_tables, current_version, migrate, verify_query_plans
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "support.db")
+    yield conn
+    conn.close()
+
+def applied_rows(conn):
+    return conn.execute("SELECT version, description, applied_at FROM schema_version ORDER BY version").fetchall()
+
+def test_migrate_builds_the_indexes_the_hot_queries_use(conn):
+    assert migrate(conn) == list(range(1, LATEST_VERSION + 1))
+    assert current_version(conn) == LATEST_VERSION
+    assert verify_query_plans(conn) == []
+
+def test_migrate_is_idempotent(conn, tmp_path):
+    migrate(conn)
+    rows = applied_rows(conn)
+
+    assert migrate(conn) == []
+    # A second process opening the migrated database finds nothing to do either
+    other = sqlite3.connect(tmp_path / "support.db")
+    try:
+        assert migrate(other) == []
+    finally:
+        other.close()
+    assert applied_rows(conn) == rows
+    assert verify_query_plans(conn) == []
+
+def test_migrate_upgrades_a_database_that_predates_versioning(conn):
+    create_baseline_tables(conn)
+    conn.commit()
+    assert current_version(conn) == 0
+    assert verify_query_plans(conn) != []
+
+    assert migrate(conn) == list(range(1, LATEST_VERSION + 1))
+    assert verify_query_plans(conn) == []
@@ -0,0 +1,34 @@
+import pytest
+
+from config.deadline import Deadline, deadline_scope, run_stage
+from config.settings import LLM_FAST_MODEL, LLM_STRONG_MODEL
+
+def test_escalated_answer_runs_on_the_strong_model(monkeypatch, new_usage_rows):
+    pytest.importorskip("crewai")
+    from agents import pipeline
+    from agents.banking_crew import BankingCrew
+    from database.usage_ledger import usage_context
+
+    monkeypatch.setattr(pipeline, "LLM_CASCADE_ENABLED", True)
+    monkeypatch.setattr(pipeline, "passes_self_check", lambda user_query, answer: False)
+
+    crew = BankingCrew()
+    with usage_context(session_id="cascade-test"), deadline_scope(Deadline(600)):
+        run_stage("answer", 600, pipeline.answer_with_crew, crew, "How do I order a new card?", {})
+
+    models = {}
+    for row in new_usage_rows():
+        models.setdefault(row["stage"], set()).add(row["model"])
+    assert models == {"answer": {LLM_FAST_MODEL}, "escalation": {LLM_STRONG_MODEL}}
+
+def test_complex_query_starts_on_the_strong_model(new_usage_rows):
+    pytest.importorskip("crewai")
+    from agents import pipeline
+    from agents.banking_crew import BankingCrew
+    from database.usage_ledger import usage_context
+
+    crew = BankingCrew()
+    with usage_context(session_id="cascade-test"):
+        pipeline.answer_with_crew(crew, "Why was I charged twice?", {}, routing_info={"complexity": "complex"})
+
+    assert {row["model"] for row in new_usage_rows()} == {LLM_STRONG_MODEL}
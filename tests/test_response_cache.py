@@ -0,0 +1,43 @@
+import time
+import pytest
+
+pytest.importorskip("crewai")
+from config.llm_config import ResponseCache, llm
+from config.settings import CREW_LLM_TEMPERATURE
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(path=str(tmp_path / "cache.db"), ttl_seconds=0.2, max_entries=2,
+                         max_temperature=0.0, enabled=True)
+
+def test_entries_expire_after_the_ttl(cache):
+    cache.put("key", "model", "cached reply")
+    assert cache.get("key") == "cached reply"
+
+    time.sleep(0.25)
+    assert cache.get("key") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.put("a", "model", "reply a")
+    cache.put("b", "model", "reply b")
+    time.sleep(0.01)
+    cache.get("a")
+    cache.put("c", "model", "reply c")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "reply a"
+    assert cache.get("c") == "reply c"
+
+def test_deterministic_roles_are_cacheable_and_sampled_ones_counted(cache):
+    for role in ["router", "lookup"]:
+        assert cache.should_cache(llm.get_crew_llm(role=role).temperature)
+    answer_temperature = llm.get_crew_llm(role="answer").temperature
+    assert answer_temperature == CREW_LLM_TEMPERATURE
+
+    reason = cache.bypass_reason(answer_temperature)
+    cache.record_bypass(reason)
+    cache.record_bypass(cache.bypass_reason(0.0, use_cache=False))
+
+    assert reason == "temperature"
+    assert (cache.get_stats()["bypassed"], cache.get_stats()["bypassed_temperature"]) == (2, 1)
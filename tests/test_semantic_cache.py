@@ -0,0 +1,57 @@
+import pytest
+
+CUSTOMER = {"name": "Jane Johnson", "account_number": "ACC001", "phone": "555-0102"}
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    pytest.importorskip("crewai")
+    from agents import pipeline
+
+    stored = []
+    monkeypatch.setattr(pipeline.semantic_cache, "enabled", True)
+    monkeypatch.setattr(pipeline.semantic_cache, "lookup", lambda domain, query: None)
+    monkeypatch.setattr(pipeline.semantic_cache, "store", lambda *args: stored.append(args) or True)
+    monkeypatch.setattr(pipeline.conversation_memory, "get_context", lambda session_id: None)
+    pipeline.stored = stored
+    return pipeline
+
+def fake_crew(tool_name, customer_specific, seen_user_info):
+    """Stands in for run_sequential: one tool call and one crew LLM call in the turn's context"""
+    from tools.tool_tracking import get_turn_log
+
+    def run_sequential(domain, user_query, user_info, routing_enabled, conversation_context):
+        seen_user_info.append(user_info)
+        log = get_turn_log()
+        log.record(tool_name, customer_specific)
+        log.record_llm_call(domain)
+        return "Branches open at 9am on weekdays.", None, {"answer": 1.0}
+    return run_sequential
+
+def test_general_answer_for_a_known_customer_is_stored_without_their_details(pipeline, monkeypatch):
+    seen_user_info = []
+    monkeypatch.setattr(pipeline, "run_sequential", fake_crew("search_banking_knowledge", False, seen_user_info))
+
+    turn = pipeline._run_turn("banking", "When do branches open?", CUSTOMER, "sequential", False, None)
+
+    assert turn["semantic_cache"] == {"hit": False, "stored": True}
+    assert len(pipeline.stored) == 1
+    # The crew prompt was built without the customer block
+    assert seen_user_info == [{}]
+
+@pytest.mark.parametrize("query, tool_name, customer_specific", [
+    ("When do branches open?", "get_account_balance", True),
+    ("What's my balance?", "search_banking_knowledge", False),
+])
+def test_customer_specific_turns_are_not_stored(pipeline, monkeypatch, query, tool_name, customer_specific):
+    seen_user_info = []
+    monkeypatch.setattr(pipeline, "run_sequential", fake_crew(tool_name, customer_specific, seen_user_info))
+
+    turn = pipeline._run_turn("banking", query, CUSTOMER, "sequential", False, None)
+
+    assert turn["semantic_cache"]["stored"] is False
+    assert pipeline.stored == []
+    if customer_specific:
+        assert seen_user_info == [{}]
+    else:
+        # Personal questions keep the customer's details
+        assert seen_user_info == [CUSTOMER]
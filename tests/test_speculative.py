@@ -0,0 +1,55 @@
+import time
+from contextlib import contextmanager
+import pytest
+
+@contextmanager
+def fake_acquire(domain):
+    yield domain
+
+@contextmanager
+def slow_acquire(domain):
+    time.sleep(0.2)
+    yield domain
+
+def run(monkeypatch, routed_domain, route_seconds, acquire):
+    from agents import pipeline
+
+    events = []
+
+    def route(user_query, user_info):
+        time.sleep(route_seconds)
+        events.append("routed")
+        return {"domain": routed_domain}, route_seconds
+
+    def answer(crew, user_query, user_info, routing_info, conversation_context, timings):
+        events.append("answer" if routing_info is None else "answer with routing")
+        return "speculative" if routing_info is None else "routed"
+
+    monkeypatch.setattr(pipeline, "_timed_route", route)
+    monkeypatch.setattr(pipeline, "answer_with_crew", answer)
+    monkeypatch.setattr(pipeline.crew_registry, "acquire", acquire)
+
+    result, routing_info, timings = pipeline.run_speculative(
+        "banking", "Why was I charged?", {}, routing_enabled=True, routing_deadline=5
+    )
+    assert routing_info == {"domain": routed_domain}
+    return events, result, timings
+
+@pytest.mark.parametrize("routed_domain", ["banking", "telecom"])
+def test_speculative_crew_runs_while_routing(monkeypatch, routed_domain):
+    pytest.importorskip("crewai")
+    events, result, timings = run(monkeypatch, routed_domain, 0.2, fake_acquire)
+
+    # Late routing never reruns the crew; a disagreement is only recorded
+    assert events == ["answer", "routed"]
+    assert result == "speculative"
+    assert timings.get("routing_disagreed") == (None if routed_domain == "banking" else "telecom")
+
+@pytest.mark.parametrize("routed_domain, expected", [("banking", "routed"), ("telecom", "speculative")])
+def test_routing_ready_before_the_crew_starts_is_used(monkeypatch, routed_domain, expected):
+    pytest.importorskip("crewai")
+    events, result, timings = run(monkeypatch, routed_domain, 0, slow_acquire)
+
+    assert events[0] == "routed"
+    assert result == expected
+    assert ("routing_disagreed" in timings) == (routed_domain != "banking")
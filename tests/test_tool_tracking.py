@@ -0,0 +1,102 @@
+import threading
+import pytest
+
+from tools.tool_tracking import track_turn
+from database.usage_ledger import usage_context
+
+def test_turn_log_only_observes_crews_that_kept_the_context():
+    pytest.importorskip("crewai")
+    from config.llm_config import llm
+
+    crew_llm = llm.get_crew_llm(role="answer")
+
+    def lost_context_call():
+        # A thread started without copying the context, as CrewAI's own timeout does
+        with usage_context(crew="telecom"):
+            crew_llm.call("What plans do you offer?")
+
+    with track_turn() as tool_log:
+        with usage_context(crew="banking"):
+            crew_llm.call("What are your opening hours?")
+        worker = threading.Thread(target=lost_context_call)
+        worker.start()
+        worker.join()
+
+    assert tool_log.observed("banking")
+    assert not tool_log.observed("telecom")
+
+def test_raised_exceptions_and_tool_errors_count_as_errors():
+    from tools.tool_metrics import tool_metrics
+    from tools.tool_tracking import ToolError, track_tool
+
+    @track_tool()
+    def lookup_tracking_test(mode):
+        if mode == "raise":
+            raise ValueError("database is locked")
+        if mode == "fail":
+            return ToolError("Error looking up the order: database is locked")
+        # Ordinary output that merely starts with the word
+        return "Error codes on the router are explained in the manual."
+
+    for mode in ["ok", "fail", "ok"]:
+        lookup_tracking_test(mode)
+    with pytest.raises(ValueError):
+        lookup_tracking_test("raise")
+
+    stats = tool_metrics.snapshot()["tools"]["lookup_tracking_test"]
+    assert (stats["calls"], stats["errors"]) == (4, 2)
+
+def test_histogram_percentiles_stay_within_the_bucket_error():
+    from tools.tool_metrics import LatencyHistogram
+
+    histogram = LatencyHistogram()
+    values = [n / 1000 for n in range(1, 1001)]
+    for value in values:
+        histogram.record(value)
+
+    for p in [50, 90, 95, 99]:
+        exact = values[round(len(values) * p / 100) - 1]
+        # Four sub-buckets per doubling: a bucket's upper bound is at most 25% above its values
+        assert exact <= histogram.percentile(p) <= exact * 1.25
+    assert histogram.percentile(100) == 1.0
+    assert (histogram.count, histogram.min, histogram.max) == (1000, 0.001, 1.0)
+
+def test_histogram_buckets_are_upper_inclusive_with_an_overflow_bucket():
+    from tools.tool_metrics import LatencyHistogram
+
+    histogram = LatencyHistogram(bounds=[0.1, 0.2, 0.4])
+    for value in [0.1, 0.15, 0.4, 5.0]:
+        histogram.record(value)
+
+    assert histogram.counts == [1, 1, 1, 1]
+    assert list(histogram.cumulative()) == [(0.1, 1), (0.2, 2), (0.4, 3)]
+    assert histogram.percentile(100) == 5.0
+
+def test_prometheus_exposition_format():
+    from tools.tool_metrics import ToolMetrics
+
+    metrics = ToolMetrics()
+    metrics.register("get_order_status", customer_specific=True)
+    metrics.register("search_general_knowledge")
+    metrics.observe("get_order_status", 0.01, agent='Order "Specialist"')
+    metrics.observe("get_order_status", 2.0, error=True, agent='Order "Specialist"')
+    text = metrics.to_prometheus()
+    lines = text.splitlines()
+
+    assert text.endswith("\n")
+    for family, kind in [("support_tool_calls_total", "counter"), ("support_tool_errors_total", "counter"),
+                         ("support_tool_skipped_total", "counter"), ("support_tool_latency_seconds", "histogram")]:
+        assert f"# TYPE {family} {kind}" in lines
+        assert any(line.startswith(f"# HELP {family} ") for line in lines)
+
+    labels = 'tool="get_order_status",agent="Order \\"Specialist\\""'
+    assert f"support_tool_calls_total{{{labels}}} 2" in lines
+    assert f"support_tool_errors_total{{{labels}}} 1" in lines
+    assert 'support_tool_calls_total{tool="search_general_knowledge",agent="none"} 0' in lines
+
+    buckets = [line for line in lines if line.startswith(f"support_tool_latency_seconds_bucket{{{labels}")]
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert buckets[-1] == f'support_tool_latency_seconds_bucket{{{labels},le="+Inf"}} 2'
+    assert f"support_tool_latency_seconds_count{{{labels}}} 2" in lines
+    assert f"support_tool_latency_seconds_sum{{{labels}}} 2.01" in lines
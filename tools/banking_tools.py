@@ -1,8 +1,10 @@
 from crewai.tools import tool
+from tools.tool_tracking import track_tool, ToolError
 from database.sql_manager import db
 from database.vector_manager import vector_db
 
 @tool
+@track_tool(customer_specific=True)
 def get_account_balance(account_number: str) -> str:
     """Get account balance for a specific account number"""
     try:
@@ -12,24 +14,26 @@ def get_account_balance(account_number: str) -> str:
         else:
             return "Account not found. Please verify your account number."
     except Exception as e:
-        return f"Error retrieving balance: {str(e)}"
+        return ToolError(f"Error retrieving balance: {str(e)}")
 
 @tool
+@track_tool(customer_specific=True)
 def get_recent_transactions(account_number: str) -> str:
     """Get recent transactions for an account"""
     try:
         result = db.get_recent_transactions(account_number, limit=5)
-        if not result.empty:
+        if result:
             transactions = []
-            for _, transaction in result.iterrows():
+            for transaction in result:
                 transactions.append(f"{transaction['created_at']}: {transaction['transaction_type']} ${transaction['amount']} - {transaction['description']}")
             return f"Recent transactions:\n" + "\n".join(transactions)
         else:
             return "No recent transactions found."
     except Exception as e:
-        return f"Error retrieving transactions: {str(e)}"
+        return ToolError(f"Error retrieving transactions: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def search_banking_knowledge(query: str) -> str:
     """Search banking knowledge base for relevant information"""
     try:
@@ -40,18 +44,18 @@ def search_banking_knowledge(query: str) -> str:
         else:
             return "No relevant banking information found."
     except Exception as e:
-        return f"Error searching banking knowledge: {str(e)}"
+        return ToolError(f"Error searching banking knowledge: {str(e)}")
 
 @tool
+@track_tool(customer_specific=True)
 def check_account_status(account_number: str) -> str:
     """Check the status of a bank account"""
     try:
         query = "SELECT account_type, status, created_at FROM bank_accounts WHERE account_number = ?"
-        result = db.execute_query(query, (account_number,))
-        if not result.empty:
-            account = result.iloc[0]
+        account = db.fetch_one(query, (account_number,))
+        if account is not None:
             return f"Account Type: {account['account_type']}, Status: {account['status']}, Opened: {account['created_at']}"
         else:
             return "Account not found."
     except Exception as e:
-        return f"Error checking account status: {str(e)}"
\ No newline at end of file
+        return ToolError(f"Error checking account status: {str(e)}")
\ No newline at end of file
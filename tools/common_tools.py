@@ -1,24 +1,26 @@
 from crewai.tools import tool
+from tools.tool_tracking import track_tool, ToolError
 from database.sql_manager import db
 from database.vector_manager import vector_db
 import json
 from datetime import datetime
 
 @tool
+@track_tool(customer_specific=True)
 def get_customer_info(customer_id: str) -> str:
     """Get customer information by customer ID"""
     try:
         query = "SELECT * FROM customers WHERE customer_id = ?"
-        result = db.execute_query(query, (customer_id,))
-        if not result.empty:
-            customer = result.iloc[0]
+        customer = db.fetch_one(query, (customer_id,))
+        if customer is not None:
             return f"Customer: {customer['name']}, Email: {customer['email']}, Phone: {customer['phone']}, Domain: {customer['domain']}"
         else:
             return f"Customer {customer_id} not found."
     except Exception as e:
-        return f"Error retrieving customer info: {str(e)}"
+        return ToolError(f"Error retrieving customer info: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def search_general_knowledge(query: str) -> str:
     """Search across all knowledge bases for general information"""
     try:
@@ -35,9 +37,10 @@ def search_general_knowledge(query: str) -> str:
         else:
             return "No relevant information found in knowledge base."
     except Exception as e:
-        return f"Error searching knowledge base: {str(e)}"
+        return ToolError(f"Error searching knowledge base: {str(e)}")
 
 @tool
+@track_tool(customer_specific=True)
 def log_chat_session(session_id: str, customer_id: str, domain: str, messages: str) -> str:
     """Log chat session for analytics and history"""
     try:
@@ -48,27 +51,28 @@ def log_chat_session(session_id: str, customer_id: str, domain: str, messages: s
         db.execute_query(query, (session_id, customer_id, domain, messages))
         return f"Chat session {session_id} logged successfully."
     except Exception as e:
-        return f"Error logging chat session: {str(e)}"
+        return ToolError(f"Error logging chat session: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def get_system_status() -> str:
     """Get overall system status and statistics"""
     try:
         # Count customers by domain
         query = "SELECT domain, COUNT(*) as count FROM customers GROUP BY domain"
-        result = db.execute_query(query)
+        rows = db.fetch_all(query)
         
         status_info = ["System Status: Online"]
         
-        if not result.empty:
-            for _, row in result.iterrows():
-                status_info.append(f"{row['domain'].title()}: {row['count']} customers")
+        for row in rows:
+            status_info.append(f"{row['domain'].title()}: {row['count']} customers")
         
         return " | ".join(status_info)
     except Exception as e:
-        return f"System status check failed: {str(e)}"
+        return ToolError(f"System status check failed: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def validate_user_input(input_data: str, expected_format: str) -> str:
     """Validate user input against expected format"""
     try:
@@ -98,9 +102,10 @@ def validate_user_input(input_data: str, expected_format: str) -> str:
             return "Unknown validation format"
             
     except Exception as e:
-        return f"Validation error: {str(e)}"
+        return ToolError(f"Validation error: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def get_business_hours() -> str:
     """Get current business hours and availability"""
     try:
@@ -118,9 +123,10 @@ def get_business_hours() -> str:
             return "We are closed on weekends. Business hours: Monday-Friday 9 AM - 6 PM EST. AI support is available 24/7."
     
     except Exception as e:
-        return f"Error checking business hours: {str(e)}"
+        return ToolError(f"Error checking business hours: {str(e)}")
 
 @tool
+@track_tool(customer_specific=True)
 def escalate_to_human(issue_description: str, customer_id: str, priority: str = "normal") -> str:
     """Escalate issue to human agent"""
     try:
@@ -139,4 +145,4 @@ def escalate_to_human(issue_description: str, customer_id: str, priority: str =
         return f"Your issue has been escalated to a human agent. Escalation ID: {escalation_id}. Priority: {priority}. You will be contacted within 2-4 hours during business hours."
     
     except Exception as e:
-        return f"Error escalating to human agent: {str(e)}"
\ No newline at end of file
+        return ToolError(f"Error escalating to human agent: {str(e)}")
\ No newline at end of file
@@ -1,36 +1,39 @@
 from crewai.tools import tool
+from tools.tool_tracking import track_tool, ToolError
 from database.sql_manager import db
 from database.vector_manager import vector_db
 
 @tool
+@track_tool(customer_specific=True)
 def get_order_status(order_id: str) -> str:
     """Get the current status of an order by order ID"""
     try:
-        result = db.get_order_status(order_id)
-        if not result.empty:
-            order = result.iloc[0]
+        order = db.get_order_status(order_id)
+        if order is not None:
             return f"Order {order_id}: Status is '{order['status']}', Total: ${order['total_amount']}, Tracking: {order['tracking_number'] or 'Not assigned yet'}"
         else:
             return f"Order {order_id} not found. Please check the order ID."
     except Exception as e:
-        return f"Error retrieving order status: {str(e)}"
+        return ToolError(f"Error retrieving order status: {str(e)}")
 
 @tool
+@track_tool(customer_specific=True)
 def get_customer_orders(customer_id: str) -> str:
     """Get all orders for a specific customer"""
     try:
         result = db.get_customer_orders(customer_id)
-        if not result.empty:
+        if result:
             orders_info = []
-            for _, order in result.iterrows():
+            for order in result:
                 orders_info.append(f"Order {order['order_id']}: {order['status']} - ${order['total_amount']}")
             return f"Your orders:\n" + "\n".join(orders_info)
         else:
             return "No orders found for this customer."
     except Exception as e:
-        return f"Error retrieving orders: {str(e)}"
+        return ToolError(f"Error retrieving orders: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def search_ecommerce_knowledge(query: str) -> str:
     """Search e-commerce knowledge base for relevant information"""
     try:
@@ -41,19 +44,19 @@ def search_ecommerce_knowledge(query: str) -> str:
         else:
             return "No relevant information found in knowledge base."
     except Exception as e:
-        return f"Error searching knowledge base: {str(e)}"
+        return ToolError(f"Error searching knowledge base: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def check_product_availability(product_id: str) -> str:
     """Check if a product is available and get its details"""
     try:
         query = "SELECT * FROM products WHERE product_id = ?"
-        result = db.execute_query(query, (product_id,))
-        if not result.empty:
-            product = result.iloc[0]
+        product = db.fetch_one(query, (product_id,))
+        if product is not None:
             availability = "In Stock" if product['stock_quantity'] > 0 else "Out of Stock"
             return f"Product: {product['name']}, Price: ${product['price']}, Status: {availability} ({product['stock_quantity']} units)"
         else:
             return f"Product {product_id} not found."
     except Exception as e:
-        return f"Error checking product availability: {str(e)}"
\ No newline at end of file
+        return ToolError(f"Error checking product availability: {str(e)}")
\ No newline at end of file
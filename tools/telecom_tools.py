@@ -1,34 +1,36 @@
 from crewai.tools import tool
+from tools.tool_tracking import track_tool, ToolError
 from database.sql_manager import db
 from database.vector_manager import vector_db
 
 @tool
+@track_tool(customer_specific=True)
 def get_telecom_account_info(phone_number: str) -> str:
     """Get telecom account information for a phone number"""
     try:
-        result = db.get_telecom_account(phone_number)
-        if not result.empty:
-            account = result.iloc[0]
+        account = db.get_telecom_account(phone_number)
+        if account is not None:
             return f"Phone: {phone_number}, Plan: {account['plan_type']}, Monthly Charge: ${account['monthly_charge']}, Status: {account['status']}"
         else:
             return "Phone number not found in our system."
     except Exception as e:
-        return f"Error retrieving account info: {str(e)}"
+        return ToolError(f"Error retrieving account info: {str(e)}")
 
 @tool
+@track_tool(customer_specific=True)
 def get_data_usage(phone_number: str) -> str:
     """Get current data usage for a phone number"""
     try:
-        result = db.get_usage_data(phone_number)
-        if not result.empty:
-            usage = result.iloc[0]
+        usage = db.get_usage_data(phone_number)
+        if usage is not None:
             return f"Current data usage: {usage['data_usage_gb']} GB this month. Monthly charge: ${usage['monthly_charge']}"
         else:
             return "Phone number not found."
     except Exception as e:
-        return f"Error retrieving usage data: {str(e)}"
+        return ToolError(f"Error retrieving usage data: {str(e)}")
 
 @tool
+@track_tool(customer_specific=False)
 def search_telecom_knowledge(query: str) -> str:
     """Search telecom knowledge base for relevant information"""
     try:
@@ -39,17 +41,18 @@ def search_telecom_knowledge(query: str) -> str:
         else:
             return "No relevant telecom information found."
     except Exception as e:
-        return f"Error searching telecom knowledge: {str(e)}"
+        return ToolError(f"Error searching telecom knowledge: {str(e)}")
 
 @tool
+@track_tool(customer_specific=True)
 def check_network_status(phone_number: str) -> str:
     """Check network status for a specific phone number"""
     try:
         # Simulate network check
-        result = db.get_telecom_account(phone_number)
-        if not result.empty:
+        account = db.get_telecom_account(phone_number)
+        if account is not None:
             return f"Network status for {phone_number}: Active and operational. Signal strength: Strong."
         else:
             return "Phone number not found in our network."
     except Exception as e:
-        return f"Error checking network status: {str(e)}"
\ No newline at end of file
+        return ToolError(f"Error checking network status: {str(e)}")
\ No newline at end of file
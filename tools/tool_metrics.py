@@ -0,0 +1,183 @@
+import json
+import bisect
+import threading
+from database.usage_ledger import get_usage_tags
+
+def log_linear_bounds(lowest=0.0005, highest=120.0, sub_buckets=4):
+    """HDR-style bucket upper bounds in seconds: each doubling split into equal sub-buckets"""
+    bounds = []
+    base = lowest
+    while base < highest:
+        step = base / sub_buckets
+        bounds.extend(round(base + step * i, 6) for i in range(1, sub_buckets + 1))
+        base *= 2
+    return bounds
+
+LATENCY_BUCKETS = log_linear_bounds()
+
+class LatencyHistogram:
+    """Bucketed latency counts with a relative error bounded by the sub-bucket width"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        # One extra bucket for values above the last bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile (the max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = max(1, round(self.count * p / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs as Prometheus histograms expect"""
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            yield bound, seen
+
+class ToolStats:
+    """Calls, errors and latency of one tool as used by one agent role"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.skipped = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "error_rate": self.errors / self.calls if self.calls else 0.0,
+            "total_seconds": self.latency.total,
+            "mean_seconds": self.latency.total / self.latency.count if self.latency.count else 0.0,
+            "p50_seconds": self.latency.percentile(50),
+            "p95_seconds": self.latency.percentile(95),
+            "p99_seconds": self.latency.percentile(99),
+            "max_seconds": self.latency.max or 0.0
+        }
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class ToolMetrics:
+    """Per-tool, per-agent-role call counts and latency histograms.
+
+    Tools are registered by ``track_tool`` when they are defined, so every
+    tool shows up (with zero calls) before an agent first uses it. Calls
+    made outside any agent are recorded under the role "none".
+    """
+
+    def __init__(self):
+        self._tools = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, tool_name, customer_specific=False):
+        with self._lock:
+            self._tools[tool_name] = customer_specific
+
+    def _series(self, tool_name, agent):
+        key = (tool_name, agent or "none")
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = ToolStats()
+        return stats
+
+    def observe(self, tool_name, seconds, error=False, agent=None):
+        """Record one finished call; the agent role defaults to the current usage_context"""
+        agent = agent or get_usage_tags().get("agent")
+        with self._lock:
+            stats = self._series(tool_name, agent)
+            stats.calls += 1
+            stats.errors += 1 if error else 0
+            stats.latency.record(seconds)
+
+    def skip(self, tool_name, agent=None):
+        """Record a call turned away because the request deadline had run out"""
+        agent = agent or get_usage_tags().get("agent")
+        with self._lock:
+            self._series(tool_name, agent).skipped += 1
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self):
+        """JSON-ready totals per tool with a breakdown by agent role"""
+        with self._lock:
+            tools = {
+                name: {"customer_specific": customer_specific, "calls": 0, "errors": 0, "skipped": 0, "agents": {}}
+                for name, customer_specific in self._tools.items()
+            }
+            for (name, agent), stats in sorted(self._stats.items()):
+                entry = tools.setdefault(
+                    name, {"customer_specific": False, "calls": 0, "errors": 0, "skipped": 0, "agents": {}}
+                )
+                entry["calls"] += stats.calls
+                entry["errors"] += stats.errors
+                entry["skipped"] += stats.skipped
+                entry["agents"][agent] = stats.to_dict()
+        return {"tools": tools}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP support_tool_calls_total Tool calls made by agents.",
+            "# TYPE support_tool_calls_total counter",
+        ]
+        with self._lock:
+            series = sorted(self._stats.items())
+            registered = sorted(set(self._tools) - {name for name, _ in self._stats})
+
+            for (name, agent), stats in series:
+                lines.append(f'support_tool_calls_total{{tool="{_label(name)}",agent="{_label(agent)}"}} {stats.calls}')
+            # Registered but never called, so dashboards list every tool
+            for name in registered:
+                lines.append(f'support_tool_calls_total{{tool="{_label(name)}",agent="none"}} 0')
+
+            lines += ["# HELP support_tool_errors_total Tool calls that failed or returned an error message.",
+                      "# TYPE support_tool_errors_total counter"]
+            for (name, agent), stats in series:
+                lines.append(f'support_tool_errors_total{{tool="{_label(name)}",agent="{_label(agent)}"}} {stats.errors}')
+
+            lines += ["# HELP support_tool_skipped_total Tool calls skipped because the request deadline ran out.",
+                      "# TYPE support_tool_skipped_total counter"]
+            for (name, agent), stats in series:
+                lines.append(f'support_tool_skipped_total{{tool="{_label(name)}",agent="{_label(agent)}"}} {stats.skipped}')
+
+            lines += ["# HELP support_tool_latency_seconds Tool call latency.",
+                      "# TYPE support_tool_latency_seconds histogram"]
+            for (name, agent), stats in series:
+                labels = f'tool="{_label(name)}",agent="{_label(agent)}"'
+                for bound, count in stats.latency.cumulative():
+                    lines.append(f'support_tool_latency_seconds_bucket{{{labels},le="{bound:g}"}} {count}')
+                lines.append(f'support_tool_latency_seconds_bucket{{{labels},le="+Inf"}} {stats.latency.count}')
+                lines.append(f"support_tool_latency_seconds_sum{{{labels}}} {stats.latency.total}")
+                lines.append(f"support_tool_latency_seconds_count{{{labels}}} {stats.latency.count}")
+        return "\n".join(lines) + "\n"
+
+# Global tool metrics registry
+tool_metrics = ToolMetrics()
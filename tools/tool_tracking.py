@@ -0,0 +1,97 @@
+import time
+import functools
+import contextvars
+from contextlib import contextmanager
+from config.deadline import current_deadline
+from config.tracing import span
+from tools.tool_metrics import tool_metrics
+
+# Tool calls made while answering the current turn
+_current_turn = contextvars.ContextVar("current_turn", default=None)
+
+class ToolError(str):
+    """Failure message a tool returns instead of raising.
+
+    The agent reads it like any other tool output; track_tool counts the
+    call as an error.
+    """
+
+class TurnToolLog:
+    """Record of the tools used while answering one customer message"""
+
+    def __init__(self):
+        self.tool_calls = []
+        self.customer_specific = False
+        # Crews whose LLM calls ran with this log in their context
+        self.crews_seen = set()
+
+    def record(self, tool_name, customer_specific):
+        self.tool_calls.append(tool_name)
+        if customer_specific:
+            self.customer_specific = True
+
+    def record_llm_call(self, crew):
+        if crew:
+            self.crews_seen.add(crew)
+
+    def observed(self, crew):
+        """True when the crew ran with this log in context, so its tool calls were recorded"""
+        return crew in self.crews_seen
+
+    @property
+    def customer_independent(self):
+        return not self.customer_specific
+
+@contextmanager
+def track_turn():
+    """Collect tool calls made in this context into a fresh TurnToolLog"""
+    log = TurnToolLog()
+    token = _current_turn.set(log)
+    try:
+        yield log
+    finally:
+        _current_turn.reset(token)
+
+def get_turn_log():
+    return _current_turn.get()
+
+def track_tool(customer_specific=False):
+    """Mark a tool function as reading (or not reading) per-customer data.
+
+    Apply below ``@tool`` so the wrapped function keeps its name,
+    docstring and signature for CrewAI. Every call is also timed into
+    ``tool_metrics``.
+    """
+    def decorator(func):
+        tool_metrics.register(func.__name__, customer_specific)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            log = _current_turn.get()
+            if log is not None:
+                log.record(func.__name__, customer_specific)
+
+            with span(f"tool.{func.__name__}", tool=func.__name__, customer_specific=customer_specific) as tool_span:
+                deadline = current_deadline()
+                if deadline is not None and deadline.expired():
+                    deadline.mark_blown(f"tool:{func.__name__}")
+                    tool_span.set_attribute("deadline_exhausted", True)
+                    tool_metrics.skip(func.__name__)
+                    return "Time budget for this request is exhausted. Answer with the information already gathered."
+
+                start = time.perf_counter()
+                try:
+                    result = func(*args, **kwargs)
+                except Exception:
+                    tool_metrics.observe(func.__name__, time.perf_counter() - start, error=True)
+                    raise
+                # Tools report failures to the agent as ToolError text rather than raising
+                failed = isinstance(result, ToolError)
+                tool_metrics.observe(func.__name__, time.perf_counter() - start, error=failed)
+                if failed:
+                    tool_span.record_error(result)
+                return result
+
+        wrapper.customer_specific = customer_specific
+        return wrapper
+    return decorator
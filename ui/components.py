@@ -1,5 +1,15 @@
+import json
+import uuid
+import queue
 import streamlit as st
-from config.settings import DOMAINS, USER_INFO_FIELDS
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import (
+    DOMAINS, USER_INFO_FIELDS, SAMPLE_QUESTIONS, SUPPORT_API_URL, TURN_DEADLINE_SECONDS,
+    JOB_QUEUE_ENABLED, JOB_POLL_SECONDS
+)
+
+# Runs crews off the script thread so streamed tokens can be rendered meanwhile
+_response_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="chat-turn")
 
 def render_header():
     """Render the main header"""
@@ -74,6 +84,7 @@ def render_user_info_form(domain):
                 st.session_state.user_info = user_info
                 st.session_state.user_info_collected = True
                 st.session_state.chat_messages = []
+                st.session_state.session_id = uuid.uuid4().hex
                 st.success("Information collected! You can now start chatting.")
                 st.rerun()
 
@@ -93,6 +104,18 @@ def render_chat_interface(domain):
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
     
+    # A queued turn (possibly from before a page refresh) is still being answered
+    if JOB_QUEUE_ENABLED and st.session_state.get("pending_job_id"):
+        with st.chat_message("assistant"):
+            with st.spinner("Thinking..."):
+                response = wait_for_job_response(st.session_state.pending_job_id)
+            if response is None:
+                st.info("Still working on your answer. It will appear here when ready - refresh to check again.")
+            else:
+                st.session_state.chat_messages.append({"role": "assistant", "content": response})
+                st.session_state.pending_job_id = None
+                st.rerun()
+    
     # Chat input - FIXED VERSION
     if prompt := st.chat_input("Type your message here..."):
         # Add user message to chat FIRST
@@ -102,17 +125,27 @@ def render_chat_interface(domain):
         with st.chat_message("user"):
             st.markdown(prompt)
         
-        # Generate assistant response
+        if JOB_QUEUE_ENABLED:
+            from database.job_queue import job_queue
+            session_id = st.session_state.session_id
+            # Keyed by message position, so a rerun of this script cannot enqueue it twice
+            st.session_state.pending_job_id = job_queue.enqueue(
+                domain, prompt, st.session_state.user_info, session_id,
+                idempotency_key=f"{session_id}:{len(st.session_state.chat_messages)}"
+            )
+            st.rerun()
+        
+        # Generate assistant response, streaming the final answer as it is generated
         with st.chat_message("assistant"):
+            placeholder = st.empty()
             with st.spinner("Thinking..."):
-                # Get response from agent
-                response = get_agent_response(domain, prompt, st.session_state.user_info)
-                
-                # Display response
-                st.markdown(response)
-                
-                # Add assistant response to chat history ONLY ONCE
-                st.session_state.chat_messages.append({"role": "assistant", "content": response})
+                response = stream_agent_response(domain, prompt, st.session_state.user_info, placeholder)
+            
+            # Replace the streamed text with the final response
+            placeholder.markdown(response)
+            
+            # Add assistant response to chat history ONLY ONCE
+            st.session_state.chat_messages.append({"role": "assistant", "content": response})
         
         # Force rerun to update chat display
         st.rerun()
@@ -147,9 +180,38 @@ def render_sidebar():
             if usage_percentage > 0:
                 st.progress(usage_percentage / 100)
                 st.caption(f"Usage: {usage_percentage:.1f}%")
+            
+            st.caption(
+                f"Response cache: {usage_stats['cache_hits']} hits / "
+                f"{usage_stats['cache_misses']} misses ({usage_stats['cache_hit_rate']:.0f}% hit rate), "
+                f"{usage_stats['cache_bypassed_temperature']} bypassed (temperature)"
+            )
+            st.caption(
+                f"LLM queue: {usage_stats['queue_depth']} waiting, "
+                f"avg wait {usage_stats['avg_queue_wait']:.1f}s (max {usage_stats['max_queue_wait']:.1f}s)"
+            )
         except Exception as e:
             st.warning("LLM stats unavailable")
         
+        try:
+            from agents.registry import crew_registry
+            crew_stats = crew_registry.get_stats().values()
+            warm = sum(stats['warm'] for stats in crew_stats)
+            cold = sum(stats['cold'] for stats in crew_stats)
+            st.caption(f"Crews: {warm} warm / {cold} cold starts")
+        except Exception as e:
+            pass
+        
+        try:
+            from database.semantic_cache import semantic_cache
+            semantic_stats = semantic_cache.get_stats()
+            st.caption(
+                f"Semantic cache: {semantic_stats['hit_rate']:.0f}% hit rate, "
+                f"{semantic_stats['seconds_saved']:.1f}s saved"
+            )
+        except Exception as e:
+            pass
+        
         # ACCURATE TEST DATA SECTION
         st.markdown("---")
         st.markdown("### 🧪 Test Data Available")
@@ -186,13 +248,7 @@ def render_sidebar():
                     "Bluetooth Speaker ($79.99)",
                     "Phone Case ($24.99)"
                 ],
-                "sample_questions": [
-                    "Where is my order ORD001?",
-                    "Track shipment TRK001",
-                    "What's the status of order ORD003?",
-                    "I want to return my headphones",
-                    "When will my laptop stand arrive?"
-                ]
+                "sample_questions": SAMPLE_QUESTIONS["ecommerce"]
             },
             "🏦 Banking": {
                 "customers": [
@@ -225,13 +281,7 @@ def render_sidebar():
                         ]
                     }
                 ],
-                "sample_questions": [
-                    "What's my balance for account ACC001?",
-                    "Show recent transactions for ACC001",
-                    "I see a charge for $89.99, what was it?",
-                    "Transfer money between accounts",
-                    "Why was I charged $25 ATM fee?"
-                ]
+                "sample_questions": SAMPLE_QUESTIONS["banking"]
             },
             "📱 Telecom": {
                 "customers": [
@@ -266,13 +316,7 @@ def render_sidebar():
                     "Family Plan (starting at $129.99)",
                     "Business Plan (starting at $79.99)"
                 ],
-                "sample_questions": [
-                    "How much data have I used on 555-0103?",
-                    "My internet is very slow today",
-                    "I want to upgrade from Basic to Unlimited",
-                    "When is my next payment due?",
-                    "Why is my bill $89.99 this month?"
-                ]
+                "sample_questions": SAMPLE_QUESTIONS["telecom"]
             }
         }
         
@@ -362,12 +406,15 @@ def render_sidebar():
         
         if st.button("🔄 Reset Chat", use_container_width=True):
             st.session_state.chat_messages = []
+            # A new session id starts a fresh conversation memory
+            st.session_state.session_id = uuid.uuid4().hex
             st.rerun()
         
         if st.button("🏠 Back to Home", use_container_width=True):
             st.session_state.selected_domain = None
             st.session_state.user_info_collected = False
             st.session_state.chat_messages = []
+            st.session_state.session_id = uuid.uuid4().hex
             st.rerun()
         
         st.markdown("---")
@@ -379,38 +426,111 @@ def render_sidebar():
             if "user_info" in st.session_state:
                 st.markdown("**Customer:** " + st.session_state.user_info.get('name', 'Unknown'))
 
-def get_agent_response(domain, user_query, user_info):
+def wait_for_job_response(job_id):
+    """Wait for a queued turn; returns its answer, or None if it is still running"""
+    from database.job_queue import job_queue
+    
+    job = job_queue.wait(job_id, timeout=TURN_DEADLINE_SECONDS + 30, poll_seconds=JOB_POLL_SECONDS)
+    if job is None:
+        return "I apologize, but your request could not be found. Please send it again."
+    if job["status"] == "succeeded":
+        return job["result"]["response"]
+    if job["status"] == "failed":
+        return f"I apologize, but I encountered an error while processing your request: {job['error']}. Please try again or contact support."
+    return None
+
+def restore_session_from_jobs():
+    """Rebuild a refreshed page's conversation from the session's queued jobs"""
+    from database.job_queue import job_queue
+    
+    jobs = job_queue.get_session_jobs(st.session_state.session_id)
+    if not jobs:
+        return
+    
+    latest = jobs[-1]
+    st.session_state.selected_domain = latest["domain"]
+    st.session_state.user_info = latest["payload"]["user_info"]
+    st.session_state.user_info_collected = True
+    
+    messages = []
+    for job in jobs:
+        messages.append({"role": "user", "content": job["payload"]["query"]})
+        if job["status"] == "succeeded":
+            messages.append({"role": "assistant", "content": job["result"]["response"]})
+        elif job["status"] == "failed":
+            messages.append({"role": "assistant", "content": "I apologize, but I could not answer this message. Please try again."})
+        else:
+            st.session_state.pending_job_id = job["job_id"]
+    st.session_state.chat_messages = messages
+
+def stream_agent_response(domain, user_query, user_info, placeholder):
+    """Run get_agent_response in a worker thread, writing partial answers to placeholder.
+
+    Streamlit elements can only be updated from the script thread, so the
+    worker pushes the answer text so far onto a queue and this loop renders
+    the latest version until the worker finishes.
+    """
+    from config.llm_config import stream_final_answer
+    updates = queue.Queue()
+    
+    # Session state is only readable from the script thread
+    session_id = st.session_state.get("session_id")
+    
+    def run():
+        if SUPPORT_API_URL:
+            return get_agent_response(domain, user_query, user_info, session_id, on_text=updates.put)
+        with stream_final_answer(updates.put):
+            return get_agent_response(domain, user_query, user_info, session_id)
+    
+    future = _response_executor.submit(run)
+    
+    while not future.done():
+        try:
+            text = updates.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        
+        # Skip intermediate updates that piled up while rendering
+        while not updates.empty():
+            text = updates.get_nowait()
+        placeholder.markdown(text + " ▌")
+    
+    return future.result()
+
+def get_api_response(domain, user_query, user_info, session_id=None, on_text=None):
+    """Answer through the HTTP API at SUPPORT_API_URL, passing partial answers to on_text"""
+    import httpx
+    
+    payload = {"domain": domain, "query": user_query, "user_info": user_info, "session_id": session_id}
+    url = f"{SUPPORT_API_URL.rstrip('/')}/chat/stream"
+    
+    with httpx.stream("POST", url, json=payload, timeout=TURN_DEADLINE_SECONDS + 30) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "answer" and on_text:
+                    on_text(data["text"])
+                elif event == "done":
+                    return data["response"]
+                elif event == "error":
+                    raise RuntimeError(data["detail"])
+    raise RuntimeError("The support API closed the connection without an answer")
+
+def get_agent_response(domain, user_query, user_info, session_id=None, on_text=None):
     """Get response from appropriate domain crew with intelligent routing"""
     try:
-        # Use router for initial classification if needed
-        from agents.router_crew import RouterCrew
-        router = RouterCrew()
-        
-        # Get routing analysis
-        routing_info = router.route_customer(user_query, user_info)
-        recommended_domain = routing_info['domain']
-        
-        # Use recommended domain or stick with user-selected domain
-        final_domain = domain  # Use user's choice, but you could use recommended_domain
-        
-        # Get response from appropriate domain crew
-        if final_domain == "ecommerce":
-            from agents.ecommerce_crew import EcommerceCrew
-            crew = EcommerceCrew()
-        elif final_domain == "banking":
-            from agents.banking_crew import BankingCrew
-            crew = BankingCrew()
-        elif final_domain == "telecom":
-            from agents.telecom_crew import TelecomCrew
-            crew = TelecomCrew()
-        else:
-            return "Invalid domain selected."
+        if SUPPORT_API_URL:
+            return get_api_response(domain, user_query, user_info, session_id, on_text)
         
-        # Add routing context to the query
-        enhanced_context = f"Customer Query: {user_query}\nRouting Analysis: {routing_info['intent_analysis']}"
+        from agents.pipeline import run_turn
         
-        result = crew.handle_query(enhanced_context, user_info)
-        return str(result)
+        # Execution mode and routing are configured per deployment in config.settings
+        turn = run_turn(domain, user_query, user_info, session_id=session_id)
+        return turn["response"]
     
     except Exception as e:
         return f"I apologize, but I encountered an error while processing your request: {str(e)}. Please try again or contact support."
\ No newline at end of file